@@ -1,3 +1,18 @@
 from django.contrib import admin
 
+from .models import InvitationCampaign, InvitationRecipient
+
+
 # Register your models here.
+@admin.register(InvitationCampaign)
+class InvitationCampaignAdmin(admin.ModelAdmin):
+    list_display = ('id', 'subject', 'status', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status',)
+
+
+@admin.register(InvitationRecipient)
+class InvitationRecipientAdmin(admin.ModelAdmin):
+    list_display = ('email', 'campaign', 'status', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('email',)
+    raw_id_fields = ('campaign',)
@@ -0,0 +1,327 @@
+"""
+Async versions of the endpoints that wait on another service: generate-survey (Gemini),
+generate-survey/stream and generate-survey/batch (Gemini, streamed), chat/feed (Chatify), update-profile (Cloudinary)
+and the four OTP views (redis, and Brevo when EMAIL_QUEUE_EAGER is on).
+
+A sync worker is stuck for the whole upstream call; here the call is awaited on the
+shared httpx client (apps/auth/asynchttp.py), so one ASGI worker holds hundreds of them.
+DRF's APIView has no async dispatch, so AsyncAPIView does the parts these views need
+(JSON / form parsing, JWT auth, permission and throttle classes, error bodies) and runs
+the sync pieces (user cache, serializers that query, throttles) through sync_to_async.
+Request and response bodies match the sync views. urls.py routes to these when
+API_ASYNC_VIEWS is set.
+"""
+import json
+import logging
+from io import BytesIO
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import JsonResponse, QueryDict
+from django.http.multipartparser import MultiPartParser, MultiPartParserError
+from django.urls import path
+from django.utils.datastructures import MultiValueDict
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from rest_framework.permissions import AllowAny, IsAuthenticated
+
+from ...auth.asynchttp import get_async_client
+from ..authentication import CachedJWTAuthentication
+from ..serializers import (
+    FeedChatifySerializer,
+    Otpserializer,
+    ProfileImageUploadSerializer,
+    RegistrationOtpSerializer,
+    SurveyBatchSerializer,
+    SurveyGenerationSerializer,
+)
+from ..surveybatch import abatch_events, agenerate_batch, validate_specs
+from ..surveygen import agenerate_questions, astream_questions, asurvey_events, survey_response
+from ..throttles import OtpIssueThrottle
+from .views import event_stream_response
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+def parse_request_data(request):
+    if request.content_type == 'application/json':
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError as e:
+            raise exceptions.ParseError(f"JSON parse error - {e}")
+    if request.method == 'POST':
+        data, files = request.POST, request.FILES
+    elif request.content_type == 'multipart/form-data':
+        # django only parses POST bodies itself
+        try:
+            data, files = MultiPartParser(
+                request.META, BytesIO(request.body), request.upload_handlers, request.encoding
+            ).parse()
+        except MultiPartParserError as e:
+            raise exceptions.ParseError(f"Multipart form parse error - {e}")
+    else:
+        data, files = QueryDict(request.body, encoding=request.encoding), MultiValueDict()
+    return {**data.dict(), **files.dict()}
+
+
+async def upload_to_cloudinary(image):
+    """
+    cloudinary.uploader.upload() as one async request to the upload API, signed the same way.
+    """
+    import cloudinary
+    import cloudinary.utils
+
+    cloudinary.config(**settings.CLOUDINARY)
+    params = cloudinary.utils.sign_request(cloudinary.utils.build_upload_params(), {})
+    image.seek(0)
+    response = await get_async_client().post(
+        cloudinary.utils.cloudinary_api_url('upload'),
+        data={key: value for key, value in params.items() if value},
+        files={'file': (image.name, image.read(), image.content_type)},
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+class AsyncAPIView(View):
+    permission_classes = [AllowAny]
+    throttle_classes = []
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # JWT only, like APIView
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        authenticator = CachedJWTAuthentication()
+        try:
+            request.data = parse_request_data(request)
+            result = await sync_to_async(authenticator.authenticate)(request)
+            request.user, request.auth = result or (AnonymousUser(), None)
+
+            for permission in [permission() for permission in self.permission_classes]:
+                if not permission.has_permission(request, self):
+                    if not request.user.is_authenticated:
+                        raise exceptions.NotAuthenticated()
+                    raise exceptions.PermissionDenied()
+
+            for throttle in [throttle() for throttle in self.throttle_classes]:
+                if not await sync_to_async(throttle.allow_request)(request, self):
+                    raise exceptions.Throttled(throttle.wait())
+
+            return await super().dispatch(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return self.handle_exception(exc, authenticator.authenticate_header(request))
+
+    def handle_exception(self, exc, auth_header):
+        data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+        response = JsonResponse(data, status=exc.status_code, safe=False)
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            response['WWW-Authenticate'] = auth_header
+        if getattr(exc, 'wait', None):
+            response['Retry-After'] = str(int(exc.wait))
+        return response
+
+
+class AsyncSurveyGenerationView(AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+
+    async def post(self, request):
+        try:
+            serializer = SurveyGenerationSerializer(data=request.data)
+            if not serializer.is_valid():
+                return JsonResponse({
+                    "status": "error",
+                    "message": "Invalid request data",
+                    "errors": serializer.errors
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            data = serializer.validated_data
+            if not settings.GOOGLE_API_KEY:
+                return JsonResponse({
+                    "status": "error",
+                    "message": "AI service configuration error. Please contact administrator."
+                }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+            questions, cached = await agenerate_questions(
+                data['description'], data['question_count'], data['survey_type'],
+                bypass_cache=data['bypass_cache'], refresh_cache=data['refresh_cache'],
+            )
+            if not questions:
+                return JsonResponse({
+                    "status": "error",
+                    "message": "Failed to generate survey questions"
+                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+            return JsonResponse(
+                survey_response(questions, data['description'], data['survey_type'], request.user, cached=cached)
+            )
+
+        except Exception as e:
+            logger.error(f"Error in survey generation: {e}")
+            return JsonResponse({
+                "status": "error",
+                "message": "Internal server error occurred"
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+
+class AsyncSurveyGenerationStreamView(AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+
+    async def post(self, request):
+        serializer = SurveyGenerationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return JsonResponse({
+                "status": "error",
+                "message": "Invalid request data",
+                "errors": serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if not settings.GOOGLE_API_KEY:
+            return JsonResponse({
+                "status": "error",
+                "message": "AI service configuration error. Please contact administrator."
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        data = serializer.validated_data
+        events = astream_questions(
+            data['description'], data['question_count'], data['survey_type'],
+            bypass_cache=data['bypass_cache'], refresh_cache=data['refresh_cache'],
+        )
+        return event_stream_response(asurvey_events(events, data['description'], data['survey_type'], request.user))
+
+
+class AsyncSurveyGenerationBatchView(AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+
+    async def post(self, request):
+        serializer = SurveyBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return JsonResponse({
+                "status": "error",
+                "message": "Invalid request data",
+                "errors": serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if not settings.GOOGLE_API_KEY:
+            return JsonResponse({
+                "status": "error",
+                "message": "AI service configuration error. Please contact administrator."
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        results = agenerate_batch(
+            validate_specs(serializer.validated_data['surveys']), request.user,
+            settings.SURVEY_BATCH_CONCURRENCY, settings.SURVEY_BATCH_ITEM_TIMEOUT,
+        )
+        return event_stream_response(abatch_events(results))
+
+class AsyncFeedChatifyView(AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+
+    async def post(self, request):
+        import httpx  # imported on first use, like asynchttp.py
+
+        serializer = FeedChatifySerializer(data=request.data)
+        if not serializer.is_valid():
+            return JsonResponse({"msg": "Chatify feed update failed"}, status=status.HTTP_401_UNAUTHORIZED)
+        raw_text = serializer.validated_data.get("content")
+        if len(raw_text) > 10000:
+            return JsonResponse({"msg": "Content exceeds maximum length of 6000 characters"},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            response = await get_async_client().post(
+                settings.CHATIFY_FEED_URL,
+                json={"email": request.user.email, "raw_text": raw_text}, timeout=settings.CHATIFY_TIMEOUT
+            )
+            if response.status_code == 200:
+                return JsonResponse({"msg": "Chatify feed updated successfully", "data": response.json()})
+            return JsonResponse({"msg": "Failed to update Chatify feed"}, status=status.HTTP_400_BAD_REQUEST)
+        except httpx.HTTPError as e:
+            return JsonResponse({"msg": "internal server error", "error": str(e)},
+                                status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AsyncProfileImageUploadView(AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+
+    async def put(self, request):
+        serializer = ProfileImageUploadSerializer(data=request.data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        image = serializer.validated_data["profile_image"]
+        if not image.name.lower().endswith(IMAGE_EXTENSIONS):
+            return JsonResponse(["Image must be a PNG, JPG, or JPEG file."], safe=False,
+                                status=status.HTTP_400_BAD_REQUEST)
+
+        uploaded = await upload_to_cloudinary(image)
+
+        user = request.user
+        user.profile = uploaded["secure_url"]
+        await sync_to_async(user.save)(update_fields=["profile"])
+        return JsonResponse({"msg": "Profile image updated successfully", "url": user.profile})
+
+    patch = put
+
+
+class AsyncOtpView(AsyncAPIView):
+    """
+    Validation (existence checks) and the send run in threads; the send stays off the
+    request thread because in eager mode it is a Brevo call.
+    """
+    throttle_classes = [OtpIssueThrottle]
+    serializer_class = Otpserializer
+    send = None
+
+    async def post(self, request):
+        serializer = self.serializer_class(data=request.data)
+        if not await sync_to_async(serializer.is_valid)():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        await sync_to_async(getattr(serializer, self.send), thread_sensitive=False)()
+        return JsonResponse({"msg": "OTP sent successfully"})
+
+
+class AsyncAuthForRegistration(AsyncOtpView):
+    serializer_class = RegistrationOtpSerializer
+    send = 'send_register_otp'
+
+
+class AsyncAuthforUpdatePassword(AsyncOtpView):
+    permission_classes = [IsAuthenticated]
+    send = 'send_update_password_otp'
+
+
+class AsyncAuthforForgetPassword(AsyncOtpView):
+    send = 'send_forget_password_otp'
+
+
+class AsyncAuthforLogin(AsyncOtpView):
+    send = 'send_login_otp'
+
+
+# url name -> async view, see with_async_views()
+ASYNC_VIEWS = {
+    'auth-register-view': AsyncAuthForRegistration,
+    'auth-update-password-view': AsyncAuthforUpdatePassword,
+    'auth-forget-password-view': AsyncAuthforForgetPassword,
+    'auth-login-view': AsyncAuthforLogin,
+    'profile-image-upload-view': AsyncProfileImageUploadView,
+    'feed-chatify-view': AsyncFeedChatifyView,
+    'survey-generation-view': AsyncSurveyGenerationView,
+    'survey-generation-stream-view': AsyncSurveyGenerationStreamView,
+    'survey-generation-batch-view': AsyncSurveyGenerationBatchView,
+}
+
+
+def with_async_views(urlpatterns):
+    """
+    urlpatterns with every route that has an async version pointed at it.
+    """
+    return [
+        path(str(pattern.pattern), ASYNC_VIEWS[pattern.name].as_view(), name=pattern.name)
+        if pattern.name in ASYNC_VIEWS else pattern
+        for pattern in urlpatterns
+    ]
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from  .views  import  (RegisterView,CustomTokenObtainPairView,UpdatePasswordView,ProfileImageUploadView
                        ,AuthForRegistration
@@ -9,7 +10,11 @@ from  .views  import  (RegisterView,CustomTokenObtainPairView,UpdatePasswordView
                             UsernameCheckView,ViewUser,
                             UpdateProfileView,
                             FeedChatifyView,
-                            SurveyGenerationView
+                            SurveyGenerationView,
+                            SurveyGenerationStreamView,
+                            SurveyGenerationBatchView,
+                            InvitationCampaignView,
+                            InvitationCampaignStatusView
                        )
 from rest_framework_simplejwt.views import TokenRefreshView
 
@@ -30,6 +35,16 @@ urlpatterns=[
     path('profile/update/', UpdateProfileView.as_view(), name='update-profile-view'),
     path('chat/feed/', FeedChatifyView.as_view(), name='feed-chatify-view'),
     path('generate-survey/', SurveyGenerationView.as_view(), name='survey-generation-view'),
+    path('generate-survey/stream/', SurveyGenerationStreamView.as_view(), name='survey-generation-stream-view'),
+    path('generate-survey/batch/', SurveyGenerationBatchView.as_view(), name='survey-generation-batch-view'),
+    path('invitations/', InvitationCampaignView.as_view(), name='invitation-campaign-view'),
+    path('invitations/<int:pk>/', InvitationCampaignStatusView.as_view(), name='invitation-campaign-status-view'),
 
 
-    ]
\ No newline at end of file
+    ]
+
+if settings.API_ASYNC_VIEWS:
+    # ASGI deployments: the endpoints that wait on Gemini, Chatify, Cloudinary or Brevo
+    from .asyncviews import with_async_views
+
+    urlpatterns = with_async_views(urlpatterns)
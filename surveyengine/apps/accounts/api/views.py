@@ -13,7 +13,9 @@ from ..serializers import(
     ,ViewUserSerializer
     ,ProfileUpdateSerializer
     ,FeedChatifySerializer,
-    SurveyGenerationSerializer
+    SurveyGenerationSerializer,
+    SurveyBatchSerializer,
+    InvitationCampaignSerializer
 
     
     
@@ -23,13 +25,19 @@ from ..serializers import(
     )
 from ..profile_doc import profile_image_upload_doc
 from rest_framework.parsers import MultiPartParser, FormParser
-from drf_yasg.utils import swagger_auto_schema
+from ..apidoc import swagger_auto_schema
 from ..models import User  # Adjust this import to match your project structure
-import json
+from ..throttles import OtpIssueThrottle, OtpVerifyThrottle
+from ..permissions import IsAdminRole
+from ..models import InvitationCampaign
+from ..invitations import create_campaign, campaign_summary
+from ...auth.emailqueue import enqueue_invitation_campaign
+from ..surveygen import generate_questions, stream_questions, survey_events, survey_response
+from ..surveybatch import batch_events, generate_batch, validate_specs
+from django.conf import settings
+from django.http import StreamingHttpResponse
 import logging
-import os
 import requests
-from typing import Dict, List, Any
 
 logger = logging.getLogger(__name__)
 
@@ -37,12 +45,14 @@ logger = logging.getLogger(__name__)
 class RegisterView(generics.CreateAPIView):
     serializer_class = UserRegistrationSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [OtpVerifyThrottle]
     queryset = User.objects.all()
 
 # 2. Custom Token Obtain Pair View: Using GenericAPIView with a serializer
 class CustomTokenObtainPairView(generics.GenericAPIView):
     serializer_class = CustomTokenObtainPairSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [OtpVerifyThrottle]
     
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -53,6 +63,7 @@ class CustomTokenObtainPairView(generics.GenericAPIView):
 class ForgetPasswordView(generics.GenericAPIView):
     serializer_class = ForgetPasswordSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [OtpVerifyThrottle]
 
     @swagger_auto_schema(
         request_body=ForgetPasswordSerializer,
@@ -147,6 +158,7 @@ class ProfileImageUploadView(generics.UpdateAPIView):
 class AuthForRegistration(APIView):
  
     permission_classes = [AllowAny]
+    throttle_classes = [OtpIssueThrottle]
     @swagger_auto_schema(request_body=RegistrationOtpSerializer)
     def post(self, request):
         serializer = RegistrationOtpSerializer(data=request.data)
@@ -157,6 +169,7 @@ class AuthForRegistration(APIView):
     
 class AuthforUpdatePassword(APIView):
     permission_classes=[IsAuthenticated]
+    throttle_classes = [OtpIssueThrottle]
     
     @swagger_auto_schema(request_body=Otpserializer)
     def post(self,request):
@@ -168,6 +181,7 @@ class AuthforUpdatePassword(APIView):
 
 class AuthforForgetPassword(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [OtpIssueThrottle]
 
     @swagger_auto_schema(request_body=Otpserializer)
     def post(self, request):
@@ -179,6 +193,7 @@ class AuthforForgetPassword(APIView):
     
 class AuthforLogin(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [OtpIssueThrottle]
 
     @swagger_auto_schema(request_body=Otpserializer)
     def post(self, request):
@@ -220,8 +235,6 @@ class UpdateProfileView(generics.UpdateAPIView):
         request_body=ProfileUpdateSerializer
     )
     def update(self, request, *args, **kwargs):
-        print(request.data, "the data is ")
-
         data = request.data.copy()
         # Make sure to get raw values, not lists (if coming from form-data)
         social_links = {
@@ -243,8 +256,6 @@ class UpdateProfileView(generics.UpdateAPIView):
         return Response({"msg": "Profile updated successfully"}, status=status.HTTP_200_OK)
 
 
-import requests
-
 class FeedChatifyView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -266,8 +277,8 @@ class FeedChatifyView(APIView):
 
         try:
             response = requests.post(
-                "http://localhost:8005/chat/feed/",
-                json={"email": email, "raw_text": raw_text},timeout=30
+                settings.CHATIFY_FEED_URL,
+                json={"email": email, "raw_text": raw_text}, timeout=settings.CHATIFY_TIMEOUT
             )
             if response.status_code == 200:
                 print(response.json(), "the response is ")
@@ -287,65 +298,6 @@ class SurveyGenerationView(APIView):
     """
     permission_classes = [IsAuthenticated]
     
-    def __init__(self):
-        super().__init__()
-        self.gemini_api_key = os.getenv("GOOGLE_API_KEY")
-        if not self.gemini_api_key:
-            logger.error("GOOGLE_API_KEY not found in environment variables")
-
-    def ask_gemini(self, query: str, system_message: str = None):
-        """
-        Direct Gemini API integration for generating survey questions
-        """
-        if not self.gemini_api_key:
-            return {"message": "Server configuration error: Missing Gemini API key."}, 500
-
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key={self.gemini_api_key}"
-
-        # Combine system message and query
-        full_prompt = f"{system_message}\n\n{query}" if system_message else query
-
-        payload = {
-            "contents": [
-                {
-                    "parts": [
-                        {
-                            "text": full_prompt
-                        }
-                    ]
-                }
-            ],
-            "generationConfig": {
-                "temperature": 0.7,
-                "topK": 40,
-                "topP": 0.95,
-                "maxOutputTokens": 2048,
-            }
-        }
-
-        headers = {
-            "Content-Type": "application/json"
-        }
-
-        try:
-            response = requests.post(url, json=payload, headers=headers, timeout=30)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            if 'candidates' in data and len(data['candidates']) > 0:
-                if 'content' in data['candidates'][0] and 'parts' in data['candidates'][0]['content']:
-                    return data['candidates'][0]['content']['parts'][0]['text']
-            
-            return "Sorry, I couldn't generate a response."
-            
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Gemini API request failed: {e}")
-            return f"API request failed: {str(e)}"
-        except Exception as e:
-            logger.error(f"Unexpected error in Gemini API call: {e}")
-            return f"Unexpected error: {str(e)}"
-
     @swagger_auto_schema(
         request_body=SurveyGenerationSerializer,
         responses={
@@ -368,7 +320,8 @@ class SurveyGenerationView(APIView):
                             'question_count': 5,
                             'survey_type': 'government',
                             'ai_generated': True,
-                            'model': 'gemini-1.5-flash'
+                            'model': 'gemini-1.5-flash',
+                            'cached': False
                         }
                     }
                 }
@@ -401,14 +354,17 @@ class SurveyGenerationView(APIView):
             question_count = validated_data['question_count']
             survey_type = validated_data['survey_type']
             
-            if not self.gemini_api_key:
+            if not settings.GOOGLE_API_KEY:
                 return Response({
                     "status": "error",
                     "message": "AI service configuration error. Please contact administrator."
                 }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
             
             # Generate survey questions using Gemini
-            questions = self._generate_survey_questions(description, question_count, survey_type)
+            questions, cached = generate_questions(
+                description, question_count, survey_type,
+                bypass_cache=validated_data['bypass_cache'], refresh_cache=validated_data['refresh_cache'],
+            )
             
             if not questions:
                 return Response({
@@ -416,18 +372,8 @@ class SurveyGenerationView(APIView):
                     "message": "Failed to generate survey questions"
                 }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             
-            return Response({
-                "status": "success",
-                "questions": questions,
-                "metadata": {
-                    "description": description,
-                    "question_count": len(questions),
-                    "survey_type": survey_type,
-                    "ai_generated": True,
-                    "model": "gemini-1.5-flash",
-                    "generated_by": request.user.email if request.user.is_authenticated else "anonymous"
-                }
-            }, status=status.HTTP_200_OK)
+            return Response(survey_response(questions, description, survey_type, request.user, cached=cached),
+                            status=status.HTTP_200_OK)
             
         except Exception as e:
             logger.error(f"Error in survey generation: {e}")
@@ -435,223 +381,124 @@ class SurveyGenerationView(APIView):
                 "status": "error",
                 "message": "Internal server error occurred"
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    
-    def _generate_survey_questions(self, description: str, question_count: int, survey_type: str) -> List[Dict[str, Any]]:
-        """
-        Generate survey questions using Gemini AI
-        
-        Args:
-            description: Survey description and requirements
-            question_count: Number of questions to generate
-            survey_type: Type of survey
-            
-        Returns:
-            List of generated questions with options
-        """
-        try:
-            # Create system message for survey generation
-            system_message = f"""
-You are an expert survey designer for government and organizational research. Your task is to create high-quality, unbiased survey questions that will gather meaningful data.
-
-🎯 Survey Context:
-- Type: {survey_type}
-- Purpose: Data collection for policy making and analysis
-- Target: General public/citizens
-- Format: Digital survey platform
-
-📋 Requirements:
-1. Generate EXACTLY {question_count} questions
-2. Mix different question types: multiple-choice, yes-no, rating, text
-3. Questions should be clear, unbiased, and professionally written
-4. Include 2-5 relevant options for multiple-choice questions
-5. Ensure questions gather actionable insights
-6. Use simple, accessible language
-7. Avoid leading or loaded questions
-
-🏛️ Government Survey Best Practices:
-- Neutral and objective tone
-- Culturally sensitive language
-- Accessibility for all education levels
-- Data privacy considerations
-- Actionable for policy decisions
-
-📝 Output Format (JSON):
-Return ONLY a valid JSON array where each question object has:
-{{
-  "id": "1", 
-  "type": "multiple-choice" | "text" | "yes-no" | "rating",
-  "question": "Clear question text",
-  "options": ["option1", "option2", "option3"] (only for multiple-choice),
-  "required": true/false
-}}
-
-🚫 Avoid:
-- Personal or sensitive information requests
-- Leading questions that suggest desired answers
-- Overly technical jargon
-- Questions that could be discriminatory
-"""
-
-            # Create the prompt for question generation
-            prompt = f"""
-Based on the following survey description, generate {question_count} professional survey questions:
-
-DESCRIPTION: "{description}"
-
-Requirements:
-- Create a mix of question types (multiple-choice, yes-no, rating, text)
-- Questions should directly relate to the survey description
-- Include clear, actionable options for multiple-choice questions
-- Make questions accessible to general public
-- Ensure questions will provide valuable insights for decision-making
-
-Please generate the questions as a JSON array following the specified format. Return ONLY the JSON array, no additional text.
-"""
-
-            # Generate response using Gemini
-            response = self.ask_gemini(prompt, system_message)
-            
-            # Parse the JSON response
-            questions = self._parse_ai_response(response, question_count)
-            
-            return questions
-            
-        except Exception as e:
-            logger.error(f"Error generating survey questions: {e}")
-            return self._create_fallback_questions(question_count)
-    
-    def _parse_ai_response(self, response: str, expected_count: int) -> List[Dict[str, Any]]:
-        """
-        Parse AI response and extract survey questions
-        
-        Args:
-            response: Raw AI response
-            expected_count: Expected number of questions
-            
-        Returns:
-            List of parsed question objects
-        """
-        try:
-            # Try to extract JSON from response
-            response_clean = response.strip()
-            
-            # Find JSON array in response
-            start_idx = response_clean.find('[')
-            end_idx = response_clean.rfind(']') + 1
-            
-            if start_idx != -1 and end_idx > start_idx:
-                json_str = response_clean[start_idx:end_idx]
-                questions = json.loads(json_str)
-                
-                # Validate and format questions
-                formatted_questions = []
-                for i, q in enumerate(questions[:expected_count]):
-                    formatted_q = self._format_question(q, i + 1)
-                    if formatted_q:
-                        formatted_questions.append(formatted_q)
-                
-                return formatted_questions
-            
-            # Fallback: create default questions if parsing fails
-            return self._create_fallback_questions(expected_count)
-            
-        except (json.JSONDecodeError, KeyError, IndexError) as e:
-            logger.error(f"Error parsing AI response: {e}")
-            return self._create_fallback_questions(expected_count)
-    
-    def _format_question(self, question_data: Dict, question_id: int) -> Dict[str, Any]:
-        """
-        Format and validate a single question
-        
-        Args:
-            question_data: Raw question data from AI
-            question_id: Question ID number
-            
-        Returns:
-            Formatted question object or None if invalid
-        """
-        try:
-            formatted = {
-                "id": str(question_id),
-                "type": question_data.get('type', 'text'),
-                "question": question_data.get('question', '').strip(),
-                "required": question_data.get('required', True)
-            }
-            
-            # Validate question type
-            valid_types = ['multiple-choice', 'text', 'yes-no', 'rating']
-            if formatted['type'] not in valid_types:
-                formatted['type'] = 'text'
-            
-            # Add options for multiple-choice questions
-            if formatted['type'] == 'multiple-choice':
-                options = question_data.get('options', [])
-                if isinstance(options, list) and len(options) >= 2:
-                    formatted['options'] = [str(opt).strip() for opt in options[:5]]  # Max 5 options
-                else:
-                    # Convert to text if no valid options
-                    formatted['type'] = 'text'
-            
-            # Validate question text
-            if len(formatted['question']) < 10:
-                return None
-                
-            return formatted
-            
-        except Exception as e:
-            logger.error(f"Error formatting question: {e}")
-            return None
-    
-    def _create_fallback_questions(self, count: int) -> List[Dict[str, Any]]:
-        """
-        Create fallback questions if AI generation fails
-        
-        Args:
-            count: Number of questions to create
-            
-        Returns:
-            List of fallback question objects
-        """
-        fallback_questions = [
-            {
-                "id": "1",
-                "type": "multiple-choice", 
-                "question": "How would you rate your overall satisfaction with current services?",
-                "options": ["Excellent", "Good", "Average", "Poor", "Very Poor"],
-                "required": True
-            },
-            {
-                "id": "2",
-                "type": "yes-no",
-                "question": "Do you think improvements are needed in this area?", 
-                "required": True
-            },
-            {
-                "id": "3",
-                "type": "rating",
-                "question": "On a scale of 1-5, how important is this topic to you?",
-                "required": True
-            },
-            {
-                "id": "4", 
-                "type": "text",
-                "question": "What specific improvements would you suggest?",
-                "required": False
-            },
-            {
-                "id": "5",
-                "type": "multiple-choice",
-                "question": "What is your primary concern in this area?",
-                "options": ["Accessibility", "Quality", "Cost", "Availability", "Other"],
-                "required": True
-            }
-        ]
-        
-        return fallback_questions[:count]
-        
 
 
 
+def event_stream_response(events):
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx: pass each event on as it is written
+    return response
+
+
+class SurveyGenerationStreamView(APIView):
+    """
+    generate-survey/ as server-sent events: a `question` event for each question as soon
+    as Gemini has written it, then `done` with the generate-survey/ response body
+    (`error` if generation breaks off).
+    """
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        request_body=SurveyGenerationSerializer,
+        responses={
+            200: {'description': 'text/event-stream of question events and a final done event'},
+            400: {'description': 'Invalid request data'},
+            401: {'description': 'Authentication required'},
+        }
+    )
+    def post(self, request):
+        serializer = SurveyGenerationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                "status": "error",
+                "message": "Invalid request data",
+                "errors": serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if not settings.GOOGLE_API_KEY:
+            return Response({
+                "status": "error",
+                "message": "AI service configuration error. Please contact administrator."
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
+        data = serializer.validated_data
+        events = stream_questions(
+            data['description'], data['question_count'], data['survey_type'],
+            bypass_cache=data['bypass_cache'], refresh_cache=data['refresh_cache'],
+        )
+        return event_stream_response(survey_events(events, data['description'], data['survey_type'], request.user))
 
 
+class SurveyGenerationBatchView(APIView):
+    """
+    Several generate-survey requests at once, e.g. one per survey type for a new district.
+    Server-sent events: a `result` per survey as it completes ({"index": <position in
+    surveys>, ...generate-survey body} or {"index", "status": "error", "message"}), then
+    `done` with the success / failure counts.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        request_body=SurveyBatchSerializer,
+        responses={
+            200: {'description': 'text/event-stream of result events and a final done event'},
+            400: {'description': 'Invalid request data'},
+            401: {'description': 'Authentication required'},
+        }
+    )
+    def post(self, request):
+        serializer = SurveyBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                "status": "error",
+                "message": "Invalid request data",
+                "errors": serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if not settings.GOOGLE_API_KEY:
+            return Response({
+                "status": "error",
+                "message": "AI service configuration error. Please contact administrator."
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        results = generate_batch(
+            validate_specs(serializer.validated_data['surveys']), request.user,
+            settings.SURVEY_BATCH_CONCURRENCY, settings.SURVEY_BATCH_ITEM_TIMEOUT,
+        )
+        return event_stream_response(batch_events(results))
+
+class InvitationCampaignView(APIView):
+    """
+    Bulk survey invitations: recipients are stored, then sent in Brevo batches by the email worker.
+    """
+    permission_classes = [IsAdminRole]
+
+    @swagger_auto_schema(
+        request_body=InvitationCampaignSerializer,
+        operation_description="Invite a list of citizens/officers to a survey"
+    )
+    def post(self, request):
+        serializer = InvitationCampaignSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        campaign = create_campaign(
+            subject=data['subject'],
+            survey_url=data['survey_url'],
+            message=data['message'],
+            recipients=data['recipients'],
+            created_by=request.user,
+        )
+        enqueue_invitation_campaign(campaign.pk)
+        campaign.refresh_from_db()
+        return Response(campaign_summary(campaign), status=status.HTTP_202_ACCEPTED)
+
+
+class InvitationCampaignStatusView(APIView):
+    permission_classes = [IsAdminRole]
+
+    @swagger_auto_schema(operation_description="Delivery status of an invitation campaign")
+    def get(self, request, pk):
+        try:
+            campaign = InvitationCampaign.objects.get(pk=pk)
+        except InvitationCampaign.DoesNotExist:
+            return Response({"msg": "Campaign not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(campaign_summary(campaign), status=status.HTTP_200_OK)
@@ -0,0 +1,32 @@
+"""
+swagger_auto_schema without importing drf_yasg at worker boot.
+
+The decorator here only records its arguments; apply_schemas() hands them to drf_yasg's
+swagger_auto_schema the first time the docs are built (config/urls.py schema_view). The
+views are unchanged until then, which is fine: nothing but the schema generator reads
+the overrides. manual_parameters may be a function returning the list, so that
+drf_yasg.openapi objects are built then too.
+"""
+import threading
+
+_pending = []
+_lock = threading.Lock()
+
+
+def swagger_auto_schema(**kwargs):
+    def decorator(view_method):
+        with _lock:
+            _pending.append((view_method, kwargs))
+        return view_method
+    return decorator
+
+
+def apply_schemas():
+    from drf_yasg.utils import swagger_auto_schema as apply
+
+    with _lock:
+        while _pending:
+            view_method, kwargs = _pending.pop(0)
+            if callable(kwargs.get('manual_parameters')):
+                kwargs = {**kwargs, 'manual_parameters': kwargs['manual_parameters']()}
+            apply(**kwargs)(view_method)
@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.accounts'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+
+        from apps.auth.otptemplates import precompile_otp_templates
+        from .existence import index_user
+        from .models import User
+        from .usercache import invalidate_on_change
+
+        precompile_otp_templates()
+        post_save.connect(invalidate_on_change, sender=User, dispatch_uid='usercache-save')
+        post_delete.connect(invalidate_on_change, sender=User, dispatch_uid='usercache-delete')
+        post_save.connect(index_user, sender=User, dispatch_uid='existence-index')
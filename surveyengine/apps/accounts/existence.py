@@ -0,0 +1,265 @@
+"""
+"Is this username / email taken?" without a query for the common answer.
+
+Each kind has a Bloom filter kept in a plain redis bitmap (no RedisBloom module needed):
+
+    KEY: exists:bloom:<kind>          bitmap sized for EXISTENCE_BLOOM_CAPACITY values at
+                                      EXISTENCE_BLOOM_ERROR_RATE, k bits set per value
+    KEY: exists:bloom:<kind>:ready    set by rebuild_existence_index; without it every
+                                      check goes to the database
+    KEY: exists:neg:<kind>:<value>    "not taken" confirmed by the database, EXISTENCE_NEGATIVE_TTL
+    KEY: exists:bloom:<kind>:gen      bumped by every add, guards negative cache writes
+
+A Bloom filter never misses a value that was added, so "no" is final and skips the
+database; "maybe" (taken, or a false positive) is settled with one exists() query. A
+confirmed false positive is remembered in the negative cache, so someone typing the same
+name again does not query again. The filter, ready flag and negative cache are read in
+one script call.
+
+Values are added in post_save, before the row commits, so the filter is never behind
+the table. A check that raced the insert may still have read "not taken" from the
+database, so a negative entry is only written if no value was added since the check
+read the generation, and the value's negative entry is deleted again once the row
+commits. Values are normalized once (normalize(): stripped and lowercased, like the
+lower(email) / lower(username) unique indexes) and that form is used for the filter, the
+negative cache and the query that settles a "maybe".
+Renamed usernames stay in the filter as false positives until the next rebuild.
+"""
+import hashlib
+import logging
+import math
+
+from django.conf import settings
+from django.db import transaction
+from redis.exceptions import RedisError
+
+from ..auth.RedisUtils.maincache import get_redis
+
+logger = logging.getLogger(__name__)
+
+KINDS = ('username', 'email')
+
+# returns {0 = definitely not taken, 1 = maybe taken, -1 = filter not built yet, generation}
+CHECK_SCRIPT = """
+local gen = redis.call('GET', KEYS[4]) or '0'
+if redis.call('EXISTS', KEYS[3]) == 1 then
+    return {0, gen}
+end
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    return {-1, gen}
+end
+for i = 1, #ARGV do
+    if redis.call('GETBIT', KEYS[1], ARGV[i]) == 0 then
+        return {0, gen}
+    end
+end
+return {1, gen}
+"""
+
+# sets the bits in the live filter and, while a rebuild is running, in the new one too
+ADD_SCRIPT = """
+for i = 1, #ARGV do
+    redis.call('SETBIT', KEYS[1], ARGV[i], 1)
+end
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    for i = 1, #ARGV do
+        redis.call('SETBIT', KEYS[2], ARGV[i], 1)
+    end
+end
+redis.call('DEL', KEYS[3])
+redis.call('INCR', KEYS[4])
+return 1
+"""
+
+# writes the negative entry only if nothing was added since the check read the generation
+REMEMBER_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], 1, 'EX', ARGV[2])
+return 1
+"""
+
+
+def normalize(value):
+    return value.strip().lower()
+
+
+def bloom_size(capacity, error_rate):
+    """
+    (bits, hashes) for `capacity` values at a false positive rate of `error_rate`.
+    """
+    bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+    return bits, max(1, round(bits / capacity * math.log(2)))
+
+
+class ExistenceIndex:
+    """
+    Every method takes values already passed through normalize().
+    """
+
+    def __init__(self, kind, redis=None):
+        self.kind = kind
+        self.redis = redis or get_redis()
+        self.bits, self.hashes = bloom_size(settings.EXISTENCE_BLOOM_CAPACITY, settings.EXISTENCE_BLOOM_ERROR_RATE)
+        self._check = self.redis.register_script(CHECK_SCRIPT)
+        self._add = self.redis.register_script(ADD_SCRIPT)
+        self._remember = self.redis.register_script(REMEMBER_SCRIPT)
+
+    @property
+    def key(self):
+        return f"exists:bloom:{self.kind}"
+
+    @property
+    def ready_key(self):
+        return f"{self.key}:ready"
+
+    @property
+    def rebuild_key(self):
+        return f"{self.key}:new"
+
+    @property
+    def generation_key(self):
+        return f"{self.key}:gen"
+
+    def negative_key(self, value):
+        return f"exists:neg:{self.kind}:{value}"
+
+    def positions(self, value):
+        """
+        k bit offsets by double hashing one blake2b digest.
+        """
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:], 'big') | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def might_contain(self, value):
+        """
+        (answer, generation): answer is 0 definitely absent, 1 maybe present, -1 unknown
+        (not built); pass the generation to remember_absent().
+        """
+        answer, generation = self._check(
+            keys=[self.key, self.ready_key, self.negative_key(value), self.generation_key],
+            args=self.positions(value),
+        )
+        return answer, generation
+
+    def add(self, value):
+        self._add(
+            keys=[self.key, self.rebuild_key, self.negative_key(value), self.generation_key],
+            args=self.positions(value),
+        )
+
+    def remember_absent(self, value, generation):
+        """
+        Caches "not taken" unless a value was added after might_contain() returned `generation`.
+        """
+        return bool(self._remember(
+            keys=[self.negative_key(value), self.generation_key],
+            args=[generation, settings.EXISTENCE_NEGATIVE_TTL],
+        ))
+
+    def forget_absent(self, value):
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.delete(self.negative_key(value))
+        pipe.incr(self.generation_key)
+        pipe.execute()
+
+    def rebuild(self, values, chunk_size=5000):
+        """
+        Builds a fresh filter next to the live one and swaps it in. Values added while
+        this runs go into both (ADD_SCRIPT), so none are lost by the swap.
+        """
+        self.redis.delete(self.rebuild_key)
+        self.redis.setbit(self.rebuild_key, self.bits - 1, 0)  # allocate; marks the rebuild as running
+        count = 0
+        pipe = self.redis.pipeline(transaction=False)
+        for value in values:
+            for position in self.positions(value):
+                pipe.setbit(self.rebuild_key, position, 1)
+            count += 1
+            if count % chunk_size == 0:
+                pipe.execute()
+        pipe.execute()
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.rename(self.rebuild_key, self.key)
+        pipe.set(self.ready_key, 1)
+        pipe.execute()
+        return count
+
+
+_indexes = {}
+
+
+def get_existence_index(kind):
+    if kind not in _indexes:
+        _indexes[kind] = ExistenceIndex(kind)
+    return _indexes[kind]
+
+
+def is_taken(kind, value):
+    """
+    True if a user with this username / email exists. Only queries on a Bloom "maybe".
+    """
+    from .models import User
+
+    if not value:
+        return False
+    value = normalize(value)
+    try:
+        index = get_existence_index(kind)
+        answer, generation = index.might_contain(value)
+        if answer == 0:
+            return False
+    except RedisError as e:
+        logger.warning("existence index unavailable, querying: %s", e)
+        return User.objects.matching(**{kind: value}).exists()
+
+    taken = User.objects.matching(**{kind: value}).exists()
+    if not taken:
+        try:
+            index.remember_absent(value, generation)
+        except RedisError:
+            pass
+    return taken
+
+
+def username_taken(value):
+    return is_taken('username', value)
+
+
+def email_taken(value):
+    return is_taken('email', value)
+
+
+def _forget_absent(index, value):
+    try:
+        index.forget_absent(value)
+    except RedisError as e:
+        logger.warning("could not clear the negative cache for %r: %s", value, e)
+
+
+def index_user(sender, instance, update_fields=None, **kwargs):
+    """
+    post_save receiver: adds the user's username and email to the filters, and drops
+    any "not taken" a concurrent check cached for them once the row is committed.
+    Saves limited to other fields (password, last_login) are skipped.
+    """
+    for kind in KINDS:
+        if update_fields is not None and kind not in update_fields:
+            continue
+        value = getattr(instance, kind, None)
+        if value:
+            index = get_existence_index(kind)
+            value = normalize(value)
+            transaction.on_commit(lambda index=index, value=value: _forget_absent(index, value))
+            try:
+                index.add(value)
+            except RedisError as e:
+                # the filter now misses a value, stop trusting it until the next rebuild
+                logger.error("could not index %s %r, disabling the filter: %s", kind, value, e)
+                try:
+                    index.redis.delete(index.ready_key)
+                except RedisError:
+                    pass
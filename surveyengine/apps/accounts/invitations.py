@@ -0,0 +1,104 @@
+"""
+Survey invitation campaigns: creation, dispatch and per-recipient status recording.
+"""
+import logging
+from pathlib import Path
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from django.utils.html import escape, linebreaks
+
+from ..auth.bulkmail import BulkEmailDispatcher, BulkRecipient
+from ..auth.otptemplates import minify_html
+from .models import InvitationCampaign, InvitationRecipient
+
+logger = logging.getLogger(__name__)
+
+INVITATION_TEMPLATE = Path(__file__).resolve().parent.parent / "auth" / "templates" / "invitation" / "survey.html"
+
+
+def render_invitation(campaign):
+    """
+    Campaign-wide values are filled in here; {{ params.name }} is left for Brevo per recipient.
+    """
+    html = minify_html(INVITATION_TEMPLATE.read_text(encoding="utf-8"))
+    html = html.replace("{{ survey_url }}", escape(campaign.survey_url))
+    html = html.replace("{{ message }}", linebreaks(campaign.message, autoescape=True) if campaign.message else "")
+    text = f"{campaign.message}\n\n{campaign.survey_url}\n\nसत्यमेव जयते".strip()
+    return html, text
+
+
+@transaction.atomic
+def create_campaign(subject, survey_url, recipients, message="", created_by=None):
+    """
+    recipients: iterable of {"email": ..., "name": ...}; duplicate emails are dropped.
+    """
+    campaign = InvitationCampaign.objects.create(
+        subject=subject, survey_url=survey_url, message=message, created_by=created_by,
+    )
+    seen = set()
+    rows = []
+    for recipient in recipients:
+        email = recipient["email"].strip().lower()
+        if email in seen:
+            continue
+        seen.add(email)
+        rows.append(InvitationRecipient(campaign=campaign, email=email, name=recipient.get("name") or ""))
+    InvitationRecipient.objects.bulk_create(rows, batch_size=1000)
+    return campaign
+
+
+def _record(result):
+    ids = [recipient.ref for recipient in result.recipients]
+    if not result.ok:
+        InvitationRecipient.objects.filter(pk__in=ids).update(status='failed', error=result.error)
+        return
+
+    now = timezone.now()
+    if len(result.message_ids) == len(ids):
+        rows = [
+            InvitationRecipient(pk=pk, status='sent', message_id=message_id, error='', sent_at=now)
+            for pk, message_id in zip(ids, result.message_ids)
+        ]
+        InvitationRecipient.objects.bulk_update(rows, ['status', 'message_id', 'error', 'sent_at'], batch_size=1000)
+    else:
+        InvitationRecipient.objects.filter(pk__in=ids).update(status='sent', error='', sent_at=now)
+
+
+def dispatch_campaign(campaign_id, retry_failed=False):
+    """
+    Sends every pending (and optionally failed) recipient of the campaign. Safe to call
+    again after a crash: recipients already marked sent are skipped.
+    """
+    campaign = InvitationCampaign.objects.get(pk=campaign_id)
+    statuses = ['pending', 'failed'] if retry_failed else ['pending']
+    pending = [
+        BulkRecipient(email=email, name=name, params={"name": name or "Citizen"}, ref=pk)
+        for pk, email, name in campaign.recipients.filter(status__in=statuses).values_list('pk', 'email', 'name')
+    ]
+
+    InvitationCampaign.objects.filter(pk=campaign.pk).update(status='sending')
+    html, text = render_invitation(campaign)
+    totals = BulkEmailDispatcher(campaign.subject, html, text).dispatch(pending, on_result=_record)
+
+    InvitationCampaign.objects.filter(pk=campaign.pk).update(
+        status='failed' if pending and not totals["sent"] else 'done',
+        finished_at=timezone.now(),
+    )
+    logger.info("invitation campaign %s finished: %s", campaign.pk, totals)
+    return totals
+
+
+def campaign_summary(campaign):
+    counts = {'pending': 0, 'sent': 0, 'failed': 0}
+    for row in campaign.recipients.values('status').annotate(n=Count('id')):
+        counts[row['status']] = row['n']
+    return {
+        "id": campaign.pk,
+        "subject": campaign.subject,
+        "status": campaign.status,
+        "created_at": campaign.created_at,
+        "finished_at": campaign.finished_at,
+        "recipients": counts,
+    }
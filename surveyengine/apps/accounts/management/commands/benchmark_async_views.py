@@ -0,0 +1,185 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings, setup_databases, setup_test_environment, teardown_databases, \
+    teardown_test_environment
+from django.urls import include, path
+
+from apps.accounts.api import urls as api_urls
+from apps.accounts.api.asyncviews import with_async_views
+from apps.accounts.models import User
+from apps.accounts.standins import FakeChatifyServer, FakeGeminiServer, fakeredis_caches, reset_singletons
+from apps.accounts.tokens import RedisRefreshToken
+from apps.auth.asynchttp import close_async_client
+
+from .benchmark_otp_login import summarize
+
+# every request is the same survey; bypass the generation cache so each one reaches Gemini
+ENDPOINTS = {
+    "generate-survey": {"description": "Public transport usage and satisfaction in the district", "question_count": 5,
+                        "bypass_cache": True},
+    "chat-feed": {"content": "Street lights on the main road of ward 12 have been out for a week."},
+}
+PATHS = {"generate-survey": "/api/users/generate-survey/", "chat-feed": "/api/users/chat/feed/"}
+
+
+class Command(BaseCommand):
+    help = ("Sync vs async deployment of an i/o bound endpoint: a burst of requests against a fake Gemini / "
+            "Chatify with fixed latency, served by --sync-workers blocking workers (like gunicorn sync workers) "
+            "and then by one event loop with the async views (like one uvicorn worker). Both run in process "
+            "through django's test clients, so server and network overhead are left out of both sides.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--endpoint", choices=sorted(ENDPOINTS), default="generate-survey")
+        parser.add_argument("--requests", type=int, default=200, help="Requests in the burst, all sent at once.")
+        parser.add_argument("--upstream-latency", type=int, default=500, help="Fake upstream response time in ms.")
+        parser.add_argument("--sync-workers", type=int, default=4, help="Blocking workers of the sync deployment.")
+        parser.add_argument("--json", action="store_true")
+
+    def handle(self, *args, **options):
+        db = connections["default"]
+        if db.vendor == "sqlite":
+            # a file test database, so the async views' worker threads see the same tables
+            tmpdir = tempfile.mkdtemp(prefix="async-bench-")
+            db.settings_dict.setdefault("TEST", {})["NAME"] = os.path.join(tmpdir, "bench.sqlite3")
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            result = self._run(options)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        if options["json"]:
+            self.stdout.write(json.dumps(result, indent=2))
+            return
+        self.stdout.write(
+            f"{result['requests']} x {result['endpoint']}, upstream latency {result['upstream_latency_ms']} ms"
+        )
+        for name in ("sync", "async"):
+            row = result[name]
+            latency = row["latency"]
+            self.stdout.write(
+                f"  {name:<5} {row['workers']:<18} {row['throughput_per_s']:>8.2f} req/s  "
+                f"p50 {latency['p50_ms']:>9.2f}  p95 {latency['p95_ms']:>9.2f}  p99 {latency['p99_ms']:>9.2f}  "
+                f"max {latency['max_ms']:>9.2f} ms  peak upstream in flight {row['peak_in_flight']:>4}  "
+                f"errors {row['errors']}"
+            )
+
+    def _run(self, options):
+        latency = options["upstream_latency"]
+        with FakeGeminiServer(latency_ms=latency) as gemini, FakeChatifyServer(latency_ms=latency) as chatify, \
+                override_settings(CACHES=fakeredis_caches(), GOOGLE_API_KEY="benchmark", GEMINI_API_URL=gemini.url,
+                                  CHATIFY_FEED_URL=chatify.url):
+            reset_singletons()
+            user = User.objects.create(email="bench@example.com", username="bench")
+            headers = {"Authorization": f"Bearer {RedisRefreshToken.for_user(user).access_token}"}
+            request = (PATHS[options["endpoint"]], ENDPOINTS[options["endpoint"]], headers)
+            tracker = InFlightTracker(gemini, chatify)
+
+            sync = self._run_sync(request, options["requests"], options["sync_workers"], tracker)
+            sync["workers"] = f"{options['sync_workers']} workers"
+
+            urlconf = types.ModuleType("async_urls")
+            urlconf.urlpatterns = [path("api/users/", include(with_async_views(api_urls.urlpatterns)))]
+            with override_settings(ROOT_URLCONF=urlconf):
+                async_ = asyncio.run(self._run_async(request, options["requests"], tracker))
+            async_["workers"] = "1 event loop"
+            reset_singletons()
+
+        return {
+            "endpoint": options["endpoint"],
+            "requests": options["requests"],
+            "upstream_latency_ms": latency,
+            "sync": sync,
+            "async": async_,
+        }
+
+    def _run_sync(self, request, count, workers, tracker):
+        path_, body, headers = request
+        local = threading.local()
+
+        def call(queued_at):
+            if not hasattr(local, "client"):
+                local.client = Client()
+            response = local.client.post(path_, body, content_type="application/json", headers=headers)
+            return response.status_code, (time.perf_counter() - queued_at) * 1000
+
+        # one untimed request pays for imports and the first connection
+        Client().post(path_, body, content_type="application/json", headers=headers)
+        tracker.reset()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(call, [time.perf_counter()] * count))
+        return self._summary(results, time.perf_counter() - started, tracker)
+
+    async def _run_async(self, request, count, tracker):
+        path_, body, headers = request
+        client = AsyncClient()
+
+        async def call(queued_at):
+            response = await client.post(path_, body, content_type="application/json", headers=headers)
+            return response.status_code, (time.perf_counter() - queued_at) * 1000
+
+        await client.post(path_, body, content_type="application/json", headers=headers)
+        tracker.reset()
+        started = time.perf_counter()
+        queued_at = time.perf_counter()
+        results = await asyncio.gather(*(call(queued_at) for _ in range(count)))
+        elapsed = time.perf_counter() - started
+        await close_async_client()
+        return self._summary(results, elapsed, tracker)
+
+    def _summary(self, results, elapsed, tracker):
+        latencies = [ms for status, ms in results if status == 200]
+        return {
+            "errors": sum(1 for status, _ in results if status != 200),
+            "elapsed_s": round(elapsed, 3),
+            "throughput_per_s": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+            "peak_in_flight": tracker.peak,
+            "latency": summarize(latencies),
+        }
+
+
+class InFlightTracker:
+    """
+    Peak number of requests the fake upstreams were serving at the same time.
+    """
+
+    def __init__(self, *servers):
+        self._lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+        for server in servers:
+            handler = server.httpd.RequestHandlerClass
+            server.httpd.RequestHandlerClass = self._wrap(handler)
+
+    def _wrap(self, handler):
+        tracker = self
+
+        class Tracked(handler):
+            def do_POST(self):
+                with tracker._lock:
+                    tracker.current += 1
+                    tracker.peak = max(tracker.peak, tracker.current)
+                try:
+                    super().do_POST()
+                finally:
+                    with tracker._lock:
+                        tracker.current -= 1
+
+        return Tracked
+
+    def reset(self):
+        with self._lock:
+            self.peak = self.current
@@ -0,0 +1,81 @@
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.auth.passwords import hash_rate
+
+PBKDF2 = "django.contrib.auth.hashers.PBKDF2PasswordHasher"
+ARGON2 = "django.contrib.auth.hashers.Argon2PasswordHasher"
+
+
+def parse_argon2(value):
+    """
+    "time:memory_kib:parallelism" -> hasher params.
+    """
+    try:
+        time_cost, memory_cost, parallelism = (int(part) for part in value.split(":"))
+    except ValueError:
+        raise CommandError(f"--argon2 expects time:memory_kib:parallelism, got {value!r}")
+    return {"time_cost": time_cost, "memory_cost": memory_cost, "parallelism": parallelism}
+
+
+class Command(BaseCommand):
+    help = ("Hashes/sec per password hasher configuration, on one core and across a process pool "
+            "like PASSWORD_HASH_WORKERS. Use it to pick PBKDF2 iterations / Argon2 costs for a target login rate.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seconds", type=float, default=2.0, help="Hashing time per configuration and mode.")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processes for the pool run.")
+        parser.add_argument("--pbkdf2", type=int, action="append",
+                            help=f"PBKDF2 iterations (repeatable, default {PBKDF2PasswordHasher.iterations}).")
+        parser.add_argument("--argon2", action="append",
+                            help="Argon2 time:memory_kib:parallelism (repeatable, default 2:102400:8 and 2:19456:1).")
+        parser.add_argument("--json", action="store_true")
+
+    def _configurations(self, options):
+        configs = [
+            ("pbkdf2_sha256", PBKDF2, {"iterations": iterations}, f"iterations={iterations}")
+            for iterations in options["pbkdf2"] or [PBKDF2PasswordHasher.iterations]
+        ]
+        try:
+            import argon2  # noqa: F401
+        except ImportError:
+            self.stderr.write("argon2-cffi not installed, skipping argon2")
+            return configs
+        for value in options["argon2"] or ["2:102400:8", "2:19456:1"]:
+            params = parse_argon2(value)
+            configs.append(("argon2id", ARGON2, params, "t={time_cost} m={memory_cost} p={parallelism}".format(**params)))
+        return configs
+
+    def handle(self, *args, **options):
+        seconds = options["seconds"]
+        workers = options["workers"]
+        results = []
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            # spawn the workers before timing anything
+            list(pool.map(hash_rate, [PBKDF2] * workers, [{"iterations": 1}] * workers, [0.01] * workers))
+            for name, path, params, label in self._configurations(options):
+                single = hash_rate(path, params, seconds) / seconds
+                counts = pool.map(hash_rate, [path] * workers, [params] * workers, [seconds] * workers)
+                pooled = sum(counts) / seconds
+                results.append({
+                    "hasher": name,
+                    "params": label,
+                    "hashes_per_s": round(single, 2),
+                    "ms_per_hash": round(1000 / single, 2) if single else None,
+                    "pool_hashes_per_s": round(pooled, 2),
+                })
+
+        if options["json"]:
+            self.stdout.write(json.dumps({"workers": workers, "results": results}, indent=2))
+            return
+        self.stdout.write(f"{'hasher':<15}{'params':<28}{'1 core/s':>10}{'ms/hash':>10}{f'{workers} procs/s':>14}")
+        for row in results:
+            self.stdout.write(
+                f"{row['hasher']:<15}{row['params']:<28}{row['hashes_per_s']:>10.2f}"
+                f"{row['ms_per_hash']:>10.2f}{row['pool_hashes_per_s']:>14.2f}"
+            )
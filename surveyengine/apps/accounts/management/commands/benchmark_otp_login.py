@@ -0,0 +1,191 @@
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings, setup_databases, setup_test_environment, teardown_databases, \
+    teardown_test_environment
+
+from apps.accounts.models import User
+from apps.accounts.standins import FakeBrevoServer, FakeSmtpServer, OtpInbox, fakeredis_caches, reset_singletons
+
+PASSWORD = "Bench-pass-123"
+STEPS = ("request_otp", "otp_delivery", "verify_login", "total")
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(int(round(p / 100 * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+
+def summarize(values):
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50), 2),
+        "p95_ms": round(percentile(values, 95), 2),
+        "p99_ms": round(percentile(values, 99), 2),
+        "max_ms": round(max(values), 2) if values else 0.0,
+        "mean_ms": round(statistics.fmean(values), 2) if values else 0.0,
+    }
+
+
+class Command(BaseCommand):
+    help = ("Load benchmark of the OTP login flow (auth/login/ -> mailed OTP -> login/ JWT) against a local "
+            "fake Brevo (and SMTP) server, fakeredis and a throwaway test database. Reports p50/p95/p99 and throughput.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50, help="Logins to perform (one account each).")
+        parser.add_argument("--concurrency", type=int, default=10, help="Logins in flight at once.")
+        parser.add_argument("--provider-latency", type=int, default=150, help="Fake Brevo response time in ms.")
+        parser.add_argument("--providers", default="brevo",
+                            help="Comma separated EMAIL_PROVIDERS, e.g. brevo,smtp to exercise failover.")
+        parser.add_argument("--provider-fail-rate", type=float, default=0.0,
+                            help="Fraction of fake Brevo sends answered with 503.")
+        parser.add_argument("--smtp-latency", type=int, default=50, help="Fake SMTP response time in ms.")
+        parser.add_argument("--email-workers", type=int, default=4, help="Email worker threads (queued mode).")
+        parser.add_argument("--eager", action="store_true", help="Send OTP mails inline instead of via the queue.")
+        parser.add_argument("--fast-hasher", action="store_true",
+                            help="Use MD5 password hashing to take PBKDF2 cost out of the numbers.")
+        parser.add_argument("--json", action="store_true")
+
+    def _login(self, inbox, email):
+        client = Client()
+        timings = {}
+        start = time.perf_counter()
+
+        response = client.post("/api/users/auth/login/", {"email": email}, content_type="application/json")
+        timings["request_otp"] = (time.perf_counter() - start) * 1000
+        if response.status_code != 200:
+            raise RuntimeError(f"auth/login/ returned {response.status_code}: {response.content[:200]}")
+
+        mark = time.perf_counter()
+        otp = inbox.wait_for_otp(email)
+        timings["otp_delivery"] = (time.perf_counter() - mark) * 1000
+
+        mark = time.perf_counter()
+        response = client.post(
+            "/api/users/login/", {"email": email, "password": PASSWORD, "otp": otp}, content_type="application/json"
+        )
+        timings["verify_login"] = (time.perf_counter() - mark) * 1000
+        if response.status_code != 200 or "access" not in response.json():
+            raise RuntimeError(f"login/ returned {response.status_code}: {response.content[:200]}")
+
+        timings["total"] = (time.perf_counter() - start) * 1000
+        return timings
+
+    def handle(self, *args, **options):
+        db = connections["default"]
+        if db.vendor == "sqlite":
+            # in-memory sqlite raises "table is locked" under concurrent writers instead of
+            # waiting; a file test database honours the busy timeout
+            tmpdir = tempfile.mkdtemp(prefix="otp-bench-")
+            db.settings_dict.setdefault("TEST", {})["NAME"] = os.path.join(tmpdir, "bench.sqlite3")
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            result = self._run(options)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        if options["json"]:
+            self.stdout.write(json.dumps(result, indent=2))
+            return
+        self.stdout.write(
+            f"{result['logins']} logins, concurrency {result['concurrency']}, "
+            f"{'eager' if result['eager'] else 'queued'} email, provider latency {result['provider_latency_ms']} ms"
+        )
+        self.stdout.write(f"throughput: {result['throughput_per_s']} logins/s, errors: {result['errors']}")
+        for name, health in result["providers"].items():
+            self.stdout.write(
+                f"  provider {name:<6} {health['state']:<9} sent {health['sent']:>5}  errors {health['errors']:>4}  "
+                f"ewma {health['latency_ms']} ms"
+            )
+        for step in STEPS:
+            row = result["steps"][step]
+            self.stdout.write(
+                f"  {step:<14} p50 {row['p50_ms']:>9.2f}  p95 {row['p95_ms']:>9.2f}  "
+                f"p99 {row['p99_ms']:>9.2f}  max {row['max_ms']:>9.2f} ms"
+            )
+
+    def _run(self, options):
+        from apps.auth.emailproviders import get_email_dispatcher
+        from apps.auth.emailqueue import EmailWorkerPool
+
+        hashers = ["django.contrib.auth.hashers.MD5PasswordHasher"] if options["fast_hasher"] else None
+        overrides = {
+            "CACHES": fakeredis_caches(),
+            "EMAIL_QUEUE_EAGER": options["eager"],
+            "OTP_RATE_LIMITS": {"issue": {}, "verify": {}},  # every virtual user shares 127.0.0.1
+            "EMAIL_PROVIDERS": [name.strip() for name in options["providers"].split(",") if name.strip()],
+            "EMAIL_USE_TLS": False,
+        }
+        if hashers:
+            overrides["PASSWORD_HASHERS"] = hashers
+
+        inbox = OtpInbox()
+        brevo = FakeBrevoServer(latency_ms=options["provider_latency"], fail_rate=options["provider_fail_rate"],
+                                inbox=inbox)
+        smtp = FakeSmtpServer(latency_ms=options["smtp_latency"], inbox=inbox)
+        with brevo, smtp, override_settings(BREVO_API_HOST=brevo.api_host, EMAIL_HOST=smtp.host,
+                                            EMAIL_PORT=smtp.port, **overrides):
+            reset_singletons()
+
+            emails = [f"bench{i}@example.com" for i in range(options["users"])]
+            template = User(email="template@example.com")
+            template.set_password(PASSWORD)
+            User.objects.bulk_create(
+                [User(email=email, password=template.password) for email in emails + ["warmup@example.com"]]
+            )
+
+            pool = None
+            if not options["eager"]:
+                pool = EmailWorkerPool(concurrency=options["email_workers"], name="bench", poll_timeout=1)
+                pool_thread = threading.Thread(target=pool.run, daemon=True)
+                pool_thread.start()
+
+            # one untimed login pays for lazy imports, template compilation and pool setup
+            self._login(inbox, "warmup@example.com")
+
+            samples = {step: [] for step in STEPS}
+            errors = []
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+                futures = [executor.submit(self._login, inbox, email) for email in emails]
+                for future in futures:
+                    try:
+                        for step, value in future.result().items():
+                            samples[step].append(value)
+                    except Exception as e:
+                        errors.append(str(e))
+            elapsed = time.perf_counter() - started
+
+            if pool:
+                pool.stop()
+                pool_thread.join(timeout=5)
+            providers = get_email_dispatcher().stats()
+            reset_singletons()
+
+        for error in errors[:5]:
+            self.stderr.write(error)
+        return {
+            "logins": options["users"],
+            "concurrency": options["concurrency"],
+            "eager": options["eager"],
+            "provider_latency_ms": options["provider_latency"],
+            "errors": len(errors),
+            "providers": providers,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_per_s": round(len(samples["total"]) / elapsed, 2) if elapsed else 0.0,
+            "steps": {step: summarize(values) for step, values in samples.items()},
+        }
@@ -0,0 +1,121 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# what a fresh gunicorn/uvicorn worker does before it can answer the first request
+BOOT_SNIPPET = """
+import importlib
+from django.conf import settings
+importlib.import_module({entry!r})
+importlib.import_module(settings.ROOT_URLCONF)
+"""
+
+ENTRYPOINTS = {
+    "wsgi": "config.wsgi",
+    "asgi": "config.asgi",
+}
+
+
+def parse_importtime(stderr):
+    """
+    Parses `python -X importtime` output into {module: (self_us, cumulative_us, depth)}.
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # header row
+        raw_name = parts[2]
+        depth = (len(raw_name) - len(raw_name.lstrip()) - 1) // 2
+        modules[raw_name.strip()] = (int(parts[0]), int(parts[1]), depth)
+    return modules
+
+
+class Command(BaseCommand):
+    help = "Measures worker cold-start cost: per-module import time of a fresh interpreter booting Django."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to start (medians are reported).")
+        parser.add_argument("--entry", choices=sorted(ENTRYPOINTS), default="wsgi")
+        parser.add_argument("--top", type=int, default=25, help="Rows to print per table.")
+        parser.add_argument("--json", action="store_true", help="Print machine readable results (for CI tracking).")
+
+    def _boot_once(self, entry):
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "config.settings")}
+        cmd = [sys.executable, "-X", "importtime", "-c", BOOT_SNIPPET.format(entry=ENTRYPOINTS[entry])]
+        start = time.perf_counter()
+        proc = subprocess.run(cmd, env=env, cwd=settings.BASE_DIR, capture_output=True, text=True)
+        wall_ms = (time.perf_counter() - start) * 1000
+        if proc.returncode != 0:
+            tail = "\n".join(line for line in proc.stderr.splitlines() if not line.startswith("import time:"))
+            raise RuntimeError(f"worker boot failed:\n{tail[-2000:]}")
+        return wall_ms, parse_importtime(proc.stderr)
+
+    def handle(self, *args, **options):
+        walls = []
+        self_times = defaultdict(list)
+        cumulative_times = defaultdict(list)
+        top_level = set()
+
+        for _ in range(options["runs"]):
+            wall_ms, modules = self._boot_once(options["entry"])
+            walls.append(wall_ms)
+            for name, (self_us, cumulative_us, depth) in modules.items():
+                self_times[name].append(self_us)
+                cumulative_times[name].append(cumulative_us)
+                if depth == 0:
+                    top_level.add(name)
+
+        def median_ms(values):
+            return round(statistics.median(values) / 1000, 2)
+
+        packages = defaultdict(float)
+        for name, values in self_times.items():
+            packages[name.split(".")[0]] += statistics.median(values) / 1000
+
+        result = {
+            "entry": options["entry"],
+            "runs": options["runs"],
+            "wall_ms": round(statistics.median(walls), 1),
+            "imports_ms": round(sum(median_ms(cumulative_times[name]) for name in top_level), 1),
+            "modules": len(self_times),
+            "top_level": sorted(
+                ({"module": name, "cumulative_ms": median_ms(cumulative_times[name])} for name in top_level),
+                key=lambda row: -row["cumulative_ms"],
+            )[:options["top"]],
+            "packages": sorted(
+                ({"package": name, "self_ms": round(ms, 2)} for name, ms in packages.items()),
+                key=lambda row: -row["self_ms"],
+            )[:options["top"]],
+            "slowest_modules": sorted(
+                ({"module": name, "self_ms": median_ms(values)} for name, values in self_times.items()),
+                key=lambda row: -row["self_ms"],
+            )[:options["top"]],
+        }
+
+        if options["json"]:
+            self.stdout.write(json.dumps(result, indent=2))
+            return
+
+        self.stdout.write(
+            f"{result['entry']} boot, median of {result['runs']} runs: "
+            f"{result['wall_ms']} ms wall, {result['imports_ms']} ms importing {result['modules']} modules"
+        )
+        for title, rows, key in (
+            ("top-level imports (cumulative)", result["top_level"], "cumulative_ms"),
+            ("packages (sum of self time)", result["packages"], "self_ms"),
+            ("slowest modules (self time)", result["slowest_modules"], "self_ms"),
+        ):
+            self.stdout.write(f"\n{title}:")
+            for row in rows:
+                name = row.get("module") or row.get("package")
+                self.stdout.write(f"  {row[key]:>9.2f} ms  {name}")
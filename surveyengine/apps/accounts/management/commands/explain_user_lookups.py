@@ -0,0 +1,96 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from django.utils import timezone
+
+from apps.accounts.login import LOGIN_FIELDS
+from apps.accounts.models import User
+from apps.accounts.usernames import suffixed_usernames
+
+INDEXES = ("user_email_lower_uniq", "user_username_lower_uniq")
+
+# sqlite has no generate_series without an extension; a recursive CTE does the same
+SERIES = {
+    "postgresql": "SELECT g FROM generate_series(1, %s) AS g",
+    "sqlite": "WITH RECURSIVE series(g) AS (SELECT 1 UNION ALL SELECT g + 1 FROM series WHERE g < %s) "
+              "SELECT g FROM series",
+}
+
+
+def lookup_paths(users):
+    """
+    Every way the app looks a user up by email or username, as the querysets it runs.
+    """
+    email = f"Seed{users // 2}@Example.com"
+    username = f"SEED{users // 2}"
+    return {
+        "login (login.py)": User.objects.matching(email=email).only(*LOGIN_FIELDS),
+        "email taken (existence.py)": User.objects.matching(email=email)[:1],
+        "username taken (existence.py)": User.objects.matching(username=username)[:1],
+        "natural key / forget password / google": User.objects.matching(email=email),
+        "profile username check": User.objects.matching(username=username).exclude(pk=1)[:1],
+        "username suffixes (usernames.py)": suffixed_usernames(f"seed{users}"),
+    }
+
+
+class Command(BaseCommand):
+    help = ("Seeds a throwaway test database with --users accounts and EXPLAINs every email / username "
+            "lookup, to check each one is answered from the lower() indexes of migration 0007 rather than "
+            "a table scan. Point DB_URL at postgres for plans that match production; sqlite only indexes "
+            "the equality lookups (it does not use expression indexes for LIKE).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10_000_000, help="Accounts to seed.")
+        parser.add_argument("--json", action="store_true")
+
+    def handle(self, *args, **options):
+        if connection.vendor not in SERIES:
+            raise CommandError(f"no seeding query for {connection.vendor}")
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            result = self._run(options["users"])
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        if options["json"]:
+            self.stdout.write(json.dumps(result, indent=2))
+            return
+        self.stdout.write(f"{result['users']} users on {result['vendor']}, seeded in {result['seed_s']} s")
+        for name, row in result["lookups"].items():
+            self.stdout.write(f"  {name:<40} {row['index'] or 'NO INDEX':<26} {row['ms']:>8.2f} ms")
+            for line in row["plan"].splitlines():
+                self.stdout.write(f"      {line}")
+
+    def _seed(self, users):
+        table = connection.ops.quote_name(User._meta.db_table)
+        columns = ("password", "email", "username", "role", "date_joined", "social_links", "is_active", "is_admin")
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(connection.ops.quote_name(c) for c in columns)}) "
+                "SELECT %s, %s || g || %s, %s || g || %s, %s, %s, %s, %s, %s "
+                f"FROM ({SERIES[connection.vendor]}) AS series",
+                ["!", "seed", "@example.com", "seed", "", "user", timezone.now(), "{}", True, False, users],
+            )
+            cursor.execute(f"ANALYZE {table}")
+        return time.perf_counter() - started
+
+    def _run(self, users):
+        seed_s = self._seed(users)
+        lookups = {}
+        for name, queryset in lookup_paths(users).items():
+            plan = queryset.explain()
+            started = time.perf_counter()
+            list(queryset)
+            lookups[name] = {
+                "index": next((index for index in INDEXES if index in plan), None),
+                "ms": round((time.perf_counter() - started) * 1000, 2),
+                "plan": plan,
+            }
+        return {"vendor": connection.vendor, "users": users, "seed_s": round(seed_s, 2), "lookups": lookups}
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from apps.auth.tokenblacklist import get_token_blacklist
+
+
+class Command(BaseCommand):
+    help = ("Copies still-valid blacklisted refresh tokens from the simplejwt tables into the redis "
+            "blacklist, then prunes the tables in chunks (expired rows, or every row with --all).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Rows per redis pipeline / delete.")
+        parser.add_argument("--no-copy", action="store_true", help="Only prune.")
+        parser.add_argument("--no-prune", action="store_true", help="Only copy.")
+        parser.add_argument("--all", action="store_true",
+                            help="Prune unexpired rows too; safe once the redis blacklist is live.")
+
+    def _copy(self, chunk_size, now):
+        blacklist = get_token_blacklist()
+        rows = (
+            BlacklistedToken.objects.filter(token__expires_at__gt=now)
+            .values_list("token__jti", "token__expires_at")
+            .iterator(chunk_size=chunk_size)
+        )
+        copied = 0
+        batch = []
+        for jti, expires_at in rows:
+            batch.append((jti, expires_at.timestamp()))
+            if len(batch) >= chunk_size:
+                copied += blacklist.add_many(batch)
+                batch = []
+        if batch:
+            copied += blacklist.add_many(batch)
+        return copied
+
+    def _prune(self, chunk_size, now, prune_all):
+        outstanding = OutstandingToken.objects.all() if prune_all else OutstandingToken.objects.filter(expires_at__lte=now)
+        deleted = 0
+        while True:
+            ids = list(outstanding.order_by("id").values_list("id", flat=True)[:chunk_size])
+            if not ids:
+                return deleted
+            # blacklist rows first, so the cascade from the outstanding delete finds nothing left
+            BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            deleted += OutstandingToken.objects.filter(id__in=ids).delete()[0]
+            self.stdout.write(f"  pruned {deleted} outstanding tokens")
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        if not options["no_copy"]:
+            copied = self._copy(options["chunk_size"], now)
+            self.stdout.write(self.style.SUCCESS(f"copied {copied} blacklisted tokens to redis"))
+        if not options["no_prune"]:
+            deleted = self._prune(options["chunk_size"], now, options["all"])
+            self.stdout.write(self.style.SUCCESS(f"pruned {deleted} outstanding tokens"))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from apps.accounts.existence import KINDS, get_existence_index, normalize
+from apps.accounts.models import User
+
+
+class Command(BaseCommand):
+    help = ("Rebuilds the username / email Bloom filters from the User table and swaps them in. "
+            "Run once after deploying, after changing EXISTENCE_BLOOM_* and to drop renamed usernames.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--kind", choices=KINDS, action="append", help="Only this filter (repeatable).")
+        parser.add_argument("--chunk-size", type=int, default=5000, help="Rows per query chunk / redis pipeline.")
+
+    def handle(self, *args, **options):
+        for kind in options["kind"] or KINDS:
+            index = get_existence_index(kind)
+            values = (
+                User.objects.exclude(**{f"{kind}__isnull": True})
+                .values_list(kind, flat=True)
+                .iterator(chunk_size=options["chunk_size"])
+            )
+            count = index.rebuild(map(normalize, values), chunk_size=options["chunk_size"])
+            self.stdout.write(self.style.SUCCESS(
+                f"{kind}: {count} values, {index.bits} bits ({index.bits // 8 // 1024} KiB), {index.hashes} hashes"
+            ))
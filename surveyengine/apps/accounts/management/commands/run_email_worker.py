@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from apps.auth.emailqueue import EmailQueue, EmailWorkerPool
+
+
+class Command(BaseCommand):
+    help = "Runs the outbound email worker pool (OTP mails queued by the auth endpoints)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=None,
+                            help="Number of sender threads (default EMAIL_WORKER_CONCURRENCY).")
+        parser.add_argument("--name", default=None,
+                            help="Stable worker name, used to recover in-flight jobs after a crash (default hostname).")
+        parser.add_argument("--burst", action="store_true",
+                            help="Exit once the queue is empty instead of waiting for new jobs.")
+        parser.add_argument("--stats", action="store_true",
+                            help="Print queue sizes and exit.")
+        parser.add_argument("--requeue-dead", action="store_true",
+                            help="Move dead-lettered jobs back to the pending queue and exit.")
+
+    def handle(self, *args, **options):
+        if options["stats"]:
+            self.stdout.write(str(EmailQueue().stats()))
+            return
+        if options["requeue_dead"]:
+            moved = EmailQueue().requeue_dead()
+            self.stdout.write(self.style.SUCCESS(f"requeued {moved} dead jobs"))
+            return
+
+        pool = EmailWorkerPool(
+            concurrency=options["concurrency"],
+            name=options["name"],
+            burst=options["burst"],
+        )
+        self.stdout.write(f"email worker {pool.name} started with {pool.concurrency} threads")
+        result = pool.run()
+        self.stdout.write(self.style.SUCCESS(f"email worker stopped: {result}"))
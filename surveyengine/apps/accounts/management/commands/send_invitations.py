@@ -0,0 +1,68 @@
+import csv
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+
+from apps.accounts.invitations import campaign_summary, create_campaign, dispatch_campaign
+from apps.accounts.models import InvitationCampaign
+
+
+class Command(BaseCommand):
+    help = "Sends a bulk survey invitation campaign in Brevo batches (runs in this process, not the worker)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--file", help="CSV of recipients: email[,name] per line (header row optional).")
+        parser.add_argument("--subject", help="Email subject for a new campaign.")
+        parser.add_argument("--survey-url", help="Survey link for a new campaign.")
+        parser.add_argument("--message", default="", help="Optional message shown above the survey link.")
+        parser.add_argument("--campaign", type=int, help="Resume an existing campaign instead of creating one.")
+        parser.add_argument("--retry-failed", action="store_true", help="Also resend recipients marked failed.")
+
+    def _read_recipients(self, path):
+        """
+        Valid rows as recipients; every other non-blank row is reported on stderr, except
+        a header in the first line.
+        """
+        recipients = []
+        skipped = 0
+        with open(path, newline="", encoding="utf-8") as f:
+            for line, row in enumerate(csv.reader(f), start=1):
+                if not row or not row[0].strip():
+                    continue
+                email = row[0].strip()
+                try:
+                    validate_email(email)
+                except ValidationError:
+                    if line > 1 or "@" in email:
+                        skipped += 1
+                        self.stderr.write(f"line {line}: skipped, {email!r} is not a valid email address")
+                    continue
+                recipients.append({"email": email, "name": row[1].strip() if len(row) > 1 else ""})
+        if skipped:
+            self.stderr.write(self.style.WARNING(f"skipped {skipped} rows with an invalid email address"))
+        return recipients
+
+    def handle(self, *args, **options):
+        if options["campaign"]:
+            try:
+                campaign = InvitationCampaign.objects.get(pk=options["campaign"])
+            except InvitationCampaign.DoesNotExist:
+                raise CommandError(f"campaign {options['campaign']} does not exist")
+        else:
+            if not (options["file"] and options["subject"] and options["survey_url"]):
+                raise CommandError("--file, --subject and --survey-url are required for a new campaign")
+            recipients = self._read_recipients(options["file"])
+            if not recipients:
+                raise CommandError("no recipients found in file")
+            campaign = create_campaign(
+                subject=options["subject"],
+                survey_url=options["survey_url"],
+                message=options["message"],
+                recipients=recipients,
+            )
+            self.stdout.write(f"created campaign {campaign.pk}")
+
+        totals = dispatch_campaign(campaign.pk, retry_failed=options["retry_failed"])
+        campaign.refresh_from_db()
+        self.stdout.write(self.style.SUCCESS(f"{totals} -> {campaign_summary(campaign)['recipients']}"))
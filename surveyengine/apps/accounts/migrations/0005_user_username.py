@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_invitation_campaigns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='username',
+            field=models.CharField(blank=True, max_length=20, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_user_username'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='bio',
+            field=models.TextField(blank=True, max_length=200, null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='name',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='social_links',
+            field=models.JSONField(blank=True, default=dict, null=True),
+        ),
+    ]
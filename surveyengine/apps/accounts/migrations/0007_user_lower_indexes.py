@@ -0,0 +1,72 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:05
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+CONSTRAINTS = [
+    models.UniqueConstraint(django.db.models.functions.text.Lower('email'), name='user_email_lower_uniq'),
+    models.UniqueConstraint(django.db.models.functions.text.Lower('username'), name='user_username_lower_uniq'),
+]
+
+# postgres: built CONCURRENTLY so a large accounts_user keeps taking writes. The username
+# index uses text_pattern_ops so it also serves LOWER(username) LIKE 'base%' (the username
+# suffix lookup) under a non-C collation; equality lookups use it all the same.
+POSTGRES_INDEXES = [
+    ('user_email_lower_uniq', 'LOWER("email")'),
+    ('user_username_lower_uniq', 'LOWER("username") text_pattern_ops'),
+]
+
+
+def check_duplicates(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    for field in ('email', 'username'):
+        duplicates = list(
+            User.objects.exclude(**{f'{field}__isnull': True})
+            .annotate(value=django.db.models.functions.text.Lower(field))
+            .values('value').annotate(n=models.Count('id')).filter(n__gt=1)
+            .values_list('value', flat=True)[:20]
+        )
+        if duplicates:
+            raise RuntimeError(
+                f"accounts_user has {field}s that differ only in case, merge or rename them first: {duplicates}"
+            )
+
+
+def create_indexes(apps, schema_editor):
+    check_duplicates(apps, schema_editor)
+    if schema_editor.connection.vendor == 'postgresql':
+        for name, expression in POSTGRES_INDEXES:
+            schema_editor.execute(
+                f'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS "{name}" ON "accounts_user" ({expression})'
+            )
+        return
+    User = apps.get_model('accounts', 'User')
+    for constraint in CONSTRAINTS:
+        schema_editor.add_constraint(User, constraint)
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for name, _ in POSTGRES_INDEXES:
+            schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+        return
+    User = apps.get_model('accounts', 'User')
+    for constraint in CONSTRAINTS:
+        schema_editor.remove_constraint(User, constraint)
+
+
+class Migration(migrations.Migration):
+    atomic = False  # CREATE INDEX CONCURRENTLY cannot run in a transaction
+
+    dependencies = [
+        ('accounts', '0006_user_profile_fields'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunPython(create_indexes, drop_indexes)],
+            state_operations=[
+                migrations.AddConstraint(model_name='user', constraint=constraint) for constraint in CONSTRAINTS
+            ],
+        ),
+    ]
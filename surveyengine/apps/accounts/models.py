@@ -1,25 +1,59 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Lower
 from django.contrib.auth.models import  AbstractBaseUser ,BaseUserManager
-from django.contrib.postgres.fields import JSONField
+
+from apps.auth.passwords import set_password
+from .usernames import get_username_allocator, username_base
+
+USERNAME_ALLOCATION_ATTEMPTS = 3
+
+# email__lower / username__lower: LOWER(col) = %s, the expression the functional indexes are built on
+models.CharField.register_lookup(Lower)
 
 
 class CustomUserManager(BaseUserManager):
 
-    def create_user(self,username,email,password=None,role='user',bio=None):
+    def matching(self, **lookups):
+        """
+        Case-insensitive filter(), e.g. matching(email=...); uses the lower() indexes.
+        (iexact would not: on postgres it compiles to UPPER(col) = UPPER(%s).)
+        A None value matches nothing.
+        """
+        if any(value is None for value in lookups.values()):
+            return self.none()
+        return self.filter(**{f"{field}__lower": value.lower() for field, value in lookups.items()})
+
+    def get_by_natural_key(self, email):
+        return self.matching(email=email).get()
+
+    def create_user(self,username=None,email=None,password=None,role='user'):
         if not email:
             raise ValueError('email field must have to provide')
-        if '@' in username:
-            raise ValueError('username should not contain @')   
+        if username and '@' in username:
+            raise ValueError('username should not contain @')
         user=self.model(
             username=username,
             email=self.normalize_email(email),
             role=role,
-            bio=bio
         )
 
-        user.set_password(password)
-        user.save(using=self._db)
-        return user 
+        set_password(user, password)
+        if username:
+            user.save(using=self._db)
+            return user
+
+        # allocated names can still collide with one a user picked by hand; the
+        # counter has moved on by then, so a retry gets the next free name
+        base = username_base(user.email)
+        for attempt in range(USERNAME_ALLOCATION_ATTEMPTS):
+            user.username = get_username_allocator().allocate(base)
+            try:
+                with transaction.atomic(using=self._db):
+                    user.save(using=self._db)
+                return user
+            except IntegrityError:
+                if attempt == USERNAME_ALLOCATION_ATTEMPTS - 1 or self.matching(email=user.email).exists():
+                    raise
     
     def create_superuser(self,email,password):
         user=self.create_user(
@@ -39,11 +73,14 @@ from django.utils import timezone
 class User(AbstractBaseUser):
     
     email = models.EmailField(unique=True)
+    username = models.CharField(max_length=20, unique=True, null=True, blank=True)
     role = models.CharField(max_length=20, null=True, blank=True, default='user')
     date_joined = models.DateTimeField(auto_now_add=True)
 
-    
+    name = models.CharField(max_length=100, null=True, blank=True)
+    bio = models.TextField(max_length=200, null=True, blank=True)
     profile = models.URLField(null=True, blank=True)
+    social_links = models.JSONField(default=dict, null=True, blank=True)
 
     
 
@@ -56,9 +93,65 @@ class User(AbstractBaseUser):
 
     objects = CustomUserManager()
 
+    class Meta:
+        # case-insensitive uniqueness; on postgres migration 0007 builds these concurrently
+        constraints = [
+            models.UniqueConstraint(Lower('email'), name='user_email_lower_uniq'),
+            models.UniqueConstraint(Lower('username'), name='user_username_lower_uniq'),
+        ]
+
     def __str__(self):
         return self.email
 
     @property
     def is_staff(self):
-        return self.is_admin
\ No newline at end of file
+        return self.is_admin
+
+class InvitationCampaign(models.Model):
+    """
+    A bulk survey invitation mail-out; per-recipient delivery state lives in InvitationRecipient.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('sending', 'Sending'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=200)
+    survey_url = models.URLField()
+    message = models.TextField(blank=True, default='')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='invitation_campaigns')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.subject} ({self.status})"
+
+
+class InvitationRecipient(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    campaign = models.ForeignKey(InvitationCampaign, on_delete=models.CASCADE, related_name='recipients')
+    email = models.EmailField()
+    name = models.CharField(max_length=100, blank=True, default='')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    message_id = models.CharField(max_length=255, blank=True, default='')
+    error = models.TextField(blank=True, default='')
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['campaign', 'email'], name='unique_invitation_recipient'),
+        ]
+        indexes = [
+            models.Index(fields=['campaign', 'status']),
+        ]
+
+    def __str__(self):
+        return self.email
@@ -1,9 +1,10 @@
-from drf_yasg import openapi
-from drf_yasg.utils import swagger_auto_schema
+from .apidoc import swagger_auto_schema
 
-profile_image_upload_doc = swagger_auto_schema(
-    operation_description="Upload profile image",
-    manual_parameters=[
+
+def profile_image_parameters():
+    from drf_yasg import openapi
+
+    return [
         openapi.Parameter(
             name="profile_image",
             in_=openapi.IN_FORM,
@@ -12,4 +13,9 @@ profile_image_upload_doc = swagger_auto_schema(
             required=True
         )
     ]
+
+
+profile_image_upload_doc = swagger_auto_schema(
+    operation_description="Upload profile image",
+    manual_parameters=profile_image_parameters
 )
@@ -1,20 +1,36 @@
 
 from django.contrib.auth import  get_user_model
-from rest_framework import  serializers
+from rest_framework import  exceptions, serializers
 import os 
-import cloudinary
-import cloudinary.uploader  
-from django.core.cache import cache
-from google.oauth2 import id_token as google_id_token
-from rest_framework_simplejwt.tokens import RefreshToken
+from functools import lru_cache
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
 
-from  google.auth.transport import requests
 from django.conf import settings
+from ..auth.otpsender import (LoginOtpSender
+                              , forgetPasswordOtpSender,RegistrationOtpSender
+                              ,UpdatePasswordOtpSender)
+from ..auth.googlecerts import verify_google_id_token
+from ..auth.passwords import set_password, verify_password
+from .existence import email_taken, username_taken
+from .login import LoginFailed, LoginPipeline
+from .tokens import RedisRefreshToken
+from .usercache import get_cached_user
 
 
 
 User=get_user_model()
 
+
+# heavy SDKs (cloudinary, google-auth) are imported on first use so worker boot stays cheap
+@lru_cache(maxsize=None)
+def _cloudinary_uploader():
+    import cloudinary
+    import cloudinary.uploader
+
+    cloudinary.config(**settings.CLOUDINARY)
+    return cloudinary.uploader
+
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
     role = serializers.ChoiceField(choices=['user', 'admin'], default='user')
@@ -33,7 +49,7 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         org_secret = data.get('orgSecret')
         
         # Check if user already exists
-        if User.objects.filter(email=email).exists():
+        if email_taken(email):
             raise serializers.ValidationError("User with this email already exists.")
             
         # Validate organization secret for admin accounts
@@ -46,37 +62,25 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
             if org_secret !="unique123":
                 raise serializers.ValidationError("Invalid Organization Secret.")
             
-        # Validate OTP
-        key = f"otp:register:{email}"
-        stored_otp = cache.get(key)
-
-        if not stored_otp or stored_otp != input_otp:
+        # Validate and consume OTP in one atomic redis call (prevents reuse)
+        if not RegistrationOtpSender(email).validate_otp(input_otp):
             raise serializers.ValidationError("Invalid or expired OTP.")
 
-        # OTP is valid, delete it to prevent reuse
-        cache.delete(key)
         return data
 
     def create(self, validated_data):
         validated_data.pop('otp', None)  # Remove otp as it's not needed for user creation
         validated_data.pop('orgSecret', None)  # Remove orgSecret as it's not a user field
         
-        # Generate username if not provided
-        if not validated_data.get('username'):
-            email = validated_data['email']
-            base_username = email.split('@')[0]
-            username = base_username
-            counter = 1
-            while User.objects.filter(username=username).exists():
-                username = f"{base_username}{counter}"
-                counter += 1
-            validated_data['username'] = username
-            
+        # Without a username the manager allocates <email name><n> (see usernames.py)
         return User.objects.create_user(**validated_data)
 
 
+from django.contrib.auth.models import update_last_login
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = RedisRefreshToken
     email = serializers.EmailField(required=True)
     password = serializers.CharField(required=True)
     otp = serializers.CharField(write_only=True, required=True)
@@ -96,34 +100,58 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         if not email:
             raise serializers.ValidationError("Email is required")
 
+        # one query, one hash, one redis call; see login.py
         try:
-            user = User.objects.get(email=email)
-        except User.DoesNotExist:
-            raise serializers.ValidationError("User does not exist")
+            user = LoginPipeline().authenticate(email, password, otp)
+        except LoginFailed as e:
+            raise serializers.ValidationError(str(e))
 
-        # Validate OTP
-        stored_otp = cache.get(f"otp:login:{user.email}")
-        if stored_otp != otp:
-            raise serializers.ValidationError("Invalid or expired OTP.")
+        # issue the pair directly: the parent's validate() would run authenticate(),
+        # querying the user and hashing the password a second time
+        if not jwt_settings.USER_AUTHENTICATION_RULE(user):
+            raise exceptions.AuthenticationFailed(
+                self.error_messages["no_active_account"], "no_active_account"
+            )
+        self.user = user
+        refresh = self.get_token(user)
+        if jwt_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, user)
 
-        # Validate password
-        if not user.check_password(password):
-            raise serializers.ValidationError("Password is incorrect")
+        # Return token only (no extra user info)
+        return {'refresh': str(refresh), 'access': str(refresh.access_token)}
 
-        # Clear OTP after successful validation
-        cache.delete(f"otp:login:{user.email}")
+class RedisTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    TokenRefreshSerializer on the redis blacklist. Rotation blacklists the old token with
+    SET NX, so of two concurrent refreshes with the same token only one gets a new pair.
+    """
+    token_class = RedisRefreshToken
 
-        # Set username for parent serializer to generate token
-        attrs['username'] = user.username
-        self.user = user
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
 
-        # Generate token using parent class
-        data = super().validate(attrs)
+        user_id = refresh.payload.get(jwt_settings.USER_ID_CLAIM)
+        if user_id:
+            user = get_cached_user(User, user_id)
+            if user is None or not jwt_settings.USER_AUTHENTICATION_RULE(user):
+                raise exceptions.AuthenticationFailed(
+                    self.error_messages["no_active_account"], "no_active_account"
+                )
+
+        data = {'access': str(refresh.access_token)}
+
+        if jwt_settings.ROTATE_REFRESH_TOKENS:
+            if jwt_settings.BLACKLIST_AFTER_ROTATION and not refresh.blacklist():
+                raise TokenError("Token is blacklisted")
+
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+
+            data['refresh'] = str(refresh)
 
-        # Return token only (no extra user info)
         return data
 
-print(settings.GOOGLE_CLIENT_ID)
 class LoginGoogleAuthSerializer(serializers.Serializer):
     id_token = serializers.CharField(required=True)
 
@@ -131,24 +159,19 @@ class LoginGoogleAuthSerializer(serializers.Serializer):
         id_token_value = attrs.get('id_token')
 
         try:
-            # Verify the token with Google's servers
-            id_info = google_id_token.verify_oauth2_token(
-                id_token_value,
-                requests.Request(),
-                settings.GOOGLE_CLIENT_ID
-            )
-            print(settings.GOOGLE_CLIENT_ID)
-
+            # Verify the token locally against Google's cached signing certs
+            id_info = verify_google_id_token(id_token_value, settings.GOOGLE_CLIENT_ID)
             email = id_info.get('email')
+            if not email:
+                raise ValueError("the token carries no email")
 
             # Try to find existing user, or create with blank username
-            user, created = User.objects.get_or_create(
-                email=email,
-                defaults={'username': None}  # intentionally skipping username
+            user, created = User.objects.matching(email=email).get_or_create(
+                defaults={'email': email, 'username': None}  # intentionally skipping username
             )
 
             # Generate JWT tokens
-            refresh = RefreshToken.for_user(user)
+            refresh = RedisRefreshToken.for_user(user)
             print('verified google token')
             return {
                 'accessToken': str(refresh.access_token),
@@ -171,14 +194,15 @@ class UpdatePasswordSerializer(serializers.Serializer):
 
     def validate(self, attrs):
         user = self.context['request'].user
-        if not user.check_password(attrs['old_password']):
+        if not verify_password(user, attrs['old_password']):
             raise serializers.ValidationError("Old password is incorrect")
         return attrs
 
     def save(self, **kwargs):
         user = self.context['request'].user
-        user.set_password(self.validated_data['new_password'])
-        user.save()
+        set_password(user, self.validated_data['new_password'])
+        # request.user may be a cached copy; only write what changed
+        user.save(update_fields=["password"])
 
 class ForgetPasswordSerializer(serializers.Serializer):
     email = serializers.EmailField()
@@ -190,13 +214,10 @@ class ForgetPasswordSerializer(serializers.Serializer):
         otp = data.get("otp")
 
         # Check if the user exists
-        if not User.objects.filter(email=email).exists():
+        if not email_taken(email):
             raise serializers.ValidationError({"email": "User with this email does not exist."})
-        print('ver')
-        if not cache.get(f"otp:forget:{email}") == otp:
+        if not forgetPasswordOtpSender(email).validate_otp(otp):
             raise serializers.ValidationError({"otp": "Invalid or expired OTP."})
-        cache.delete(f"otp:forget:{email}")  # Delete OTP after validation
-        print('otp verified')
         return data
     
     
@@ -204,9 +225,9 @@ class ForgetPasswordSerializer(serializers.Serializer):
         email = self.validated_data['email']
         new_password = self.validated_data['new_password']
         
-        user = User.objects.get(email=email)
-        user.set_password(new_password)
-        user.save()
+        user = User.objects.matching(email=email).get()
+        set_password(user, new_password)
+        user.save(update_fields=["password"])
         
         return user
 
@@ -215,7 +236,7 @@ class UsernameCheckSerializer(serializers.Serializer):
     username = serializers.CharField()
 
     def validate_username(self, value):
-        if User.objects.filter(username=value).exists():
+        if username_taken(value):
             raise serializers.ValidationError("Username already exists.")
         return value
 
@@ -229,24 +250,19 @@ class ProfileImageUploadSerializer(serializers.Serializer):
             raise serializers.ValidationError("Image must be a PNG, JPG, or JPEG file.")
 
         # Upload to cloudinary
-        uploaded = cloudinary.uploader.upload(image)
+        uploaded = _cloudinary_uploader().upload(image)
 
         # Save the image URL in the model
         instance.profile = uploaded["secure_url"]
-        instance.save()
+        instance.save(update_fields=["profile"])
 
         return instance
     
-
-from ..auth.otpsender import (LoginOtpSender
-                              , forgetPasswordOtpSender,RegistrationOtpSender
-                              ,UpdatePasswordOtpSender)
-
 class RegistrationOtpSerializer(serializers.Serializer):
     email = serializers.EmailField()
 
     def validate_email(self, value):
-        if  User.objects.filter(email=value).exists():
+        if email_taken(value):
             print('user exist ')
             raise serializers.ValidationError("User with this email alredy exists.")
         return value
@@ -266,7 +282,7 @@ class Otpserializer(serializers.Serializer):
     email = serializers.EmailField()
 
     def validate_email(self, value):
-        if not User.objects.filter(email=value).exists():
+        if not email_taken(value):
             print('user not exist ')
             raise serializers.ValidationError("User with this email does not exist.")
         return value
@@ -304,23 +320,32 @@ class ProfileUpdateSerializer(serializers.ModelSerializer):
         fields = ['bio', 'username', 'profile', 'social_links', 'name', 'role']
     social_links = serializers.JSONField(default=dict, required=False)
 
+    def validate_username(self, value):
+        # usernames are unique case-insensitively (user_username_lower_uniq)
+        if value and User.objects.matching(username=value).exclude(pk=self.instance.pk).exists():
+            raise serializers.ValidationError("Username already exists.")
+        return value
+
     def update(self, instance, validated_data):
-        instance.bio = validated_data.get("bio", instance.bio)
-        instance.username = validated_data.get("username", instance.username)
-        instance.profile = validated_data.get("profile", instance.profile)
-        instance.name = validated_data.get("name", instance.name)
-        instance.role = validated_data.get("role", instance.role)
+        # instance is request.user, which may come from the local user cache, so
+        # only the fields sent in this request are written back
+        changed = [field for field in ("bio", "username", "profile", "name", "role") if field in validated_data]
+        for field in changed:
+            setattr(instance, field, validated_data[field])
 
         # Safely update nested social_links dictionary
         social_links_data = validated_data.get("social_links", {})
-        current_links = instance.social_links or {}
+        current_links = dict(instance.social_links or {})  # may be shared with the user cache
 
         for key in ["github", "linkedin", "twitter", "website"]:
             if social_links_data.get(key):
                 current_links[key] = social_links_data[key]
 
-        instance.social_links = current_links
-        instance.save()
+        if current_links != (instance.social_links or {}):
+            instance.social_links = current_links
+            changed.append("social_links")
+        if changed:
+            instance.save(update_fields=changed)
         return instance
 
 
@@ -359,6 +384,14 @@ class SurveyGenerationSerializer(serializers.Serializer):
         default='general',
         help_text="Type/category of the survey"
     )
+    bypass_cache = serializers.BooleanField(
+        default=False,
+        help_text="Ask Gemini and leave the generation cache untouched"
+    )
+    refresh_cache = serializers.BooleanField(
+        default=False,
+        help_text="Ask Gemini and replace the cached questions for this survey"
+    )
     
     def validate_description(self, value):
         """
@@ -381,4 +414,44 @@ class SurveyGenerationSerializer(serializers.Serializer):
         return value
 
 
-# print('T'=="T")
\ No newline at end of file
+class SurveyBatchSerializer(serializers.Serializer):
+    """
+    A list of generate-survey specs; each one is validated on its own (see surveybatch.py)
+    so an invalid spec fails alone.
+    """
+    surveys = serializers.ListField(
+        child=serializers.DictField(),
+        min_length=1,
+        help_text="generate-survey request bodies"
+    )
+
+    def validate_surveys(self, value):
+        if len(value) > settings.SURVEY_BATCH_MAX_ITEMS:
+            raise serializers.ValidationError(
+                f"A batch can hold at most {settings.SURVEY_BATCH_MAX_ITEMS} surveys"
+            )
+        return value
+
+
+# print('T'=="T")
+
+
+class InvitationRecipientSerializer(serializers.Serializer):
+    email = serializers.EmailField()
+    name = serializers.CharField(max_length=100, required=False, allow_blank=True)
+
+
+class InvitationCampaignSerializer(serializers.Serializer):
+    subject = serializers.CharField(max_length=200)
+    survey_url = serializers.URLField()
+    message = serializers.CharField(required=False, allow_blank=True, default='')
+    recipients = InvitationRecipientSerializer(many=True)
+
+    def validate_recipients(self, value):
+        if not value:
+            raise serializers.ValidationError("At least one recipient is required.")
+        if len(value) > settings.BULK_EMAIL_MAX_RECIPIENTS:
+            raise serializers.ValidationError(
+                f"At most {settings.BULK_EMAIL_MAX_RECIPIENTS} recipients per request."
+            )
+        return value
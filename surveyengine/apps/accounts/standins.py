@@ -0,0 +1,469 @@
+"""
+Local stand-ins for external services, used by the benchmark commands and tests
+so they never spend real Brevo credits or touch the shared Upstash instance.
+"""
+import email
+import json
+import re
+import socketserver
+import threading
+import time
+import uuid
+from email import policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+OTP_PATTERN = re.compile(r"\b(\d{6})\b")
+
+
+def reset_singletons():
+    """
+    Drops the module level singletons, which hold clients built from the settings they were
+    first used with, so they are rebuilt against fakeredis / the stand-in hosts.
+    """
+    from apps.accounts import existence, surveycache, surveygen, usercache, usernames
+    from apps.auth import brevoclient, emailproviders, gemini, googlecerts, otpstore, tokenblacklist
+
+    brevoclient._registry = None
+    emailproviders._dispatcher = None
+    otpstore._store = None
+    existence._indexes.clear()
+    usernames._allocator = None
+    googlecerts._cache = None
+    tokenblacklist._blacklist = None
+    usercache._local = None
+    surveycache._cache = None
+    surveygen._flight = None
+    gemini._client = None
+
+
+def fakeredis_caches(server=None):
+    """
+    CACHES setting that keeps django-redis (and get_redis()) but talks to an
+    in-process fakeredis server. Use with override_settings(CACHES=...).
+    """
+    try:
+        import fakeredis
+    except ImportError:
+        raise RuntimeError("fakeredis is required for local stand-ins: pip install -r requirements-dev.txt")
+
+    return {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": "redis://fakeredis:6379/0",
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+                "CONNECTION_POOL_KWARGS": {
+                    "connection_class": fakeredis.FakeConnection,
+                    "server": server or fakeredis.FakeServer(),
+                },
+            },
+        }
+    }
+
+
+class OtpInbox:
+    """
+    Last OTP mailed to each address, whichever stand-in delivered it. Share one inbox
+    between several fake providers to follow a login across a failover.
+    """
+
+    def __init__(self):
+        self.sent = 0
+        self.otps = {}
+        self._otp_ready = threading.Condition()
+
+    def deliver(self, addresses, content):
+        match = OTP_PATTERN.search(content or "")
+        with self._otp_ready:
+            for address in addresses:
+                self.sent += 1
+                if match:
+                    self.otps[address] = match.group(1)
+            self._otp_ready.notify_all()
+
+    def wait_for_otp(self, email, timeout=10):
+        """
+        Blocks until an OTP for `email` has been received, then hands it out once.
+        """
+        deadline = time.monotonic() + timeout
+        with self._otp_ready:
+            while email not in self.otps:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"no OTP mailed to {email} within {timeout}s")
+                self._otp_ready.wait(remaining)
+            return self.otps.pop(email)
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    request_queue_size = 1024  # the default backlog of 5 drops connects from a load test
+
+
+class _ServerThread:
+    """
+    Runs a server on 127.0.0.1:<free port> in a daemon thread. Use as a context manager.
+    """
+    server_class = _HTTPServer
+    handler_class = None
+
+    def __init__(self, latency_ms=0, fail_rate=0.0):
+        self.latency_ms = latency_ms
+        self.fail_rate = fail_rate
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.httpd = self.server_class(("127.0.0.1", 0), self.handler_class)
+        self.httpd.daemon_threads = True
+        self.httpd.standin = self
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    def should_fail(self):
+        with self._lock:
+            self.requests += 1
+            # deterministic: every 1/fail_rate-th request fails
+            return self.fail_rate > 0 and self.requests % max(int(1 / self.fail_rate), 1) == 0
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _JsonHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real providers
+
+    def log_message(self, *args):
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _BrevoHandler(_JsonHandler):
+    def do_POST(self):
+        standin = self.server.standin
+        payload = self._read_json()
+        if standin.latency_ms:
+            time.sleep(standin.latency_ms / 1000)
+        if standin.should_fail():
+            self._send_json(503, {"code": "service_unavailable", "message": "stand-in failure"})
+            return
+        if self.path.rstrip("/").endswith("/smtp/email"):
+            self._send_json(201, standin.record(payload))
+        else:
+            self._send_json(404, {"code": "not_found", "message": self.path})
+
+
+class FakeBrevoServer(_ServerThread):
+    """
+    Minimal Brevo transactional email API (POST /v3/smtp/email). Keeps the last OTP
+    mailed to each address so a benchmark can complete the login like a real user.
+    Point the app at it with BREVO_API_HOST=<server.api_host>.
+    """
+    handler_class = _BrevoHandler
+
+    def __init__(self, latency_ms=0, fail_rate=0.0, inbox=None):
+        super().__init__(latency_ms=latency_ms, fail_rate=fail_rate)
+        self.inbox = inbox or OtpInbox()
+        self.sent = 0
+
+    @property
+    def api_host(self):
+        return f"{self.url}/v3"
+
+    def record(self, payload):
+        versions = payload.get("messageVersions") or [{"to": payload.get("to", [])}]
+        content = payload.get("textContent") or payload.get("htmlContent") or ""
+        params = payload.get("params") or {}
+        if params.get("otp"):
+            content = str(params["otp"])
+        for version in versions:
+            addresses = [to["email"] for to in version.get("to", [])]
+            self.sent += len(addresses)
+            self.inbox.deliver(addresses, content)
+        message_ids = [f"<{uuid.uuid4().hex}@standin>" for _ in versions]
+        if payload.get("messageVersions"):
+            return {"messageIds": message_ids}
+        return {"messageId": message_ids[0]}
+
+    def wait_for_otp(self, email, timeout=10):
+        return self.inbox.wait_for_otp(email, timeout=timeout)
+
+
+class _SmtpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    """
+    Just enough SMTP for smtplib / django's smtp backend: no AUTH, no STARTTLS.
+    """
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def read_data(self):
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line or line in (b".\r\n", b".\n"):
+                return b"".join(lines)
+            lines.append(line[1:] if line.startswith(b"..") else line)
+
+    def handle(self):
+        standin = self.server.standin
+        recipients = []
+        self.reply("220 standin ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors="replace").strip()
+            verb = command[:4].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250 standin")
+            elif verb == "MAIL":
+                recipients = []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command.partition(":")[2].strip().strip("<>"))
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = self.read_data()
+                if standin.latency_ms:
+                    time.sleep(standin.latency_ms / 1000)
+                if standin.should_fail():
+                    self.reply("451 stand-in failure")
+                else:
+                    standin.record(recipients, data)
+                    self.reply("250 OK queued")
+            elif verb in ("RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class FakeSmtpServer(_ServerThread):
+    """
+    Plain SMTP sink. Point the smtp provider at it with
+    EMAIL_HOST=server.host, EMAIL_PORT=server.port, EMAIL_USE_TLS=False.
+    """
+    server_class = _SmtpServer
+    handler_class = _SmtpHandler
+
+    def __init__(self, latency_ms=0, fail_rate=0.0, inbox=None):
+        super().__init__(latency_ms=latency_ms, fail_rate=fail_rate)
+        self.inbox = inbox or OtpInbox()
+        self.messages = []
+
+    @property
+    def host(self):
+        return self.httpd.server_address[0]
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    def record(self, recipients, data):
+        message = email.message_from_bytes(data, policy=policy.default)
+        self.messages.append(message)
+        body = message.get_body(preferencelist=("plain", "html"))
+        self.inbox.deliver(recipients, body.get_content() if body else "")
+
+    def wait_for_otp(self, email, timeout=10):
+        return self.inbox.wait_for_otp(email, timeout=timeout)
+
+
+class GoogleKeyFixture:
+    """
+    A local RSA signing key standing in for Google's: publishes {kid: pem} like
+    https://www.googleapis.com/oauth2/v1/certs and mints ID tokens signed with it.
+    """
+
+    def __init__(self, kid=None, bits=2048):
+        import rsa
+
+        public_key, private_key = rsa.newkeys(bits)
+        self.kid = kid or uuid.uuid4().hex
+        self.public_pem = public_key.save_pkcs1().decode()
+        self.private_pem = private_key.save_pkcs1().decode()
+
+    @property
+    def certs(self):
+        return {self.kid: self.public_pem}
+
+    def id_token(self, email, audience, issuer="https://accounts.google.com", lifetime=3600, **claims):
+        from google.auth import crypt, jwt
+
+        now = int(time.time())
+        payload = {
+            "iss": issuer,
+            "aud": audience,
+            "sub": uuid.uuid4().hex,
+            "email": email,
+            "email_verified": True,
+            "iat": now,
+            "exp": now + lifetime,
+            **claims,
+        }
+        signer = crypt.RSASigner.from_string(self.private_pem, key_id=self.kid)
+        return jwt.encode(signer, payload).decode()
+
+
+class _GoogleCertsHandler(_JsonHandler):
+    def do_GET(self):
+        standin = self.server.standin
+        with standin._lock:
+            standin.requests += 1
+        certs = {}
+        for fixture in standin.keys:
+            certs.update(fixture.certs)
+        body = json.dumps(certs).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Cache-Control", f"public, max-age={standin.max_age}, must-revalidate, no-transform")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeGoogleCertsServer(_ServerThread):
+    """
+    Serves the certs of the given GoogleKeyFixture(s) with a Cache-Control max-age.
+    Point the app at it with GOOGLE_CERTS_URL=server.url.
+    """
+    handler_class = _GoogleCertsHandler
+
+    def __init__(self, *keys, max_age=3600):
+        super().__init__()
+        self.keys = list(keys) or [GoogleKeyFixture()]
+        self.max_age = max_age
+
+
+QUESTION_COUNT_PATTERN = re.compile(r"generate (\d+) professional survey questions")
+
+
+def survey_questions_json(count):
+    """
+    A Gemini-style reply: `count` valid survey questions as a JSON array.
+    """
+    kinds = ("multiple-choice", "yes-no", "rating", "text")
+    questions = []
+    for i in range(count):
+        kind = kinds[i % len(kinds)]
+        question = {"type": kind, "question": f"Stand-in question number {i + 1} about the survey?", "required": True}
+        if kind == "multiple-choice":
+            question["options"] = ["Yes", "Somewhat", "No"]
+        questions.append(question)
+    return json.dumps(questions)
+
+
+class _GeminiHandler(_JsonHandler):
+    def do_POST(self):
+        standin = self.server.standin
+        payload = self._read_json()
+        if standin.latency_ms:
+            time.sleep(standin.latency_ms / 1000)
+        if standin.should_fail():
+            self._send_json(503, {"error": {"code": 503, "message": "stand-in failure", "status": "UNAVAILABLE"}})
+            return
+        method = self.path.split("?")[0].rsplit(":", 1)[-1]
+        if method not in ("generateContent", "streamGenerateContent"):
+            self._send_json(404, {"error": {"code": 404, "message": self.path, "status": "NOT_FOUND"}})
+            return
+        prompt = payload["contents"][0]["parts"][0]["text"]
+        match = QUESTION_COUNT_PATTERN.search(prompt)
+        text = standin.reply or survey_questions_json(int(match.group(1)) if match else 5)
+        if method == "streamGenerateContent":
+            self._stream(standin, text)
+            return
+        self._send_json(200, {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}]})
+
+    def _write_chunk(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _stream(self, standin, text):
+        """
+        alt=sse: `chunk_size` characters of the reply per event, `chunk_delay_ms` apart.
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        pieces = [text[i:i + standin.chunk_size] for i in range(0, len(text), standin.chunk_size)]
+        for index, piece in enumerate(pieces):
+            if standin.cut_after is not None and index == standin.cut_after:
+                self.close_connection = True  # dropped mid-reply, no terminating chunk
+                return
+            if index and standin.chunk_delay_ms:
+                time.sleep(standin.chunk_delay_ms / 1000)
+            event = {"candidates": [{"content": {"parts": [{"text": piece}], "role": "model"}}]}
+            self._write_chunk(f"data: {json.dumps(event)}\r\n\r\n".encode())
+        closing = {"candidates": [{"finishReason": "STOP"}], "usageMetadata": {"candidatesTokenCount": len(pieces)}}
+        self._write_chunk(f"data: {json.dumps(closing)}\r\n\r\n".encode())
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class FakeGeminiServer(_ServerThread):
+    """
+    Gemini generateContent and streamGenerateContent (POST /models/<model>:<method>).
+    Answers with as many questions as the survey prompt asks for, or with `reply` verbatim;
+    streamed replies come `chunk_size` characters at a time, `chunk_delay_ms` apart, and
+    the connection is dropped before chunk `cut_after` if set.
+    Point the app at it with GEMINI_API_URL=server.url.
+    """
+    handler_class = _GeminiHandler
+
+    def __init__(self, latency_ms=0, fail_rate=0.0, reply=None, chunk_size=64, chunk_delay_ms=0, cut_after=None):
+        super().__init__(latency_ms, fail_rate)
+        self.reply = reply
+        self.chunk_size = chunk_size
+        self.chunk_delay_ms = chunk_delay_ms
+        self.cut_after = cut_after
+
+
+class _ChatifyHandler(_JsonHandler):
+    def do_POST(self):
+        standin = self.server.standin
+        payload = self._read_json()
+        if standin.latency_ms:
+            time.sleep(standin.latency_ms / 1000)
+        if standin.should_fail():
+            self._send_json(503, {"detail": "stand-in failure"})
+            return
+        self._send_json(200, {"email": payload.get("email"), "chunks": len(payload.get("raw_text", "")) // 500 + 1})
+
+
+class FakeChatifyServer(_ServerThread):
+    """
+    The Chatify feed service. Point the app at it with CHATIFY_FEED_URL=server.url.
+    """
+    handler_class = _ChatifyHandler
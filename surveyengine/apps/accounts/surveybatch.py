@@ -0,0 +1,147 @@
+"""
+Batch survey generation: a list of generate-survey specs fanned out to Gemini with at most
+SURVEY_BATCH_CONCURRENCY calls in flight and SURVEY_BATCH_ITEM_TIMEOUT per item, results
+handed back in completion order.
+
+Each item goes through agenerate_questions, so the generation cache and the singleflight
+apply per item. A failed, timed out or invalid item is reported on its own and does not
+stop the others. Timed out items are cancelled, which also cancels their Gemini request.
+
+The batch runs on an event loop: directly in the async view, and on a loop in a helper
+thread for the sync view (generate_batch), which gets the results through a queue.
+"""
+import asyncio
+import logging
+import queue
+import threading
+from concurrent.futures import CancelledError
+
+from ..auth.asynchttp import close_async_client
+from .serializers import SurveyGenerationSerializer
+from .surveygen import agenerate_questions, sse_event, survey_response
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+def validate_specs(specs):
+    """
+    (validated data, None) or (None, errors) for each spec.
+    """
+    validated = []
+    for spec in specs:
+        serializer = SurveyGenerationSerializer(data=spec)
+        if serializer.is_valid():
+            validated.append((serializer.validated_data, None))
+        else:
+            validated.append((None, serializer.errors))
+    return validated
+
+
+async def agenerate_batch(specs, user, concurrency, item_timeout):
+    """
+    Yields (index, result) as items complete; result is a generate-survey response body,
+    or {"status": "error", ...}. specs come from validate_specs().
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(index, data, errors):
+        if errors:
+            return index, {"status": "error", "message": "Invalid request data", "errors": errors}
+        async with semaphore:
+            try:
+                questions, cached = await asyncio.wait_for(
+                    agenerate_questions(
+                        data['description'], data['question_count'], data['survey_type'],
+                        bypass_cache=data['bypass_cache'], refresh_cache=data['refresh_cache'],
+                    ),
+                    item_timeout,
+                )
+            except asyncio.TimeoutError:
+                return index, {"status": "error", "message": f"Timed out after {item_timeout:g} s"}
+            except Exception as e:
+                logger.error(f"Error in batch survey generation: {e}")
+                return index, {"status": "error", "message": "Internal server error occurred"}
+        return index, survey_response(questions, data['description'], data['survey_type'], user, cached=cached)
+
+    tasks = [asyncio.ensure_future(run(index, data, errors)) for index, (data, errors) in enumerate(specs)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def generate_batch(specs, user, concurrency, item_timeout):
+    """
+    agenerate_batch() for sync views. Closing the generator cancels what is still running.
+    """
+    results = queue.Queue()
+
+    async def produce():
+        try:
+            async for item in agenerate_batch(specs, user, concurrency, item_timeout):
+                results.put(item)
+        finally:
+            await close_async_client()
+            results.put(_DONE)
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name="survey-batch", daemon=True)
+    thread.start()
+    future = asyncio.run_coroutine_threadsafe(produce(), loop)
+    try:
+        while True:
+            item = results.get()
+            if item is _DONE:
+                break
+            yield item
+        future.result()  # raises what broke the batch, if anything
+    finally:
+        future.cancel()
+        try:
+            future.result(timeout=5)
+        except (CancelledError, Exception):
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+def _result_event(index, result, counts):
+    counts["succeeded" if result["status"] == "success" else "failed"] += 1
+    return sse_event('result', {"index": index, **result})
+
+
+def _done_event(counts):
+    status = "success" if not counts["failed"] else "partial" if counts["succeeded"] else "error"
+    return sse_event('done', {"status": status, "total": counts["succeeded"] + counts["failed"], **counts})
+
+
+def batch_events(results):
+    """
+    A `result` event per item as it completes, then `done` with the counts.
+    """
+    counts = {"succeeded": 0, "failed": 0}
+    try:
+        for index, result in results:
+            yield _result_event(index, result, counts)
+    except Exception as e:
+        logger.error(f"Error in batch survey generation: {e}")
+        yield sse_event('error', {"status": "error", "message": "Internal server error occurred"})
+        return
+    yield _done_event(counts)
+
+
+async def abatch_events(results):
+    counts = {"succeeded": 0, "failed": 0}
+    try:
+        async for index, result in results:
+            yield _result_event(index, result, counts)
+    except Exception as e:
+        logger.error(f"Error in batch survey generation: {e}")
+        yield sse_event('error', {"status": "error", "message": "Internal server error occurred"})
+        return
+    yield _done_event(counts)
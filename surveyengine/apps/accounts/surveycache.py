@@ -0,0 +1,81 @@
+"""
+Two-tier cache of generated survey questions, so resubmitting the same survey does not
+spend another Gemini call.
+
+    process memory (SURVEY_CACHE_LOCAL_TTL, LRU)  ->  redis (SURVEY_CACHE_TTL)  ->  Gemini
+
+Keys hash the normalized description (case and whitespace folded), the question count,
+the survey type, the model and the prompt version, so editing the prompt templates or
+switching GEMINI_MODEL starts from an empty cache. Only real Gemini answers are stored,
+never the fallback questions.
+
+A refresh overwrites both tiers here and redis for everyone; other processes may keep
+serving their local copy for up to SURVEY_CACHE_LOCAL_TTL.
+"""
+import copy
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+from ..auth.localcache import CACHE_ERRORS, LocalCache
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_description(description):
+    return " ".join(description.split()).casefold()
+
+
+def generation_key(description, question_count, survey_type, prompt_version):
+    spec = [normalize_description(description), question_count, survey_type, settings.GEMINI_MODEL, prompt_version]
+    digest = hashlib.sha256(json.dumps(spec).encode()).hexdigest()
+    return f"surveygen:{digest}"
+
+
+class GenerationCache:
+    def __init__(self, ttl=None, local=None):
+        self.ttl = settings.SURVEY_CACHE_TTL if ttl is None else ttl
+        self.local = local or LocalCache(
+            settings.SURVEY_CACHE_LOCAL_MAXSIZE, min(settings.SURVEY_CACHE_LOCAL_TTL, self.ttl)
+        )
+
+    def get(self, key):
+        """
+        A copy of the cached questions, or None.
+        """
+        if self.ttl <= 0:
+            return None
+        questions = self.local.get(key)
+        if questions is None:
+            try:
+                questions = cache.get(key)
+            except CACHE_ERRORS as e:
+                logger.warning("survey cache unavailable: %s", e)
+                return None
+            if questions is None:
+                return None
+            self.local.set(key, questions)
+        return copy.deepcopy(questions)
+
+    def set(self, key, questions):
+        if self.ttl <= 0:
+            return
+        questions = copy.deepcopy(questions)
+        self.local.set(key, questions)
+        try:
+            cache.set(key, questions, self.ttl)
+        except CACHE_ERRORS as e:
+            logger.warning("could not cache generated survey %s: %s", key, e)
+
+
+_cache = None
+
+
+def get_generation_cache():
+    global _cache
+    if _cache is None:
+        _cache = GenerationCache()
+    return _cache
@@ -0,0 +1,500 @@
+"""
+Survey question generation with Gemini: the prompt, and turning the reply into
+validated question objects. Shared by the sync and async generate-survey views, and by
+the streaming ones, which send each question as a server-sent event once Gemini has
+produced it.
+"""
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from ..auth.gemini import GeminiError, ask_gemini, ask_gemini_async, astream_gemini, stream_gemini
+from ..auth.singleflight import Singleflight
+from .surveycache import generation_key, get_generation_cache
+
+logger = logging.getLogger(__name__)
+
+VALID_TYPES = ['multiple-choice', 'text', 'yes-no', 'rating']
+
+SYSTEM_TEMPLATE = """
+You are an expert survey designer for government and organizational research. Your task is to create high-quality, unbiased survey questions that will gather meaningful data.
+
+🎯 Survey Context:
+- Type: {survey_type}
+- Purpose: Data collection for policy making and analysis
+- Target: General public/citizens
+- Format: Digital survey platform
+
+📋 Requirements:
+1. Generate EXACTLY {question_count} questions
+2. Mix different question types: multiple-choice, yes-no, rating, text
+3. Questions should be clear, unbiased, and professionally written
+4. Include 2-5 relevant options for multiple-choice questions
+5. Ensure questions gather actionable insights
+6. Use simple, accessible language
+7. Avoid leading or loaded questions
+
+🏛️ Government Survey Best Practices:
+- Neutral and objective tone
+- Culturally sensitive language
+- Accessibility for all education levels
+- Data privacy considerations
+- Actionable for policy decisions
+
+📝 Output Format (JSON):
+Return ONLY a valid JSON array where each question object has:
+{{
+  "id": "1", 
+  "type": "multiple-choice" | "text" | "yes-no" | "rating",
+  "question": "Clear question text",
+  "options": ["option1", "option2", "option3"] (only for multiple-choice),
+  "required": true/false
+}}
+
+🚫 Avoid:
+- Personal or sensitive information requests
+- Leading questions that suggest desired answers
+- Overly technical jargon
+- Questions that could be discriminatory
+"""
+
+PROMPT_TEMPLATE = """
+Based on the following survey description, generate {question_count} professional survey questions:
+
+DESCRIPTION: "{description}"
+
+Requirements:
+- Create a mix of question types (multiple-choice, yes-no, rating, text)
+- Questions should directly relate to the survey description
+- Include clear, actionable options for multiple-choice questions
+- Make questions accessible to general public
+- Ensure questions will provide valuable insights for decision-making
+
+Please generate the questions as a JSON array following the specified format. Return ONLY the JSON array, no additional text.
+"""
+
+# part of the generation cache key: changing either template invalidates cached surveys
+PROMPT_VERSION = hashlib.sha256((SYSTEM_TEMPLATE + PROMPT_TEMPLATE).encode()).hexdigest()[:12]
+
+FALLBACK_QUESTIONS = [
+    {
+        "id": "1",
+        "type": "multiple-choice",
+        "question": "How would you rate your overall satisfaction with current services?",
+        "options": ["Excellent", "Good", "Average", "Poor", "Very Poor"],
+        "required": True
+    },
+    {
+        "id": "2",
+        "type": "yes-no",
+        "question": "Do you think improvements are needed in this area?",
+        "required": True
+    },
+    {
+        "id": "3",
+        "type": "rating",
+        "question": "On a scale of 1-5, how important is this topic to you?",
+        "required": True
+    },
+    {
+        "id": "4",
+        "type": "text",
+        "question": "What specific improvements would you suggest?",
+        "required": False
+    },
+    {
+        "id": "5",
+        "type": "multiple-choice",
+        "question": "What is your primary concern in this area?",
+        "options": ["Accessibility", "Quality", "Cost", "Availability", "Other"],
+        "required": True
+    }
+]
+
+
+def build_prompt(description: str, question_count: int, survey_type: str):
+    """
+    (system message, prompt) for a generation request.
+    """
+    system_message = SYSTEM_TEMPLATE.format(survey_type=survey_type, question_count=question_count)
+    prompt = PROMPT_TEMPLATE.format(description=description, question_count=question_count)
+    return system_message, prompt
+
+
+def format_question(question_data: Dict, question_id: int) -> Dict[str, Any]:
+    """
+    Format and validate a single question
+
+    Args:
+        question_data: Raw question data from AI
+        question_id: Question ID number
+
+    Returns:
+        Formatted question object or None if invalid
+    """
+    try:
+        formatted = {
+            "id": str(question_id),
+            "type": question_data.get('type', 'text'),
+            "question": question_data.get('question', '').strip(),
+            "required": question_data.get('required', True)
+        }
+
+        if formatted['type'] not in VALID_TYPES:
+            formatted['type'] = 'text'
+
+        # Add options for multiple-choice questions
+        if formatted['type'] == 'multiple-choice':
+            options = question_data.get('options', [])
+            if isinstance(options, list) and len(options) >= 2:
+                formatted['options'] = [str(opt).strip() for opt in options[:5]]  # Max 5 options
+            else:
+                # Convert to text if no valid options
+                formatted['type'] = 'text'
+
+        if len(formatted['question']) < 10:
+            return None
+
+        return formatted
+
+    except Exception as e:
+        logger.error(f"Error formatting question: {e}")
+        return None
+
+
+def fallback_questions(count: int) -> List[Dict[str, Any]]:
+    return [dict(question) for question in FALLBACK_QUESTIONS[:count]]
+
+
+def extract_questions(response: str, expected_count: int) -> List[Dict[str, Any]]:
+    """
+    The valid questions in an AI response; ValueError if it holds no JSON array.
+    """
+    response_clean = response.strip()
+
+    # Find JSON array in response
+    start_idx = response_clean.find('[')
+    end_idx = response_clean.rfind(']') + 1
+    if start_idx == -1 or end_idx <= start_idx:
+        raise ValueError("no JSON array in the response")
+
+    questions = json.loads(response_clean[start_idx:end_idx])
+    if not isinstance(questions, list):
+        raise ValueError("the response is not a JSON array")
+
+    formatted_questions = []
+    for i, q in enumerate(questions[:expected_count]):
+        formatted_q = format_question(q, i + 1)
+        if formatted_q:
+            formatted_questions.append(formatted_q)
+    return formatted_questions
+
+
+def parse_questions(response: str, expected_count: int) -> List[Dict[str, Any]]:
+    """
+    Parse AI response and extract survey questions
+
+    Args:
+        response: Raw AI response
+        expected_count: Expected number of questions
+
+    Returns:
+        List of parsed question objects, the fallback questions if nothing parses
+    """
+    try:
+        return extract_questions(response, expected_count)
+    except ValueError as e:  # json.JSONDecodeError included
+        logger.error(f"Error parsing AI response: {e}")
+        return fallback_questions(expected_count)
+
+
+def _cache_lookup(key, bypass_cache, refresh_cache):
+    return None if bypass_cache or refresh_cache else get_generation_cache().get(key)
+
+
+_flight = None
+
+
+def get_generation_flight():
+    """
+    Coalesces identical generations running at the same time in any worker.
+    """
+    global _flight
+    if _flight is None:
+        _flight = Singleflight(
+            "flight", lock_ttl=settings.SURVEY_SINGLEFLIGHT_LOCK_TTL, wait_timeout=settings.SURVEY_SINGLEFLIGHT_WAIT
+        )
+    return _flight
+
+
+def _generate(key, description, question_count, survey_type, store):
+    system_message, prompt = build_prompt(description, question_count, survey_type)
+    try:
+        questions = extract_questions(ask_gemini(prompt, system_message), question_count)
+    except (GeminiError, ValueError) as e:
+        logger.error(f"Survey generation fell back to the default questions: {e}")
+        return fallback_questions(question_count)
+    if questions and store:
+        get_generation_cache().set(key, questions)
+    return questions
+
+
+async def _agenerate(key, description, question_count, survey_type, store):
+    system_message, prompt = build_prompt(description, question_count, survey_type)
+    try:
+        questions = extract_questions(await ask_gemini_async(prompt, system_message), question_count)
+    except (GeminiError, ValueError) as e:
+        logger.error(f"Survey generation fell back to the default questions: {e}")
+        return fallback_questions(question_count)
+    if questions and store:
+        await sync_to_async(get_generation_cache().set, thread_sensitive=False)(key, questions)
+    return questions
+
+
+def generate_questions(description: str, question_count: int, survey_type: str,
+                       bypass_cache: bool = False, refresh_cache: bool = False) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    (questions, served from the cache). bypass_cache skips the cache both ways and makes
+    its own Gemini call, refresh_cache skips the read and stores the new answer. Otherwise
+    requests for the same survey that arrive while one is being generated wait for it.
+    """
+    key = generation_key(description, question_count, survey_type, PROMPT_VERSION)
+    cached = _cache_lookup(key, bypass_cache, refresh_cache)
+    if cached is not None:
+        return cached, True
+    if bypass_cache:
+        return _generate(key, description, question_count, survey_type, store=False), False
+    questions = get_generation_flight().do(
+        key, lambda: _generate(key, description, question_count, survey_type, store=True)
+    )
+    return questions, False
+
+
+async def agenerate_questions(description: str, question_count: int, survey_type: str,
+                              bypass_cache: bool = False, refresh_cache: bool = False):
+    key = generation_key(description, question_count, survey_type, PROMPT_VERSION)
+    cached = await sync_to_async(_cache_lookup, thread_sensitive=False)(key, bypass_cache, refresh_cache)
+    if cached is not None:
+        return cached, True
+    if bypass_cache:
+        return await _agenerate(key, description, question_count, survey_type, store=False), False
+    questions = await get_generation_flight().ado(
+        key, lambda: _agenerate(key, description, question_count, survey_type, store=True)
+    )
+    return questions, False
+
+
+class QuestionStreamParser:
+    """
+    Incremental parser for a JSON array of objects arriving in pieces: feed() returns
+    each top-level object as soon as its closing brace is in. Text before the '['
+    (e.g. a ```json fence) and after the ']' is skipped, like parse_questions does.
+    """
+
+    def __init__(self):
+        self.started = False
+        self.finished = False
+        self._object = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, text: str) -> List[Any]:
+        objects = []
+        for char in text:
+            if self.finished:
+                break
+            if not self.started:
+                self.started = char == '['
+                continue
+            if self._depth == 0:
+                # between elements: commas and whitespace
+                if char == '{':
+                    self._depth = 1
+                    self._object = ['{']
+                elif char == ']':
+                    self.finished = True
+                continue
+
+            self._object.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        objects.append(json.loads(''.join(self._object)))
+                    except ValueError as e:
+                        logger.error(f"Error parsing streamed question: {e}")
+        return objects
+
+
+class QuestionStream:
+    """
+    A streamed reply turned into validated questions, numbered and capped like parse_questions.
+    """
+
+    def __init__(self, question_count: int):
+        self.question_count = question_count
+        self.parser = QuestionStreamParser()
+        self.questions = []
+        self.received = 0
+        self.error = None
+
+    @property
+    def complete(self) -> bool:
+        return self.parser.finished or self.received >= self.question_count
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        new = []
+        for raw in self.parser.feed(text):
+            if self.received >= self.question_count:
+                break
+            self.received += 1
+            question = format_question(raw, self.received) if isinstance(raw, dict) else None
+            if question:
+                new.append(question)
+        self.questions.extend(new)
+        return new
+
+    @property
+    def cacheable(self) -> bool:
+        return self.error is None and self.complete and bool(self.questions)
+
+    def finish(self):
+        """
+        The closing events: the fallback questions if nothing usable came through, then done.
+        """
+        events = []
+        fallback = not self.questions
+        if fallback:
+            if self.error is None:
+                logger.error("Streamed AI response held no questions")
+            self.questions = fallback_questions(self.question_count)
+            events = [('question', question) for question in self.questions]
+        events.append(('done', {'questions': self.questions, 'cached': False}))
+        return events
+
+
+def stream_questions(description: str, question_count: int, survey_type: str,
+                     bypass_cache: bool = False, refresh_cache: bool = False):
+    """
+    Yields ('question', question) as each one is complete, then ('done', {'questions', 'cached'}).
+    Cached surveys are replayed at once; the cache flags work as in generate_questions.
+    """
+    key = generation_key(description, question_count, survey_type, PROMPT_VERSION)
+    cached = _cache_lookup(key, bypass_cache, refresh_cache)
+    if cached is not None:
+        yield from (('question', question) for question in cached)
+        yield 'done', {'questions': cached, 'cached': True}
+        return
+
+    system_message, prompt = build_prompt(description, question_count, survey_type)
+    stream = QuestionStream(question_count)
+    chunks = stream_gemini(prompt, system_message)
+    try:
+        for chunk in chunks:
+            yield from (('question', question) for question in stream.feed(chunk))
+            if stream.complete:
+                break
+    except GeminiError as e:
+        stream.error = e
+    finally:
+        chunks.close()
+
+    if stream.cacheable and not bypass_cache:
+        get_generation_cache().set(key, stream.questions)
+    yield from stream.finish()
+
+
+async def astream_questions(description: str, question_count: int, survey_type: str,
+                            bypass_cache: bool = False, refresh_cache: bool = False):
+    key = generation_key(description, question_count, survey_type, PROMPT_VERSION)
+    cached = await sync_to_async(_cache_lookup, thread_sensitive=False)(key, bypass_cache, refresh_cache)
+    if cached is not None:
+        for question in cached:
+            yield 'question', question
+        yield 'done', {'questions': cached, 'cached': True}
+        return
+
+    system_message, prompt = build_prompt(description, question_count, survey_type)
+    stream = QuestionStream(question_count)
+    chunks = astream_gemini(prompt, system_message)
+    try:
+        async for chunk in chunks:
+            for question in stream.feed(chunk):
+                yield 'question', question
+            if stream.complete:
+                break
+    except GeminiError as e:
+        stream.error = e
+    finally:
+        await chunks.aclose()
+
+    if stream.cacheable and not bypass_cache:
+        await sync_to_async(get_generation_cache().set, thread_sensitive=False)(key, stream.questions)
+    for event in stream.finish():
+        yield event
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def survey_event(event, data, description, survey_type, user) -> str:
+    """
+    One generate-survey/stream/ event; 'done' carries the same body as generate-survey/.
+    """
+    if event == 'done':
+        data = survey_response(data['questions'], description, survey_type, user, cached=data['cached'])
+    return sse_event(event, data)
+
+
+def survey_events(events, description, survey_type, user):
+    try:
+        for event, data in events:
+            yield survey_event(event, data, description, survey_type, user)
+    except Exception as e:
+        logger.error(f"Error in streamed survey generation: {e}")
+        yield sse_event('error', {"status": "error", "message": "Internal server error occurred"})
+
+
+async def asurvey_events(events, description, survey_type, user):
+    try:
+        async for event, data in events:
+            yield survey_event(event, data, description, survey_type, user)
+    except Exception as e:
+        logger.error(f"Error in streamed survey generation: {e}")
+        yield sse_event('error', {"status": "error", "message": "Internal server error occurred"})
+
+
+def survey_response(questions, description, survey_type, user, cached=False):
+    """
+    Body of a successful generate-survey response.
+    """
+    return {
+        "status": "success",
+        "questions": questions,
+        "metadata": {
+            "description": description,
+            "question_count": len(questions),
+            "survey_type": survey_type,
+            "ai_generated": True,
+            "model": settings.GEMINI_MODEL,
+            "cached": cached,
+            "generated_by": user.email if user.is_authenticated else "anonymous"
+        }
+    }
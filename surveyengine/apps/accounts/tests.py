@@ -1,3 +1,1656 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from io import BytesIO, StringIO
+from unittest import mock
+
+import redis
+from django.conf import settings
+from django.contrib.auth.hashers import MD5PasswordHasher, check_password, make_password
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path
+from redis.client import Pipeline
+from rest_framework_simplejwt.exceptions import TokenError
+
+from apps.auth import (
+    emailproviders, emailqueue, gemini, googlecerts, otpstore, otptemplates, passwords, tokenblacklist,
+)
+from apps.auth.asynchttp import close_async_client
+from apps.auth.brevoclient import BrevoClientRegistry
+from apps.auth.emailqueue import EmailQueue
+from apps.auth.localcache import LocalCache
+from apps.auth.ratelimit import SlidingWindowLimiter, failures_key
+from apps.auth.singleflight import Singleflight
+from apps.auth.RedisUtils.maincache import get_redis
+from apps.auth.otpsender import (
+    LoginOtpSender,
+    RegistrationOtpSender,
+    forgetPasswordOtpSender,
+)
+
+from . import existence, surveycache, surveygen, usercache, usernames
+from .api import urls as api_urls
+from .api.asyncviews import with_async_views
+from .login import LoginPipeline
+from .invitations import render_invitation
+from .models import InvitationCampaign, User
+from .serializers import CustomTokenObtainPairSerializer
+from .standins import (
+    FakeBrevoServer,
+    FakeChatifyServer,
+    FakeGeminiServer,
+    FakeGoogleCertsServer,
+    GoogleKeyFixture,
+    fakeredis_caches,
+    reset_singletons,
+    survey_questions_json,
+)
+from .surveygen import QuestionStreamParser, fallback_questions
+from .tokens import RedisRefreshToken
+
+
+class CountingMD5PasswordHasher(MD5PasswordHasher):
+    """
+    MD5 to keep the tests fast; counts every hash computed.
+    """
+    hashes = 0
+
+    def encode(self, password, salt):
+        CountingMD5PasswordHasher.hashes += 1
+        return super().encode(password, salt)
+
+
+@override_settings(
+    CACHES=fakeredis_caches(),
+    PASSWORD_HASHERS=['apps.accounts.tests.CountingMD5PasswordHasher'],
+    PASSWORD_HASH_WORKERS=0,
+    EMAIL_QUEUE_EAGER=False,
+    OTP_RATE_LIMITS={'issue': {}, 'verify': {}},
+)
+class StandinTestCase(TestCase):
+    """
+    Runs against fakeredis, never the configured redis or email providers.
+    """
+
+    def setUp(self):
+        reset_singletons()
+        self.addCleanup(reset_singletons)
+        get_redis().flushdb()
+
+    def count_redis_calls(self):
+        """
+        Patches Redis.execute_command (pipelines excluded) and returns the mock.
+        """
+        patcher = mock.patch.object(
+            redis.Redis, 'execute_command', autospec=True, side_effect=redis.Redis.execute_command
+        )
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+
+class LoginPipelineTests(StandinTestCase):
+    password = 'Login-pass-123'
+
+    def setUp(self):
+        super().setUp()
+        self.user = User(email='login@example.com')
+        self.user.set_password(self.password)
+        self.user.save()
+        # load the verify script once so NOSCRIPT retries do not show up in the counts
+        LoginOtpSender('warmup@example.com').check_otp('000000')
+
+    def login_data(self, otp, password=None):
+        return {'email': self.user.email, 'password': password or self.password, 'otp': otp}
+
+    def test_login_is_one_query_one_hash_one_redis_call(self):
+        otp = LoginOtpSender(self.user.email).generate_otp()
+        CountingMD5PasswordHasher.hashes = 0
+        redis_calls = self.count_redis_calls()
+
+        started = time.perf_counter()
+        with self.assertNumQueries(1):
+            serializer = CustomTokenObtainPairSerializer(data=self.login_data(otp))
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        self.assertEqual(CountingMD5PasswordHasher.hashes, 1)
+        self.assertEqual(redis_calls.call_count, 1)
+        self.assertEqual(set(serializer.validated_data), {'access', 'refresh'})
+        self.assertLess(elapsed_ms, 500)
+
+    def test_pipeline_records_step_timings(self):
+        otp = LoginOtpSender(self.user.email).generate_otp()
+        pipeline = LoginPipeline()
+        pipeline.authenticate(self.user.email, self.password, otp)
+        self.assertEqual(set(pipeline.timings), {'fetch_user', 'verify_password', 'verify_otp', 'total'})
+        self.assertGreaterEqual(pipeline.timings['total'], pipeline.timings['verify_password'])
+
+    def test_otp_is_consumed(self):
+        otp = LoginOtpSender(self.user.email).generate_otp()
+        self.assertTrue(CustomTokenObtainPairSerializer(data=self.login_data(otp)).is_valid())
+        serializer = CustomTokenObtainPairSerializer(data=self.login_data(otp))
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('Invalid or expired OTP.', str(serializer.errors))
+
+    def test_wrong_password_keeps_the_otp(self):
+        otp = LoginOtpSender(self.user.email).generate_otp()
+        serializer = CustomTokenObtainPairSerializer(data=self.login_data(otp, password='wrong-password'))
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('Password is incorrect', str(serializer.errors))
+        self.assertTrue(CustomTokenObtainPairSerializer(data=self.login_data(otp)).is_valid())
+
+    def test_login_view_is_one_query(self):
+        otp = LoginOtpSender(self.user.email).generate_otp()
+        with self.assertNumQueries(1):
+            response = self.client.post('/api/users/login/', self.login_data(otp), content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+
+
+@override_settings(OTP_MAX_FAILED_ATTEMPTS=3)
+class HashOtpStoreTests(StandinTestCase):
+    email = 'Otp.User@Example.com'
+
+    def setUp(self):
+        super().setUp()
+        self.store = otpstore.HashOtpStore()
+        self.key = self.store.key(self.email)
+
+    def fields(self):
+        return {name.decode(): value.decode() for name, value in get_redis().hgetall(self.key).items()}
+
+    def test_only_a_digest_is_stored(self):
+        otp = self.store.issue(self.email, 'login')
+        fields = self.fields()
+        self.assertEqual(set(fields), {'login', 'login:t'})
+        self.assertNotIn(otp, fields['login'])
+        self.assertEqual(fields['login'], self.store.digest(self.email, 'login', otp))
+        self.assertEqual(self.key, 'otp:otp.user@example.com')
+        self.assertTrue(0 < get_redis().ttl(self.key) <= otpstore.OTP_TTL)
+
+    def test_wrong_codes_are_counted_and_burn_the_otp(self):
+        otp = self.store.issue(self.email, 'login')
+        wrong = '000000' if otp != '000000' else '111111'
+        self.assertEqual(self.store.verify(self.email, 'login', wrong), (False, 1))
+        self.assertEqual(self.fields()['login:n'], '1')
+        self.assertEqual(self.store.verify(self.email, 'login', wrong), (False, 2))
+        self.assertEqual(self.store.verify(self.email, 'login', wrong), (False, 3))
+        self.assertNotIn('login', self.fields())  # burned
+        self.assertEqual(self.store.verify(self.email, 'login', otp)[0], False)
+
+    def test_reissue_resets_the_failure_count(self):
+        self.store.issue(self.email, 'login')
+        self.store.verify(self.email, 'login', 'nope')
+        self.store.verify(self.email, 'login', 'nope')
+        otp = self.store.issue(self.email, 'login')
+        self.assertNotIn('login:n', self.fields())
+        self.assertEqual(self.store.verify(self.email, 'login', otp), (True, 0))
+        self.assertEqual(self.fields(), {})
+
+    def test_purposes_do_not_share_codes(self):
+        otp = self.store.issue(self.email, 'login')
+        self.assertEqual(self.store.verify(self.email, 'register', otp)[0], False)
+        self.assertEqual(self.store.verify(self.email, 'login', otp), (True, 0))
+
+    def test_concurrent_verify_consumes_once(self):
+        otp = self.store.issue(self.email, 'login')
+        barrier = threading.Barrier(8)
+
+        def verify(_):
+            barrier.wait()
+            return self.store.verify(self.email, 'login', otp)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(verify, range(8)))
+        self.assertEqual(results.count((True, 0)), 1, results)
+        self.assertEqual(self.fields().get('login'), None)
+
+    def test_lockout_after_max_failed_attempts(self):
+        otp = self.store.issue(self.email, 'login')
+        for attempt in range(1, 4):
+            self.assertEqual(self.store.verify(self.email, 'login', 'nope', consume=False), (False, attempt))
+        # the right code no longer works, and every miss went to the lockout window
+        self.assertEqual(self.store.verify(self.email, 'login', otp), (False, 4))
+        self.assertEqual(get_redis().zcard(failures_key(self.email)), 4)
+        self.assertTrue(0 < get_redis().ttl(failures_key(self.email)) <= settings.OTP_LOCKOUT_WINDOW)
+
+        otp = self.store.issue(self.email, 'login')
+        self.assertEqual(self.store.verify(self.email, 'login', otp, consume=False), (True, 0))
+        self.assertEqual(get_redis().zcard(failures_key(self.email)), 4)  # checking does not clear it
+        self.assertEqual(self.store.verify(self.email, 'login', otp), (True, 0))
+        self.assertFalse(get_redis().exists(failures_key(self.email)))
+
+    @override_settings(OTP_FIELD_EXPIRY=True)
+    def test_field_expiry(self):
+        store = otpstore.HashOtpStore()
+        store.issue(self.email, 'login')
+        ttls = get_redis().httl(self.key, 'login', 'login:t')
+        self.assertTrue(all(0 < ttl <= otpstore.OTP_TTL for ttl in ttls), ttls)
+
+
+@override_settings(EMAIL_QUEUE_MAX_ATTEMPTS=3, EMAIL_QUEUE_RETRY_BACKOFF=10, EMAIL_QUEUE_DEAD_TTL=600)
+class EmailQueueTests(StandinTestCase):
+    worker = 'test:0'
+
+    def setUp(self):
+        super().setUp()
+        self.queue = EmailQueue()
+        self.sent = []
+        patcher = mock.patch.dict(emailqueue.HANDLERS, {'otp': self.failing, 'invitation_campaign': self.failing})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def failing(self, job):
+        self.sent.append(job)
+        raise RuntimeError('provider down')
+
+    def run_once(self):
+        raw = self.queue.reserve(self.worker, timeout=1)
+        self.assertIsNotNone(raw)
+        return self.queue.process(self.worker, raw)
+
+    def retry_jobs(self):
+        return [(json.loads(raw), due) for raw, due in get_redis().zrange(emailqueue.RETRY_KEY, 0, -1, withscores=True)]
+
+    def test_failures_back_off_exponentially(self):
+        self.queue.enqueue_otp('login', 'a@example.com', '123456')
+        started = time.time()
+        self.assertFalse(self.run_once())
+        [(job, due)] = self.retry_jobs()
+        self.assertEqual(job['attempts'], 1)
+        self.assertAlmostEqual(due - started, 10, delta=1)
+
+        self.assertEqual(self.queue.promote_due(), 0)  # not due yet
+        with mock.patch('apps.auth.emailqueue.time.time', return_value=due):
+            self.assertEqual(self.queue.promote_due(), 1)
+        self.assertFalse(self.run_once())
+        [(job, due)] = self.retry_jobs()
+        self.assertEqual(job['attempts'], 2)
+        self.assertAlmostEqual(due - time.time(), 20, delta=1)
+        self.assertEqual(get_redis().llen(emailqueue.PROCESSING_KEY.format(worker=self.worker)), 0)
+
+    def dead_letter(self, kind, **payload):
+        get_redis().lpush(emailqueue.PENDING_KEY, json.dumps(
+            {'id': kind, 'kind': kind, 'attempts': 2, 'enqueued_at': time.time(), **payload}
+        ))
+        self.assertFalse(self.run_once())
+
+    def test_otp_jobs_never_carry_the_code(self):
+        job_id = self.queue.enqueue_otp('login', 'a@example.com', '123456')
+        [raw] = get_redis().lrange(emailqueue.PENDING_KEY, 0, -1)
+        self.assertNotIn(b'123456', raw)
+        code_key = emailqueue.OTP_CODE_KEY.format(id=job_id)
+        self.assertEqual(get_redis().get(code_key), b'123456')
+        self.assertTrue(0 < get_redis().ttl(code_key) <= otpstore.OTP_TTL)
+
+        self.sent_codes = []
+        with mock.patch('apps.auth.emailqueue._send_otp', side_effect=lambda *args: self.sent_codes.append(args)), \
+                mock.patch.dict(emailqueue.HANDLERS, {'otp': emailqueue._deliver_otp}):
+            self.assertTrue(self.run_once())
+        self.assertEqual(self.sent_codes, [('login', 'a@example.com', '123456')])
+        self.assertFalse(get_redis().exists(code_key))
+
+    def test_otp_job_whose_code_expired_is_not_sent(self):
+        job_id = self.queue.enqueue_otp('login', 'a@example.com', '123456')
+        get_redis().delete(emailqueue.OTP_CODE_KEY.format(id=job_id))
+        with mock.patch('apps.auth.emailqueue._send_otp') as send, \
+                mock.patch.dict(emailqueue.HANDLERS, {'otp': emailqueue._deliver_otp}):
+            self.run_once()
+        send.assert_not_called()
+        self.assertEqual(self.queue.stats(), {'pending': 0, 'retry': 0, 'dead': 0})
+
+    def test_last_attempt_dead_letters_and_deletes_the_code(self):
+        get_redis().set(emailqueue.OTP_CODE_KEY.format(id='otp'), '123456')
+        self.dead_letter('otp', purpose='login', email='a@example.com')
+        self.assertFalse(get_redis().exists(emailqueue.OTP_CODE_KEY.format(id='otp')))
+        [raw] = get_redis().lrange(emailqueue.DEAD_KEY, 0, -1)
+        job = json.loads(raw)
+        self.assertEqual(job['last_error'], 'provider down')
+        self.assertTrue(0 < get_redis().ttl(emailqueue.DEAD_KEY) <= 600)
+        self.assertEqual(self.queue.stats(), {'pending': 0, 'retry': 0, 'dead': 1})
+
+    def test_requeue_dead_discards_otp_jobs(self):
+        self.dead_letter('otp', purpose='login', email='a@example.com')
+        self.dead_letter('invitation_campaign', campaign_id=1)
+        self.assertEqual(self.queue.requeue_dead(), 1)
+        [raw] = get_redis().lrange(emailqueue.PENDING_KEY, 0, -1)
+        job = json.loads(raw)
+        self.assertEqual((job['kind'], job['attempts']), ('invitation_campaign', 0))
+        self.assertEqual(get_redis().llen(emailqueue.DEAD_KEY), 0)
+
+    def test_expired_otp_jobs_are_dropped(self):
+        expired = time.time() - otpstore.OTP_TTL
+        get_redis().lpush(emailqueue.PENDING_KEY, json.dumps(
+            {'id': 'old', 'kind': 'otp', 'attempts': 0, 'enqueued_at': expired, 'purpose': 'login',
+             'email': 'a@example.com'}
+        ))
+        self.assertFalse(self.run_once())
+        self.assertEqual(self.sent, [])
+        self.assertEqual(self.queue.stats(), {'pending': 0, 'retry': 0, 'dead': 0})
+
+    def test_otp_expiring_while_retried_is_not_dead_lettered(self):
+        self.queue.enqueue_otp('login', 'a@example.com', '123456')
+        raw = self.queue.reserve(self.worker, timeout=1)
+        with mock.patch('apps.auth.emailqueue.time.time', return_value=time.time() + otpstore.OTP_TTL):
+            self.queue.fail(self.worker, raw, RuntimeError('provider down'))
+        self.assertEqual(self.queue.stats(), {'pending': 0, 'retry': 0, 'dead': 0})
+
+
+@override_settings(
+    OTP_RATE_LIMITS={'issue': {}, 'verify': {'email': (3, 60), 'ip': (5, 60)}},
+    OTP_LOCKOUT_THRESHOLD=3,
+    OTP_LOCKOUT_WINDOW=600,
+    OTP_MAX_FAILED_ATTEMPTS=10,
+)
+class SlidingWindowLimiterTests(StandinTestCase):
+    def setUp(self):
+        super().setUp()
+        self.limiter = SlidingWindowLimiter('verify')
+
+    def test_window_slides_and_rejected_hits_are_not_recorded(self):
+        for now in (1000, 1001, 1002):
+            self.assertTrue(self.limiter.hit(email='a@example.com', now=now).allowed)
+        result = self.limiter.hit(email='a@example.com', now=1003)
+        self.assertFalse(result.allowed)
+        self.assertEqual(result.retry_after, 57)  # until the hit at 1000 leaves the window
+        self.assertEqual(self.limiter.hit(email='A@Example.com', now=1030).retry_after, 30)
+        self.assertEqual(get_redis().zcard('ratelimit:verify:email:a@example.com'), 3)
+        self.assertTrue(self.limiter.hit(email='a@example.com', now=1060.5).allowed)
+
+    def test_ip_window_spans_emails(self):
+        for i in range(5):
+            self.assertTrue(self.limiter.hit(email=f'{i}@example.com', ip='10.0.0.1', now=1000 + i).allowed)
+        result = self.limiter.hit(email='new@example.com', ip='10.0.0.1', now=1010)
+        self.assertEqual((result.allowed, result.reason), (False, 'too many requests for this ip'))
+        # the rejected request was not counted against the email either
+        self.assertEqual(get_redis().zcard('ratelimit:verify:email:new@example.com'), 0)
+
+    def test_failed_verifications_lock_the_email_out(self):
+        sender = LoginOtpSender('a@example.com')
+        otp = sender.generate_otp()
+        for _ in range(3):
+            self.assertFalse(sender.check_otp('000000'))
+        result = self.limiter.hit(email='a@example.com')
+        self.assertEqual((result.allowed, result.reason), (False, 'too many failed OTP attempts'))
+        self.assertAlmostEqual(result.retry_after, 600, delta=5)
+        self.assertTrue(sender.validate_otp(otp))  # a successful verification clears the failures
+        self.assertTrue(self.limiter.hit(email='a@example.com').allowed)
+
+
+class ScriptedProvider:
+    """
+    An email provider that answers from a script: None sends, an exception is raised.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.outcomes = []
+        self.calls = 0
+
+    def send(self, message):
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if self.outcomes else None
+        if outcome is not None:
+            raise outcome
+
+
+@override_settings(EMAIL_CIRCUIT_FAILURE_THRESHOLD=2, EMAIL_CIRCUIT_RESET_TIMEOUT=30)
+class EmailDispatcherTests(StandinTestCase):
+    message = emailproviders.OutboundEmail(to_email='a@example.com', subject='OTP', text_content='123456')
+
+    def setUp(self):
+        super().setUp()
+        self.dispatcher = emailproviders.EmailDispatcher(provider_names=['brevo', 'smtp'])
+        self.brevo, self.smtp = ScriptedProvider('brevo'), ScriptedProvider('smtp')
+        self.dispatcher.providers = [self.brevo, self.smtp]
+
+    def test_untried_providers_follow_healthy_ones_in_configured_order(self):
+        self.assertEqual(self.dispatcher.ordered(), [self.brevo, self.smtp])
+        self.dispatcher.health['smtp'].record_success(20)
+        self.assertEqual(self.dispatcher.ordered(), [self.smtp, self.brevo])
+        self.dispatcher.health['brevo'].record_success(10)
+        self.assertEqual(self.dispatcher.ordered(), [self.brevo, self.smtp])
+
+    def test_failing_provider_opens_its_circuit_and_is_probed_after_the_timeout(self):
+        self.dispatcher.health['brevo'].record_success(10)
+        self.dispatcher.health['smtp'].record_success(1000)
+        down = emailproviders.EmailProviderError('brevo: 503 Service Unavailable')
+        self.brevo.outcomes = [down, down]
+        self.assertEqual(self.dispatcher.send(self.message), 'smtp')
+        self.assertEqual(self.dispatcher.health['brevo'].state, 'closed')
+        self.assertEqual(self.dispatcher.send(self.message), 'smtp')
+        self.assertEqual(self.dispatcher.health['brevo'].state, 'open')
+
+        self.assertEqual(self.dispatcher.send(self.message), 'smtp')
+        self.assertEqual(self.brevo.calls, 2)  # skipped while open
+
+        later = time.monotonic() + 31
+        with mock.patch('apps.auth.emailproviders.time.monotonic', return_value=later):
+            self.brevo.outcomes = [ConnectionError('connection refused')]
+            self.assertEqual(self.dispatcher.send(self.message), 'smtp')  # failed probe, open again
+            self.assertEqual(self.dispatcher.health['brevo'].state, 'open')
+        with mock.patch('apps.auth.emailproviders.time.monotonic', return_value=later + 31):
+            self.assertEqual(self.dispatcher.send(self.message), 'brevo')
+        self.assertEqual(self.dispatcher.health['brevo'].state, 'closed')
+
+    def test_every_provider_down_raises(self):
+        self.brevo.outcomes = [ConnectionError('refused')]
+        self.smtp.outcomes = [emailproviders.EmailProviderError('smtp: timed out')]
+        with self.assertRaises(emailproviders.EmailProviderError):
+            self.dispatcher.send(self.message)
+
+    def test_brevo_client_errors_do_not_count_against_it(self):
+        from sib_api_v3_sdk.rest import ApiException
+
+        registry = mock.Mock()
+        self.dispatcher.providers = [emailproviders.BrevoProvider()]
+        with mock.patch('apps.auth.emailproviders.get_brevo_registry', return_value=registry):
+            registry.send_transac_email.side_effect = ApiException(status=400, reason='Bad Request')
+            for _ in range(3):
+                with self.assertRaises(emailproviders.EmailProviderError):
+                    self.dispatcher.send(self.message)
+            self.assertEqual(self.dispatcher.stats()['brevo']['state'], 'closed')
+            self.assertEqual(self.dispatcher.stats()['brevo']['rejected'], 3)
+
+            registry.send_transac_email.side_effect = ApiException(status=429, reason='Too Many Requests')
+            for _ in range(2):
+                with self.assertRaises(emailproviders.EmailProviderError):
+                    self.dispatcher.send(self.message)
+            self.assertEqual(self.dispatcher.stats()['brevo']['state'], 'open')
+
+
+@override_settings(GOOGLE_CERTS_REFRESH_AHEAD=0, GOOGLE_CERTS_MIN_REFRESH_INTERVAL=60)
+class GoogleCertCacheTests(StandinTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.first_key = GoogleKeyFixture(kid='first', bits=512)
+        cls.rotated_key = GoogleKeyFixture(kid='rotated', bits=512)
+
+    def setUp(self):
+        super().setUp()
+        self.server = FakeGoogleCertsServer(self.first_key, max_age=120).start()
+        self.addCleanup(self.server.stop)
+        self.cache = googlecerts.GoogleCertCache(url=self.server.url)
+
+    def test_cache_control_max_age_is_honoured(self):
+        self.assertEqual(set(self.cache.certs()), {'first'})
+        self.assertAlmostEqual(self.cache._entry.expires_at - time.time(), 120, delta=2)
+        self.assertTrue(110 < get_redis().ttl(googlecerts.CERTS_KEY) <= 120)
+        self.cache.certs()
+        self.assertEqual(self.server.requests, 1)
+
+        with mock.patch('apps.auth.googlecerts.time.time', return_value=time.time() + 121):
+            self.cache.certs()
+        self.assertEqual(self.server.requests, 2)
+
+    def test_unknown_kid_forces_one_refresh(self):
+        self.cache.certs('first')
+        self.server.keys.append(self.rotated_key)
+        with mock.patch('apps.auth.googlecerts.time.time', return_value=time.time() + 61):
+            self.assertIn('rotated', self.cache.certs('rotated'))
+            self.assertIn('rotated', self.cache.certs('rotated'))
+            for _ in range(3):
+                self.assertNotIn('forged', self.cache.certs('forged'))  # at most once per interval
+        self.assertEqual(self.server.requests, 2)
+        self.assertEqual(self.cache.fetches, 2)
+
+    def test_cold_process_reads_the_redis_tier(self):
+        self.cache.certs()
+        other_worker = googlecerts.GoogleCertCache(url=self.server.url)
+        self.assertEqual(set(other_worker.certs('first')), {'first'})
+        self.assertEqual(other_worker.fetches, 0)
+        self.assertEqual(self.server.requests, 1)
+
+
+class OtpTemplateTests(StandinTestCase):
+    otp = '493817'
+
+    def test_minifier(self):
+        html = """
+            <!-- layout -->
+            <!--[if mso]><table><![endif]-->
+            <style type="text/css">
+                /* reset */
+                body  { margin : 0 ;
+                        color: #333 }
+            </style>
+            <p>
+                Your   code
+            </p>   <b>{{ otp }}</b>
+        """
+        self.assertEqual(
+            otptemplates.minify_html(html),
+            '<!--[if mso]><table><![endif]--><style type="text/css">body{margin:0;color:#333}</style>'
+            '<p> Your code </p><b>{{ otp }}</b>',
+        )
+
+    def test_placeholder_split(self):
+        template = otptemplates.CompiledTemplate('<b>{{ otp }}</b> expires in 5 minutes: {{ otp }}')
+        self.assertEqual(template.parts, (b'<b>', b'</b> expires in 5 minutes: ', b''))
+        self.assertEqual(template.render(self.otp), f'<b>{self.otp}</b> expires in 5 minutes: {self.otp}')
+        self.assertEqual(otptemplates.CompiledTemplate('no code').render(self.otp), 'no code')
+
+    def test_every_shipped_template_shows_the_otp_once(self):
+        for purpose in otptemplates.PURPOSES:
+            with self.subTest(purpose=purpose):
+                text, html = otptemplates.OtpTemplate(purpose).render(self.otp)
+                self.assertEqual(text.count(self.otp), 1)
+                self.assertEqual(html.count(self.otp), 1)
+                self.assertNotIn(otptemplates.PLACEHOLDER, text + html)
+                self.assertNotIn('\n', html)
+
+    @override_settings(BREVO_OTP_TEMPLATE_IDS={'login': 12})
+    def test_brevo_template_id_sends_only_the_otp(self):
+        registry = mock.Mock()
+        dispatcher = emailproviders.EmailDispatcher()
+        dispatcher.providers = [emailproviders.BrevoProvider()]
+        with mock.patch('apps.auth.baseotp.get_email_dispatcher', return_value=dispatcher), \
+                mock.patch('apps.auth.emailproviders.get_brevo_registry', return_value=registry):
+            LoginOtpSender('citizen@example.com').deliver(self.otp)
+            forgetPasswordOtpSender('citizen@example.com').deliver(self.otp)
+
+        templated, rendered = [call.args[0] for call in registry.send_transac_email.call_args_list]
+        self.assertEqual((templated.template_id, templated.params), (12, {'otp': self.otp}))
+        self.assertIsNone(templated.html_content)
+        self.assertIsNone(templated.text_content)
+        self.assertIsNone(rendered.template_id)
+        self.assertIn(self.otp, rendered.html_content)
+
+
+class BrevoClientRegistryTests(StandinTestCase):
+    def setUp(self):
+        super().setUp()
+        self.registry = BrevoClientRegistry(pool_size=2, idle_timeout=60, request_timeout=5)
+        self.addCleanup(self.registry.close)
+
+    def test_one_client_per_api_key(self):
+        first = self.registry.get('key-a')
+        self.assertIs(self.registry.get('key-a'), first)
+        other = self.registry.get('key-b')
+        self.assertIsNot(other, first)
+        self.assertEqual(first.api_client.configuration.api_key['api-key'], 'key-a')
+        self.assertEqual(other.api_client.configuration.api_key['api-key'], 'key-b')
+        self.assertEqual(self.registry.stats()['clients'], 2)
+
+    def test_idle_client_is_rebuilt_without_closing_it(self):
+        started = time.monotonic()
+        old = self.registry.get('key-a')
+        pool_manager = old.api_client.rest_client.pool_manager
+        pool_manager.connection_from_host('api.brevo.com', 443, 'https')  # a send in flight
+
+        with mock.patch('apps.auth.brevoclient.time.monotonic', return_value=started + 59):
+            self.assertIs(self.registry.get('key-a'), old)  # last use is refreshed
+        with mock.patch('apps.auth.brevoclient.time.monotonic', return_value=started + 59 + 61):
+            rebuilt = self.registry.get('key-a')
+        self.assertIsNot(rebuilt, old)
+        self.assertEqual(len(pool_manager.pools), 1)  # left to the thread still using it
+        self.assertEqual(self.registry.stats()['clients'], 1)
+
+
+@override_settings(
+    PASSWORD_HASHERS=['apps.auth.passwords.TunedArgon2PasswordHasher', 'django.contrib.auth.hashers.MD5PasswordHasher'],
+    PASSWORD_ARGON2_TIME_COST=1,
+    PASSWORD_ARGON2_MEMORY_COST=1024,
+    PASSWORD_ARGON2_PARALLELISM=1,
+)
+class PasswordHashingTests(StandinTestCase):
+    password = 'Hash-pass-123'
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(passwords.shutdown_pool)
+        self.user = User.objects.create(email='hash@example.com', password=make_password(self.password, hasher='md5'))
+
+    def stored_hash(self):
+        return User.objects.values_list('password', flat=True).get(pk=self.user.pk)
+
+    def test_legacy_hash_is_upgraded_on_login(self):
+        self.assertFalse(passwords.verify_password(self.user, 'wrong'))
+        self.assertTrue(self.stored_hash().startswith('md5$'))
+        self.assertTrue(passwords.verify_password(self.user, self.password))
+        self.assertTrue(self.stored_hash().startswith('argon2$argon2id$v=19$m=1024,t=1,p=1$'))
+
+    def test_raising_a_cost_rehashes_on_the_next_login(self):
+        passwords.verify_password(self.user, self.password)
+        with override_settings(PASSWORD_ARGON2_TIME_COST=2):
+            self.assertTrue(passwords.verify_password(self.user, self.password))
+            self.assertIn('t=2', self.stored_hash())
+            with self.assertNumQueries(0):  # current hash, nothing to write
+                self.assertTrue(passwords.verify_password(self.user, self.password))
+
+    @override_settings(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_TIMEOUT=30)
+    def test_pool_hashes_and_upgrades(self):
+        self.assertTrue(passwords.verify_password(self.user, self.password))
+        self.assertTrue(self.stored_hash().startswith('argon2$'))
+        self.assertIsNotNone(passwords._pool)
+        self.assertTrue(check_password(self.password, passwords.hash_password(self.password)))
+
+    @override_settings(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_TIMEOUT=0.001)
+    def test_pool_timeout_raises_instead_of_waiting(self):
+        started = time.perf_counter()
+        with self.assertRaises(TimeoutError):
+            passwords.verify_password(self.user, self.password)  # a cold pool takes far longer to spawn
+        self.assertLess(time.perf_counter() - started, 1)
+        self.assertTrue(self.stored_hash().startswith('md5$'))
+
+
+class TokenBlacklistTests(StandinTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(email='token@example.com', password='x')
+        self.refresh = RedisRefreshToken.for_user(self.user)
+
+    def redis_down(self):
+        patcher = mock.patch.object(tokenblacklist.get_token_blacklist().redis, 'execute_command',
+                                    side_effect=redis.ConnectionError('redis is down'))
+        self.addCleanup(patcher.stop)
+        patcher.start()
+
+    def test_entries_expire_with_the_token(self):
+        self.assertTrue(self.refresh.blacklist())
+        self.assertFalse(self.refresh.blacklist())  # already blacklisted
+        ttl = get_redis().ttl(tokenblacklist.blacklist_key(self.refresh['jti']))
+        self.assertAlmostEqual(ttl, self.refresh['exp'] - time.time(), delta=2)
+        with self.assertRaisesMessage(TokenError, 'Token is blacklisted'):
+            RedisRefreshToken(str(self.refresh))
+
+    def test_expired_tokens_are_not_stored(self):
+        entries = [('old', time.time() - 1), ('new', time.time() + 60)]
+        self.assertEqual(tokenblacklist.get_token_blacklist().add_many(entries), 1)
+        self.assertEqual(get_redis().exists(tokenblacklist.blacklist_key('old')), 0)
+
+    def test_check_fails_closed_when_redis_is_down(self):
+        token = str(self.refresh)
+        self.redis_down()
+        with self.assertRaisesMessage(TokenError, 'Token blacklist unavailable'):
+            RedisRefreshToken(token)
+        with self.assertRaisesMessage(TokenError, 'Token blacklist unavailable'):
+            self.refresh.blacklist()
+
+    def test_refresh_is_refused_when_redis_is_down(self):
+        self.redis_down()
+        response = self.client.post('/api/users/token/refresh/', {'refresh': str(self.refresh)},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 401, response.content)
+
+
+class InvitationTests(StandinTestCase):
+    def test_message_is_escaped(self):
+        campaign = InvitationCampaign(survey_url='https://example.com/s/1', message='<b>Ward 12</b>\nsurvey')
+        html, text = render_invitation(campaign)
+        self.assertIn('&lt;b&gt;Ward 12&lt;/b&gt;<br>survey', html)
+        self.assertNotIn('<b>', html)
+
+    def test_send_invitations_reports_invalid_rows(self):
+        rows = ('email,name\ncitizen1@example.com,One\nnot-an-email,Two\n\n'
+                'citizen3@example,Three\n citizen4@example.com \n')
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write(rows)
+        self.addCleanup(os.remove, f.name)
+        stderr = StringIO()
+        with mock.patch('apps.accounts.management.commands.send_invitations.dispatch_campaign', return_value={}):
+            call_command('send_invitations', file=f.name, subject='Ward survey', survey_url='https://example.com/s/1',
+                         stdout=StringIO(), stderr=stderr)
+        campaign = InvitationCampaign.objects.get()
+        self.assertEqual(sorted(campaign.recipients.values_list('email', flat=True)),
+                         ['citizen1@example.com', 'citizen4@example.com'])
+        self.assertIn("line 3: skipped, 'not-an-email'", stderr.getvalue())
+        self.assertIn("line 5: skipped, 'citizen3@example'", stderr.getvalue())
+        self.assertNotIn('line 1', stderr.getvalue())
+        self.assertIn('skipped 2 rows', stderr.getvalue())
+
+
+class UserCacheWriteTests(StandinTestCase):
+    """
+    Views that save request.user work on the cached principal, which may lag the row;
+    they must write only the fields they change, and invalidate the cache afterwards.
+    """
+    password = 'Cache-pass-123'
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(email='cached@example.com', password=self.password)
+        usercache.get_cached_user(User, self.user.pk)
+        # another process changes the row; this process still holds the old copy
+        User.objects.filter(pk=self.user.pk).update(bio='Edited elsewhere')
+        self.headers = {'HTTP_AUTHORIZATION': f"Bearer {RedisRefreshToken.for_user(self.user).access_token}"}
+
+    def assert_invalidated(self):
+        key = str(self.user.pk)
+        self.assertIsNone(usercache.local_cache().get(key))
+        self.assertIsNone(cache.get(usercache.cache_key(key)))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.bio, 'Edited elsewhere')
+
+    def put_form(self, path, data):
+        return self.client.put(
+            f'/api/users/{path}', encode_multipart(BOUNDARY, data), content_type=MULTIPART_CONTENT, **self.headers
+        )
+
+    def test_update_password(self):
+        data = {'old_password': self.password, 'new_password': 'Changed-pass-456'}
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.put_form('update-password/', data)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assert_invalidated()
+        self.assertTrue(self.user.check_password('Changed-pass-456'))
+
+    def test_forget_password(self):
+        otp = forgetPasswordOtpSender(self.user.email).generate_otp()
+        data = {'email': self.user.email, 'otp': otp, 'new_password': 'Reset-pass-456'}
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/users/forget-password/', data, content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assert_invalidated()
+        self.assertTrue(self.user.check_password('Reset-pass-456'))
+
+    def test_profile_update(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                '/api/users/profile/update/', {'name': 'A Citizen'}, content_type='application/json', **self.headers
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assert_invalidated()
+        self.assertEqual(self.user.name, 'A Citizen')
+
+    def test_profile_image_upload(self):
+        image = SimpleUploadedFile('me.png', png_bytes(), content_type='image/png')
+        uploader = mock.Mock()
+        uploader.upload.return_value = {'secure_url': 'https://res.cloudinary.com/demo/me.png'}
+        with mock.patch('apps.accounts.serializers._cloudinary_uploader', return_value=uploader), \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.put_form('update-profile/', {'profile_image': image})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assert_invalidated()
+        self.assertEqual(self.user.profile, 'https://res.cloudinary.com/demo/me.png')
+
+
+class LocalCacheTests(TestCase):
+    def test_lru_eviction_and_ttl(self):
+        local = LocalCache(maxsize=2, ttl=30)
+        local.set('a', 1)
+        local.set('b', 2)
+        self.assertEqual(local.get('a'), 1)  # 'b' is now the least recently used
+        local.set('c', 3)
+        self.assertEqual((local.get('a'), local.get('b'), local.get('c')), (1, None, 3))
+        with mock.patch('apps.auth.localcache.time.monotonic', return_value=time.monotonic() + 31):
+            self.assertIsNone(local.get('a'))
+
+    def test_zero_ttl_disables_it(self):
+        local = LocalCache(maxsize=2, ttl=0)
+        local.set('a', 1)
+        self.assertIsNone(local.get('a'))
+
+
+class UsernameAllocatorTests(StandinTestCase):
+    def test_first_registration_gets_the_bare_base(self):
+        user = User.objects.create_user(email='info@example.com', password='x')
+        self.assertEqual(user.username, 'info')
+
+    def test_counter_is_seeded_from_the_highest_taken_suffix(self):
+        User.objects.create(email='a@example.com', username='info')
+        User.objects.create(email='b@example.com', username='info7')
+        User.objects.create(email='c@example.com', username='infodesk')
+        with self.assertNumQueries(4):  # seed lookup + savepoint, insert, release
+            user = User.objects.create_user(email='info@one.example.com', password='x')
+        self.assertEqual(user.username, 'info8')
+        with self.assertNumQueries(3):  # counter only, no lookup
+            user = User.objects.create_user(email='info@two.example.com', password='x')
+        self.assertEqual(user.username, 'info9')
+
+    def test_collision_with_a_picked_username_retries(self):
+        User.objects.create_user(email='info@one.example.com', password='x')
+        User.objects.create(email='picked@example.com', username='info1')
+        user = User.objects.create_user(email='info@two.example.com', password='x')
+        self.assertEqual(user.username, 'info2')
+
+
+class ExistenceIndexTests(StandinTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(email='taken@example.com', password='x')
+        call_command('rebuild_existence_index', stdout=StringIO())
+
+    def test_free_values_skip_the_database(self):
+        with self.assertNumQueries(0):
+            self.assertFalse(existence.email_taken('free@example.com'))
+            self.assertFalse(existence.username_taken('free'))
+
+    def test_taken_values_are_confirmed_by_the_database(self):
+        with self.assertNumQueries(2):
+            self.assertTrue(existence.email_taken('taken@example.com'))
+            self.assertTrue(existence.username_taken(self.user.username))
+
+    def test_new_users_are_indexed_on_save(self):
+        User.objects.create_user(email='later@example.com', password='x')
+        with self.assertNumQueries(1):
+            self.assertTrue(existence.email_taken('later@example.com'))
+
+    def test_false_positive_is_negatively_cached(self):
+        existence.get_existence_index('email').add('ghost@example.com')  # in the filter, not the table
+        with self.assertNumQueries(1):
+            self.assertFalse(existence.email_taken('ghost@example.com'))
+        with self.assertNumQueries(0):
+            self.assertFalse(existence.email_taken('ghost@example.com'))
+            self.assertFalse(existence.email_taken(' Ghost@Example.COM '))
+        User.objects.create_user(email='ghost@example.com', password='x')
+        self.assertTrue(existence.email_taken('ghost@example.com'))
+
+    def test_negative_entry_is_not_written_after_a_concurrent_add(self):
+        index = existence.get_existence_index('email')
+        index.add('racer@example.com')
+        answer, generation = index.might_contain('racer@example.com')
+        self.assertEqual(answer, 1)
+        index.add('someone.else@example.com')  # lands between the query and the write
+        self.assertFalse(index.remember_absent('racer@example.com', generation))
+        self.assertFalse(get_redis().exists(index.negative_key('racer@example.com')))
+
+        answer, generation = index.might_contain('racer@example.com')
+        self.assertTrue(index.remember_absent('racer@example.com', generation))
+
+    def test_commit_clears_a_negative_entry_cached_during_the_insert(self):
+        index = existence.get_existence_index('email')
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user(email='Racer@example.com', password='x')
+            # a check that queried before the insert writes its "not taken" afterwards
+            answer, generation = index.might_contain('racer@example.com')
+            self.assertTrue(index.remember_absent('racer@example.com', generation))
+        self.assertFalse(get_redis().exists(index.negative_key('racer@example.com')))
+        with self.assertNumQueries(1):
+            self.assertTrue(existence.email_taken('racer@example.com'))
+
+    def test_unbuilt_filter_falls_back_to_the_database(self):
+        get_redis().delete(existence.get_existence_index('email').ready_key)
+        with self.assertNumQueries(1):
+            self.assertFalse(existence.email_taken('free@example.com'))
+
+
+class CaseInsensitiveLookupTests(StandinTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(email='Mixed.Case@Example.com', password='Login-pass-123')
+
+    def test_login_ignores_email_case(self):
+        with FakeBrevoServer() as brevo, override_settings(BREVO_API_HOST=brevo.api_host, EMAIL_QUEUE_EAGER=True):
+            response = self.client.post('/api/users/auth/login/', {'email': 'mixed.case@example.com'},
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, 200, response.content)
+            otp = brevo.wait_for_otp('mixed.case@example.com')
+        data = {'email': 'mixed.case@example.com', 'password': 'Login-pass-123', 'otp': otp}
+        with self.assertNumQueries(1):
+            serializer = CustomTokenObtainPairSerializer(data=data)
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+
+    def test_case_variants_are_taken(self):
+        call_command('rebuild_existence_index', stdout=StringIO())
+        self.assertTrue(existence.email_taken('MIXED.CASE@EXAMPLE.COM'))
+        self.assertTrue(existence.username_taken(self.user.username.upper()))
+
+    def test_case_variants_violate_the_unique_indexes(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create(email='mixed.case@example.com')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create(email='other@example.com', username=self.user.username.upper())
+
+    def test_generated_usernames_are_lowercase(self):
+        user = User.objects.create_user(email='Info.Desk@example.com', password='x')
+        self.assertEqual(user.username, 'info.desk')
+        self.assertEqual(User.objects.matching(username='INFO.DESK').get(), user)
+
+
+class RoundTripCounter:
+    """
+    Redis round trips: single commands plus pipeline executes. A script call counts once;
+    the NOSCRIPT miss and SCRIPT LOAD of a cold script cache are not counted.
+    """
+
+    def __init__(self, test):
+        self.commands = []
+        execute_command = redis.Redis.execute_command
+        execute_pipeline = Pipeline.execute
+
+        def command(client, *args, **options):
+            result = execute_command(client, *args, **options)  # a NOSCRIPT miss raises before it is counted
+            if str(args[0]).upper() != 'SCRIPT':
+                self.commands.append(args[0])
+            return result
+
+        def pipeline(pipe, *args, **kwargs):
+            self.commands.append(f"PIPELINE({len(pipe)})")
+            return execute_pipeline(pipe, *args, **kwargs)
+
+        for target, name, side_effect in ((redis.Redis, 'execute_command', command), (Pipeline, 'execute', pipeline)):
+            patcher = mock.patch.object(target, name, autospec=True, side_effect=side_effect)
+            test.addCleanup(patcher.stop)
+            patcher.start()
+
+    @property
+    def count(self):
+        return len(self.commands)
+
+
+def png_bytes():
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.new('RGB', (1, 1)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+GENERATED_QUESTIONS = """[
+    {"type": "multiple-choice", "question": "How often do you use public transport?",
+     "options": ["Daily", "Weekly", "Rarely"], "required": true},
+    {"type": "yes-no", "question": "Is the nearest bus stop within walking distance?", "required": true},
+    {"type": "text", "question": "What would make you use public transport more?", "required": false}
+]"""
+
+
+@override_settings(
+    OTP_RATE_LIMITS={
+        'issue': {'email': (1000, 900), 'ip': (1000, 900)},
+        'verify': {'email': (1000, 900), 'ip': (1000, 900)},
+    },
+    GOOGLE_CLIENT_ID='test-client.apps.googleusercontent.com',
+)
+class EndpointBudgetTests(StandinTestCase):
+    """
+    One test per route in api/urls.py, each with an upper bound on SQL queries, redis
+    round trips and wall time. The bounds are the current counts: a new query (an N+1),
+    an extra redis hop or a slow path fails here, and a bound is only raised on purpose.
+
+    Authenticated requests are measured with the user cache warm (its cold path has its
+    own test). External services are stand-ins: OTP and invitation emails stay on the
+    queue, Google certs come from FakeGoogleCertsServer, cloudinary and Gemini are mocked.
+    """
+    MAX_MS = 250
+    password = 'Budget-pass-123'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.google_key = GoogleKeyFixture()
+        cls.google_certs = FakeGoogleCertsServer(cls.google_key).start()
+        cls.addClassCleanup(cls.google_certs.stop)
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(email='citizen@example.com', password=self.password)
+        self.admin = User.objects.create_user(email='officer@example.com', password=self.password, role='admin')
+        call_command('rebuild_existence_index', stdout=StringIO())
+        for user in (self.user, self.admin):
+            usercache.get_cached_user(User, user.pk)
+        self.warm_scripts()
+
+    def warm_scripts(self):
+        # load every script up front, so no test pays for the first SCRIPT LOAD in its wall time
+        LoginOtpSender('warmup@example.com').check_otp('000000')
+        existence.email_taken('warmup@example.com')
+        existence.get_existence_index('email').add('warmup@example.com')
+        usernames.get_username_allocator().next_suffix('warmup')
+
+    def bearer(self, user):
+        return {'HTTP_AUTHORIZATION': f"Bearer {RedisRefreshToken.for_user(user).access_token}"}
+
+    @contextmanager
+    def budget(self, queries, redis_calls, ms=None):
+        if not hasattr(self, 'round_trips'):
+            self.round_trips = RoundTripCounter(self)
+        counter = self.round_trips
+        counter.commands.clear()
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as captured:
+            yield
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        sql = "\n".join(query['sql'] for query in captured.captured_queries)
+        self.assertLessEqual(len(captured), queries, f"{len(captured)} queries:\n{sql}")
+        self.assertLessEqual(counter.count, redis_calls, f"{counter.count} redis round trips: {counter.commands}")
+        self.assertLess(elapsed_ms, ms or self.MAX_MS)
+
+    def post(self, path, data, user=None):
+        headers = self.bearer(user) if user else {}
+        return self.client.post(f'/api/users/{path}', data, content_type='application/json', **headers)
+
+    def put_form(self, path, data, user):
+        return self.client.put(
+            f'/api/users/{path}', encode_multipart(BOUNDARY, data), content_type=MULTIPART_CONTENT, **self.bearer(user)
+        )
+
+    # -- public routes
+
+    def test_register(self):
+        otp = RegistrationOtpSender('new@example.com').generate_otp()
+        data = {'email': 'new@example.com', 'password': self.password, 'otp': otp}
+        with self.budget(queries=5, redis_calls=7):
+            response = self.post('register/', data)
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def test_login(self):
+        otp = LoginOtpSender(self.user.email).generate_otp()
+        data = {'email': self.user.email, 'password': self.password, 'otp': otp}
+        with self.budget(queries=1, redis_calls=2):
+            response = self.post('login/', data)
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def test_google_login(self):
+        token = self.google_key.id_token(self.user.email, 'test-client.apps.googleusercontent.com')
+        with override_settings(GOOGLE_CERTS_URL=self.google_certs.url):
+            self.post('auth/google/', {'id_token': token})  # first call fetches the certs
+            with self.budget(queries=1, redis_calls=0):
+                response = self.post('auth/google/', {'id_token': token})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(googlecerts.get_google_cert_cache().fetches, 1)
+
+    def test_login_otp(self):
+        with self.budget(queries=1, redis_calls=4):
+            response = self.post('auth/login/', {'email': self.user.email})
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def test_register_otp(self):
+        with self.budget(queries=0, redis_calls=4):
+            response = self.post('auth/register/', {'email': 'new@example.com'})
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def test_forget_password_otp(self):
+        with self.budget(queries=1, redis_calls=4):
+            response = self.post('auth/forget-password/', {'email': self.user.email})
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def test_forget_password(self):
+        otp = forgetPasswordOtpSender(self.user.email).generate_otp()
+        data = {'email': self.user.email, 'otp': otp, 'new_password': 'Reset-pass-456'}
+        with self.budget(queries=3, redis_calls=5):
+            response = self.post('forget-password/', data)
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def test_token_refresh(self):
+        refresh = RedisRefreshToken.for_user(self.user)
+        with self.budget(queries=0, redis_calls=2):
+            response = self.post('token/refresh/', {'refresh': str(refresh)})
+        self.assertEqual(response.status_code, 200, response.content)
+        with self.budget(queries=0, redis_calls=1):
+            response = self.post('token/refresh/', {'refresh': str(refresh)})
+        self.assertEqual(response.status_code, 401, response.content)
+
+    # -- authenticated routes
+
+    def test_check_username(self):
+        with self.budget(queries=0, redis_calls=1):
+            response = self.post('check-username/', {'username': 'free_name'}, user=self.user)
+        self.assertTrue(response.json()['available'])
+        with self.budget(queries=1, redis_calls=1):
+            response = self.post('check-username/', {'username': self.user.username}, user=self.user)
+        self.assertFalse(response.json()['available'])
+
+    def test_update_password_otp(self):
+        with self.budget(queries=1, redis_calls=4):
+            response = self.post('auth/update-password/', {'email': self.user.email}, user=self.user)
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def test_update_password(self):
+        data = {'old_password': self.password, 'new_password': 'Changed-pass-456'}
+        with self.budget(queries=2, redis_calls=2):
+            response = self.put_form('update-password/', data, self.user)
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def test_profile(self):
+        with self.budget(queries=0, redis_calls=0):
+            response = self.client.get('/api/users/profile/', **self.bearer(self.user))
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['email'], self.user.email)
+
+    def test_profile_cold_user_cache(self):
+        usercache.invalidate_user(self.user.pk)
+        usercache.local_cache().clear()
+        with self.budget(queries=1, redis_calls=2):
+            response = self.client.get('/api/users/profile/', **self.bearer(self.user))
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def test_profile_update(self):
+        data = {'bio': 'Ward volunteer', 'name': 'A Citizen', 'github': 'https://github.com/citizen'}
+        with self.budget(queries=1, redis_calls=2):
+            response = self.client.patch(
+                '/api/users/profile/update/', data, content_type='application/json', **self.bearer(self.user)
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.social_links, {'github': 'https://github.com/citizen'})
+
+    def test_profile_image_upload(self):
+        image = SimpleUploadedFile('me.png', png_bytes(), content_type='image/png')
+        uploader = mock.Mock()
+        uploader.upload.return_value = {'secure_url': 'https://res.cloudinary.com/demo/me.png'}
+        with mock.patch('apps.accounts.serializers._cloudinary_uploader', return_value=uploader):
+            with self.budget(queries=1, redis_calls=2):
+                response = self.put_form('update-profile/', {'profile_image': image}, self.user)
+        self.assertEqual(response.status_code, 200, response.content)
+        uploader.upload.assert_called_once()
+
+    def test_chat_feed(self):
+        with FakeChatifyServer() as chatify, override_settings(CHATIFY_FEED_URL=chatify.url):
+            with self.budget(queries=0, redis_calls=0):
+                response = self.post('chat/feed/', {'content': 'Street lights are out on ward 12.'}, user=self.user)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(chatify.requests, 1)
+
+    def test_generate_survey(self):
+        data = {'description': 'Public transport usage in the district', 'question_count': 3}
+        with FakeGeminiServer(reply=GENERATED_QUESTIONS) as gemini, \
+                override_settings(GOOGLE_API_KEY='test-key', GEMINI_API_URL=gemini.url):
+            # cache read, flight lock, cache write, result + release
+            with self.budget(queries=0, redis_calls=4):
+                response = self.post('generate-survey/', data, user=self.user)
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertEqual(len(response.json()['questions']), 3)
+            with self.budget(queries=0, redis_calls=0):
+                response = self.post('generate-survey/', data, user=self.user)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertTrue(response.json()['metadata']['cached'])
+        self.assertEqual(gemini.requests, 1)
+
+    def test_generate_survey_stream(self):
+        data = {'description': 'Public transport usage in the district', 'question_count': 3}
+        with FakeGeminiServer(reply=GENERATED_QUESTIONS) as gemini, \
+                override_settings(GOOGLE_API_KEY='test-key', GEMINI_API_URL=gemini.url):
+            # cache read, cache write; a stream is not coalesced
+            with self.budget(queries=0, redis_calls=2):
+                response = self.post('generate-survey/stream/', data, user=self.user)
+                events = read_events(response.streaming_content)
+            self.assertEqual([event for _, event, _ in events].count('question'), 3)
+            # the cached replay
+            with self.budget(queries=0, redis_calls=0):
+                response = self.post('generate-survey/stream/', data, user=self.user)
+                events = read_events(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([event for _, event, _ in events].count('question'), 3)
+        self.assertTrue(events[-1][2]['metadata']['cached'])
+        self.assertEqual(gemini.requests, 1)
+
+    def test_generate_survey_batch(self):
+        surveys = [{'description': 'Public transport usage in the district', 'question_count': 3, 'survey_type': kind}
+                   for kind in ('general', 'health')]
+        with FakeGeminiServer(reply=GENERATED_QUESTIONS) as gemini, \
+                override_settings(GOOGLE_API_KEY='test-key', GEMINI_API_URL=gemini.url):
+            # per item: cache read, flight lock, cache write, result + release; the wall time
+            # includes starting the batch's event loop thread and its httpx client
+            with self.budget(queries=0, redis_calls=8, ms=500):
+                response = self.post('generate-survey/batch/', {'surveys': surveys}, user=self.user)
+                events = read_events(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(events[-1][1:], ('done', {'status': 'success', 'total': 2, 'succeeded': 2, 'failed': 0}))
+        self.assertEqual(gemini.requests, 2)
+
+    def test_invitations_do_not_query_per_recipient(self):
+        recipients = [{'email': f'citizen{i}@example.com', 'name': f'Citizen {i}'} for i in range(50)]
+        data = {'subject': 'Ward survey', 'survey_url': 'https://example.com/s/1', 'recipients': recipients}
+        with self.budget(queries=6, redis_calls=1):
+            response = self.post('invitations/', data, user=self.admin)
+        self.assertEqual(response.status_code, 202, response.content)
+        self.assertEqual(response.json()['recipients']['pending'], 50)
+
+    def test_invitation_status(self):
+        campaign = InvitationCampaign.objects.create(subject='Ward survey', survey_url='https://example.com/s/1')
+        with self.budget(queries=2, redis_calls=0):
+            response = self.client.get(f'/api/users/invitations/{campaign.pk}/', **self.bearer(self.admin))
+        self.assertEqual(response.status_code, 200, response.content)
+
+
+@override_settings(GOOGLE_API_KEY='test-key')
+class FakeGeminiTestCase(StandinTestCase):
+    """
+    Points GEMINI_API_URL at a FakeGeminiServer(**gemini_server) and logs a user in
+    (self.headers) for the generate-survey endpoints.
+    """
+    gemini_server = {}
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(email='admin@example.com', password='x')
+        self.headers = {'HTTP_AUTHORIZATION': f"Bearer {RedisRefreshToken.for_user(self.user).access_token}"}
+        self.gemini = FakeGeminiServer(**self.gemini_server).start()
+        self.addCleanup(self.gemini.stop)
+        settings_override = override_settings(GEMINI_API_URL=self.gemini.url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class GenerationCacheTests(FakeGeminiTestCase):
+    survey = {'description': 'Public transport usage in the district', 'question_count': 3}
+
+    def generate(self, **data):
+        response = self.client.post('/api/users/generate-survey/', {**self.survey, **data},
+                                    content_type='application/json', **self.headers)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_resubmitting_a_survey_is_served_from_the_cache(self):
+        first = self.generate()
+        second = self.generate(description='  public TRANSPORT usage\nin the district ')
+        self.assertFalse(first['metadata']['cached'])
+        self.assertTrue(second['metadata']['cached'])
+        self.assertEqual(second['questions'], first['questions'])
+        self.assertEqual(self.gemini.requests, 1)
+
+    def test_redis_tier_serves_other_processes(self):
+        self.generate()
+        surveycache.get_generation_cache().local.clear()
+        self.assertTrue(self.generate()['metadata']['cached'])
+        self.assertEqual(self.gemini.requests, 1)
+
+    def test_count_and_type_are_part_of_the_key(self):
+        self.generate()
+        self.generate(question_count=4)
+        self.generate(survey_type='health')
+        self.assertEqual(self.gemini.requests, 3)
+
+    def test_refresh_replaces_the_cached_questions(self):
+        self.generate()
+        self.gemini.reply = GENERATED_QUESTIONS
+        refreshed = self.generate(refresh_cache=True)
+        self.assertFalse(refreshed['metadata']['cached'])
+        self.assertEqual(self.generate()['questions'], refreshed['questions'])
+        self.assertEqual(self.gemini.requests, 2)
+
+    def test_bypass_neither_reads_nor_writes(self):
+        self.generate()
+        self.gemini.reply = GENERATED_QUESTIONS
+        bypassed = self.generate(bypass_cache=True)
+        self.assertFalse(bypassed['metadata']['cached'])
+        self.assertNotEqual(self.generate()['questions'], bypassed['questions'])
+        self.assertEqual(self.gemini.requests, 2)
+
+    def test_fallback_questions_are_not_cached(self):
+        self.gemini.fail_rate = 1.0
+        self.assertEqual(self.generate()['questions'], fallback_questions(3))
+        self.gemini.fail_rate = 0.0
+        self.assertFalse(self.generate()['metadata']['cached'])
+        self.assertEqual(self.gemini.requests, 2)
+
+    @override_settings(SURVEY_CACHE_TTL=0)
+    def test_ttl_zero_turns_the_cache_off(self):
+        self.generate()
+        self.assertFalse(self.generate()['metadata']['cached'])
+        self.assertEqual(self.gemini.requests, 2)
+
+
+class GeminiClientTests(FakeGeminiTestCase):
+    gemini_server = {'reply': GENERATED_QUESTIONS}
+
+    def test_calls_reuse_one_connection(self):
+        client = gemini.get_gemini_client()
+        for _ in range(10):
+            self.assertEqual(client.generate('Generate questions'), GENERATED_QUESTIONS)
+        self.assertIs(gemini.get_gemini_client(), client)
+        stats = client.stats()
+        self.assertEqual(stats['connections'], 1)
+        self.assertEqual((stats['sent'], stats['errors']), (10, 0))
+
+    def test_threads_share_the_pool(self):
+        client = gemini.GeminiClient(pool_size=4)
+        self.gemini.latency_ms = 50
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            replies = list(executor.map(lambda _: client.generate('Generate questions'), range(20)))
+        self.assertEqual(set(replies), {GENERATED_QUESTIONS})
+        self.assertLessEqual(client.connections(), 4)
+
+    def test_read_timeout(self):
+        client = gemini.GeminiClient(timeout=(1, 0.1))
+        self.gemini.latency_ms = 500
+        started = time.perf_counter()
+        with self.assertRaises(gemini.GeminiError):
+            client.generate('Generate questions')
+        self.assertLess(time.perf_counter() - started, 0.4)
+        self.assertEqual(client.stats()['errors'], 1)
+
+    def test_failures_are_counted(self):
+        client = gemini.GeminiClient()
+        self.gemini.fail_rate = 1.0
+        with self.assertRaises(gemini.GeminiError):
+            client.generate('Generate questions')
+        self.assertEqual((client.stats()['sent'], client.stats()['errors']), (0, 1))
+
+    async def test_async_calls_are_counted(self):
+        client = gemini.GeminiClient()
+        self.assertEqual(await client.agenerate('Generate questions'), GENERATED_QUESTIONS)
+        await close_async_client()
+        self.assertEqual(client.stats()['sent'], 1)
+
+
+class SingleflightTests(StandinTestCase):
+    def setUp(self):
+        super().setUp()
+        self.flight = Singleflight('flight', lock_ttl=5, wait_timeout=5, poll_interval=0.01)
+        self.calls = 0
+
+    def slow(self, value, seconds=0.3):
+        def fn():
+            self.calls += 1
+            time.sleep(seconds)
+            return value
+        return fn
+
+    def test_concurrent_callers_share_one_call(self):
+        barrier = threading.Barrier(8)
+
+        def call(_):
+            barrier.wait()
+            return self.flight.do('survey', self.slow({'questions': [1, 2, 3]}))
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(call, range(8)))
+        self.assertEqual(results, [{'questions': [1, 2, 3]}] * 8)
+        self.assertEqual(self.calls, 1)
+        self.assertFalse(get_redis().exists('flight:survey'))
+
+    def test_a_later_flight_runs_again(self):
+        self.assertEqual(self.flight.do('survey', lambda: 1), 1)
+        self.assertEqual(self.flight.do('survey', lambda: 2), 2)
+
+    def test_followers_give_up_after_the_wait_timeout(self):
+        get_redis().set('flight:survey', 'stuck-leader', px=5000)
+        flight = Singleflight('flight', lock_ttl=5, wait_timeout=0.2)
+        started = time.perf_counter()
+        self.assertEqual(flight.do('survey', lambda: 'alone'), 'alone')
+        self.assertLess(time.perf_counter() - started, 1)
+
+    def test_a_failed_leader_releases_its_followers(self):
+        def failing():
+            time.sleep(0.2)
+            raise RuntimeError('upstream exploded')
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            leader = executor.submit(self.flight.do, 'survey', failing)
+            time.sleep(0.05)
+            started = time.perf_counter()
+            self.assertEqual(self.flight.do('survey', lambda: 'alone'), 'alone')
+            self.assertLess(time.perf_counter() - started, 1)
+            with self.assertRaises(RuntimeError):
+                leader.result()
+
+    async def test_async_callers_share_one_call(self):
+        async def fn():
+            self.calls += 1
+            await asyncio.sleep(0.3)
+            return [1, 2, 3]
+
+        results = await asyncio.gather(*(self.flight.ado('survey', fn) for _ in range(10)))
+        self.assertEqual(results, [[1, 2, 3]] * 10)
+        self.assertEqual(self.calls, 1)
+
+
+class CoalescedGenerationTests(FakeGeminiTestCase):
+    gemini_server = {'latency_ms': 300}
+
+    def generate_concurrently(self, count, **flags):
+        barrier = threading.Barrier(count)
+
+        def call(_):
+            barrier.wait()
+            return surveygen.generate_questions('Public transport usage in the district', 5, 'general', **flags)
+
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            return list(executor.map(call, range(count)))
+
+    def test_identical_generations_make_one_gemini_call(self):
+        results = self.generate_concurrently(6)
+        self.assertEqual(self.gemini.requests, 1)
+        self.assertEqual(len({json.dumps(questions) for questions, _ in results}), 1)
+
+    def test_bypass_is_not_coalesced(self):
+        self.generate_concurrently(3, bypass_cache=True)
+        self.assertEqual(self.gemini.requests, 3)
+
+
+def read_events(chunks):
+    """
+    (seconds since the first read, event, data) for each server-sent event.
+    """
+    started = time.perf_counter()
+    events = []
+    for chunk in chunks:
+        for block in chunk.decode().strip().split('\n\n'):
+            fields = dict(line.split(': ', 1) for line in block.splitlines())
+            events.append((time.perf_counter() - started, fields['event'], json.loads(fields['data'])))
+    return events
+
+
+class QuestionStreamParserTests(TestCase):
+    def test_objects_come_out_as_soon_as_they_close(self):
+        reply = '```json\n[{"question": "Is [this] {tricky} \\"enough\\"?", "options": ["a", "b"]},\n {"question": "Next?"}]\n```'
+        parser = QuestionStreamParser()
+        seen = []
+        for position, char in enumerate(reply):
+            for obj in parser.feed(char):
+                seen.append((position, obj))
+        self.assertEqual([obj for _, obj in seen], json.loads(reply[8:-4]))
+        self.assertEqual(reply[seen[0][0]], '}')
+        self.assertTrue(parser.finished)
+
+    def test_nothing_after_the_array(self):
+        parser = QuestionStreamParser()
+        self.assertEqual(parser.feed('[{"a": 1}] [{"b": 2}]'), [{'a': 1}])
+
+
+class SurveyStreamTests(FakeGeminiTestCase):
+    survey = {'description': 'Public transport usage in the district', 'question_count': 5}
+    gemini_server = {'chunk_size': 40, 'chunk_delay_ms': 60}
+
+    def stream(self, **data):
+        response = self.client.post('/api/users/generate-survey/stream/', {**self.survey, **data},
+                                    content_type='application/json', **self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return read_events(response.streaming_content)
+
+    def test_first_question_arrives_long_before_the_reply_ends(self):
+        events = self.stream()
+        questions = [data for _, event, data in events if event == 'question']
+        self.assertEqual(len(questions), 5)
+        first_at, done_at = events[0][0], events[-1][0]
+        self.assertEqual(events[-1][1], 'done')
+        self.assertLess(first_at, 0.5)
+        self.assertGreater(done_at, 0.6)  # ~15 chunks, 60 ms apart
+        self.assertLess(first_at, done_at / 3)
+
+    def test_done_carries_the_generate_survey_body(self):
+        events = self.stream()
+        questions = [data for _, event, data in events if event == 'question']
+        done = events[-1][2]
+        self.assertEqual(done['status'], 'success')
+        self.assertEqual(done['questions'], questions)
+        self.assertEqual(done['metadata']['question_count'], 5)
+        self.assertEqual([q['id'] for q in questions], ['1', '2', '3', '4', '5'])
+
+    def test_a_repeated_survey_is_replayed_from_the_cache(self):
+        first = self.stream()
+        second = self.stream()
+        self.assertTrue(second[-1][2]['metadata']['cached'])
+        self.assertEqual(second[-1][2]['questions'], first[-1][2]['questions'])
+        self.assertEqual(self.gemini.requests, 1)
+        self.assertEqual(self.stream(question_count=3)[-1][2]['questions'], first[-1][2]['questions'][:3])
+
+    def test_broken_stream_keeps_what_was_sent(self):
+        self.gemini.cut_after = 8
+        events = self.stream()
+        done = events[-1][2]
+        self.assertEqual(events[-1][1], 'done')
+        self.assertTrue(0 < len(done['questions']) < 5)
+        self.assertFalse(self.stream()[-1][2]['metadata']['cached'])
+
+    def test_failure_before_any_question_falls_back(self):
+        self.gemini.fail_rate = 1.0
+        events = self.stream()
+        self.assertEqual([data for _, event, data in events if event == 'question'], fallback_questions(5))
+
+    def test_stream_stops_reading_once_it_has_enough(self):
+        self.gemini.reply = survey_questions_json(15)
+        events = self.stream(question_count=3)
+        self.assertEqual(len(events[-1][2]['questions']), 3)
+        self.assertLess(events[-1][0], 1)  # the 15 question reply takes ~3 s to stream
+        self.assertEqual(gemini.get_gemini_client().stats()['errors'], 0)
+
+
+@override_settings(SURVEY_BATCH_CONCURRENCY=3)
+class SurveyBatchTests(FakeGeminiTestCase):
+    types = ['general', 'health', 'education', 'infrastructure', 'employment', 'environment']
+    gemini_server = {'latency_ms': 300}
+
+    def specs(self, *types):
+        return [{'description': 'New district survey: services, needs and priorities', 'survey_type': survey_type,
+                 'question_count': 3} for survey_type in types]
+
+    def batch(self, surveys):
+        response = self.client.post('/api/users/generate-survey/batch/', {'surveys': surveys},
+                                    content_type='application/json', **self.headers)
+        self.assertEqual(response.status_code, 200, getattr(response, 'content', b''))
+        return read_events(response.streaming_content)
+
+    def test_fans_out_with_bounded_concurrency(self):
+        started = time.perf_counter()
+        events = self.batch(self.specs(*self.types))
+        elapsed = time.perf_counter() - started
+        results = [data for _, event, data in events if event == 'result']
+        self.assertEqual(sorted(result['index'] for result in results), list(range(6)))
+        self.assertEqual({result['status'] for result in results}, {'success'})
+        self.assertEqual(events[-1][2], {'status': 'success', 'total': 6, 'succeeded': 6, 'failed': 0})
+        self.assertGreater(elapsed, 0.55)  # two waves of three
+        self.assertLess(elapsed, 1.5)  # not six calls one after another
+        self.assertLess(events[0][0], events[-1][0] - 0.2)  # the first wave is sent before the second is done
+
+    def test_items_fail_on_their_own(self):
+        surveys = self.specs('health', 'education') + [{'description': 'too short'}, {'survey_type': 'unknown'}]
+        events = self.batch(surveys)
+        results = {data['index']: data for _, event, data in events if event == 'result'}
+        self.assertEqual([results[i]['status'] for i in range(4)], ['success', 'success', 'error', 'error'])
+        self.assertIn('description', results[2]['errors'])
+        self.assertEqual(events[-1][2], {'status': 'partial', 'total': 4, 'succeeded': 2, 'failed': 2})
+
+    @override_settings(SURVEY_BATCH_ITEM_TIMEOUT=0.1)
+    def test_slow_items_time_out(self):
+        started = time.perf_counter()
+        events = self.batch(self.specs('health', 'education'))
+        self.assertLess(time.perf_counter() - started, 0.3)
+        self.assertEqual({data['message'] for _, event, data in events if event == 'result'}, {'Timed out after 0.1 s'})
+        self.assertEqual(events[-1][2]['status'], 'error')
+
+    @override_settings(SURVEY_BATCH_MAX_ITEMS=3)
+    def test_batch_size_is_limited(self):
+        response = self.client.post('/api/users/generate-survey/batch/', {'surveys': self.specs(*self.types)},
+                                    content_type='application/json', **self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('surveys', response.json()['errors'])
+
+
+async_urls = types.ModuleType('async_urls')
+async_urls.urlpatterns = [path('api/users/', include(with_async_views(api_urls.urlpatterns)))]
+
+
+@override_settings(
+    ROOT_URLCONF=async_urls,
+    GOOGLE_API_KEY='test-key',
+    OTP_RATE_LIMITS={'issue': {'email': (1000, 900), 'ip': (1000, 900)}, 'verify': {}},
+)
+class AsyncViewTests(StandinTestCase):
+    """
+    The async views, routed as with API_ASYNC_VIEWS, against fake Gemini / Chatify servers.
+    """
+    survey = {'description': 'Public transport usage in the district', 'question_count': 3}
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(email='citizen@example.com', password='x')
+        self.headers = {'Authorization': f"Bearer {RedisRefreshToken.for_user(self.user).access_token}"}
+        self.gemini = FakeGeminiServer(latency_ms=200).start()
+        self.addCleanup(self.gemini.stop)
+        self.chatify = FakeChatifyServer().start()
+        self.addCleanup(self.chatify.stop)
+
+    def post(self, path, data, **kwargs):
+        return self.async_client.post(f'/api/users/{path}', data, content_type='application/json', **kwargs)
+
+    async def test_generate_survey(self):
+        with override_settings(GEMINI_API_URL=self.gemini.url):
+            response = await self.post('generate-survey/', self.survey, headers=self.headers)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['metadata']['question_count'], 3)
+        self.assertEqual(response.json()['metadata']['generated_by'], self.user.email)
+
+    async def test_generate_survey_stream(self):
+        with override_settings(GEMINI_API_URL=self.gemini.url):
+            response = await self.post('generate-survey/stream/', self.survey, headers=self.headers)
+            chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(response.status_code, 200)
+        events = read_events(chunks)
+        self.assertEqual([event for _, event, _ in events], ['question'] * 3 + ['done'])
+        self.assertEqual(events[-1][2]['metadata']['generated_by'], self.user.email)
+
+    async def test_generate_survey_batch(self):
+        surveys = [{**self.survey, 'survey_type': survey_type} for survey_type in ('health', 'education', 'social')]
+        with override_settings(GEMINI_API_URL=self.gemini.url):
+            started = time.perf_counter()
+            response = await self.post('generate-survey/batch/', {'surveys': surveys}, headers=self.headers)
+            chunks = [chunk async for chunk in response.streaming_content]
+        self.assertLess(time.perf_counter() - started, 0.5)  # 3 x 200 ms at once
+        events = read_events(chunks)
+        self.assertEqual([event for _, event, _ in events], ['result'] * 3 + ['done'])
+        self.assertEqual(events[-1][2]['succeeded'], 3)
+
+    async def test_upstream_calls_overlap(self):
+        with override_settings(GEMINI_API_URL=self.gemini.url):
+            started = time.perf_counter()
+            responses = await asyncio.gather(
+                *(self.post('generate-survey/', self.survey, headers=self.headers) for _ in range(20))
+            )
+            elapsed = time.perf_counter() - started
+        self.assertEqual({response.status_code for response in responses}, {200})
+        self.assertLess(elapsed, 2)  # 20 x 200 ms one after another would be 4 s
+
+    async def test_upstream_failure_falls_back(self):
+        self.gemini.fail_rate = 1.0
+        with override_settings(GEMINI_API_URL=self.gemini.url):
+            response = await self.post('generate-survey/', self.survey, headers=self.headers)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['questions'], fallback_questions(3))
+
+    async def test_chat_feed(self):
+        with override_settings(CHATIFY_FEED_URL=self.chatify.url):
+            response = await self.post('chat/feed/', {'content': 'Street lights are out.'}, headers=self.headers)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['data']['email'], self.user.email)
+
+    async def test_requires_authentication(self):
+        response = await self.post('generate-survey/', self.survey)
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('Bearer', response['WWW-Authenticate'])
+
+    async def test_login_otp(self):
+        response = await self.post('auth/login/', {'email': self.user.email})
+        self.assertEqual(response.status_code, 200, response.content)
+        response = await self.post('auth/login/', {'email': 'nobody@example.com'})
+        self.assertEqual(response.status_code, 400)
+
+    async def test_profile_image_upload(self):
+        image = SimpleUploadedFile('me.png', png_bytes(), content_type='image/png')
+        upload = mock.AsyncMock(return_value={'secure_url': 'https://res.cloudinary.com/demo/me.png'})
+        with mock.patch('apps.accounts.api.asyncviews.upload_to_cloudinary', upload):
+            response = await self.async_client.put(
+                '/api/users/update-profile/', encode_multipart(BOUNDARY, {'profile_image': image}),
+                content_type=MULTIPART_CONTENT, headers=self.headers,
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        upload.assert_awaited_once()
+        await self.user.arefresh_from_db()
+        self.assertEqual(self.user.profile, 'https://res.cloudinary.com/demo/me.png')
 
-# Create your tests here.
@@ -0,0 +1,39 @@
+from rest_framework.throttling import BaseThrottle
+
+from ..auth.ratelimit import SlidingWindowLimiter
+
+
+class OtpRateThrottle(BaseThrottle):
+    """
+    Redis sliding-window throttle keyed on the request email and client ip.
+    Add to a view with `throttle_classes = [OtpIssueThrottle]` (or OtpVerifyThrottle).
+    """
+    scope = None
+
+    def allow_request(self, request, view):
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        if not isinstance(email, str):
+            email = None
+        if email is None and request.user and request.user.is_authenticated:
+            email = request.user.email
+
+        result = SlidingWindowLimiter(self.scope).safe_hit(email=email, ip=self.get_ident(request))
+        self.retry_after = result.retry_after
+        return result.allowed
+
+    def wait(self):
+        return self.retry_after
+
+
+class OtpIssueThrottle(OtpRateThrottle):
+    """
+    Endpoints that generate and email an OTP.
+    """
+    scope = 'issue'
+
+
+class OtpVerifyThrottle(OtpRateThrottle):
+    """
+    Endpoints that check an OTP; also enforces the failed-attempt lockout.
+    """
+    scope = 'verify'
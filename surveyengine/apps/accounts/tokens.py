@@ -0,0 +1,44 @@
+from django.utils.translation import gettext_lazy as _
+from redis.exceptions import RedisError
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import BlacklistMixin, RefreshToken, Token
+
+from apps.auth.tokenblacklist import get_token_blacklist
+
+
+class RedisRefreshToken(RefreshToken):
+    """
+    RefreshToken backed by the redis blacklist (apps/auth/tokenblacklist.py): no
+    OutstandingToken row per login or rotation, no BlacklistedToken lookup per refresh.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        # skip BlacklistMixin.for_user, which inserts an OutstandingToken row
+        return super(BlacklistMixin, cls).for_user(user)
+
+    def verify(self, *args, **kwargs):
+        self.check_blacklist()
+        Token.verify(self, *args, **kwargs)
+
+    def check_blacklist(self):
+        try:
+            blacklisted = get_token_blacklist().contains(self.payload[api_settings.JTI_CLAIM])
+        except RedisError:
+            # fail closed: a revoked token must not be usable while redis is away
+            raise TokenError(_("Token blacklist unavailable"))
+        if blacklisted:
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        """
+        True if this call blacklisted the token, False if it already was.
+        """
+        try:
+            return get_token_blacklist().add(self.payload[api_settings.JTI_CLAIM], self.payload["exp"])
+        except RedisError:
+            raise TokenError(_("Token blacklist unavailable"))
+
+    def outstand(self):
+        return None
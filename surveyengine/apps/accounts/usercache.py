@@ -0,0 +1,95 @@
+"""
+Two-tier cache of the authenticated user, so a JWT request does not need a query.
+
+    process memory (USER_CACHE_LOCAL_TTL, LRU)  ->  redis (USER_CACHE_TTL)  ->  database
+
+The cached record holds every concrete field except the password hash. Principals are
+real User instances built with from_db() and the password left deferred, so
+check_password() / set_password() still work: reading the hash loads it on demand.
+
+Any save or delete of a User invalidates both tiers (signals connected in apps.py).
+Other processes may keep serving their local copy for up to USER_CACHE_LOCAL_TTL.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from ..auth.localcache import CACHE_ERRORS, LocalCache
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(user_id):
+    return f"user:{user_id}"
+
+
+_local = None
+
+
+def local_cache():
+    global _local
+    if _local is None:
+        _local = LocalCache(settings.USER_CACHE_LOCAL_MAXSIZE, settings.USER_CACHE_LOCAL_TTL)
+    return _local
+
+
+def _cached_fields(model):
+    return [field for field in model._meta.concrete_fields if field.attname != "password"]
+
+
+def to_record(user):
+    return {field.attname: getattr(user, field.attname) for field in _cached_fields(type(user))}
+
+
+def from_record(model, record):
+    """
+    Rebuilds a saved instance without a query; missing fields (the password) stay deferred.
+    """
+    names = [field.attname for field in _cached_fields(model) if field.attname in record]
+    return model.from_db("default", names, [record[name] for name in names])
+
+
+def get_cached_user(model, user_id):
+    """
+    The user with this primary key, or None if it does not exist.
+    """
+    key = str(user_id)
+    record = local_cache().get(key)
+    if record is None:
+        try:
+            record = cache.get(cache_key(key))
+        except CACHE_ERRORS as e:
+            logger.warning("user cache unavailable, reading from the database: %s", e)
+            record = None
+        if record is None:
+            user = model.objects.filter(pk=user_id).defer("password").first()
+            if user is None:
+                return None
+            record = to_record(user)
+            try:
+                cache.set(cache_key(key), record, settings.USER_CACHE_TTL)
+            except CACHE_ERRORS as e:
+                logger.warning("could not cache user %s: %s", key, e)
+        local_cache().set(key, record)
+    return from_record(model, record)
+
+
+def invalidate_user(user_id):
+    key = str(user_id)
+    local_cache().discard(key)
+    try:
+        cache.delete(cache_key(key))
+    except CACHE_ERRORS as e:
+        logger.warning("could not invalidate cached user %s: %s", key, e)
+
+
+def invalidate_on_change(sender, instance, **kwargs):
+    """
+    post_save / post_delete receiver. Runs after commit, otherwise a concurrent request
+    could cache the old row again between the invalidation and the commit.
+    """
+    if instance.pk is not None:
+        user_id = instance.pk
+        transaction.on_commit(lambda: invalidate_user(user_id))
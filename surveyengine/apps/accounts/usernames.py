@@ -0,0 +1,100 @@
+"""
+Unique usernames for registrations without one: <base>, <base>1, <base>2, ...
+
+The next suffix for a base comes from an atomic redis counter (INCR), so concurrent
+registrations with the same base get distinct names without touching the database.
+A missing counter is seeded with the highest suffix already taken, found with one
+prefix query on the lower(username) index; SET NX makes concurrent seeders agree.
+Bases are lowercase, as usernames are unique case-insensitively.
+
+    KEY: username:seq:<base>    VALUE: last suffix handed out (0 = the bare base)
+    TTL: USERNAME_COUNTER_TTL, reseeded from the database after that
+"""
+import logging
+import re
+
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from ..auth.RedisUtils.maincache import get_redis
+
+logger = logging.getLogger(__name__)
+
+BASE_MAX_LENGTH = 14  # username is 20 chars, leaves room for a 6 digit suffix
+
+# increments an existing counter, returns nil when it has to be seeded first
+NEXT_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return nil
+end
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return redis.call('INCR', KEYS[1])
+"""
+
+SEED_SCRIPT = """
+redis.call('SET', KEYS[1], ARGV[2], 'NX')
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return redis.call('INCR', KEYS[1])
+"""
+
+
+def username_base(email):
+    base = re.sub(r'[^a-z0-9_.]', '', email.split('@')[0].lower()) or 'user'
+    return base[:BASE_MAX_LENGTH]
+
+
+def with_suffix(base, suffix):
+    return base if suffix == 0 else f"{base}{suffix}"
+
+
+def suffixed_usernames(base):
+    """
+    Usernames of the form <base><digits>, any case. The LIKE prefix uses the index.
+    """
+    from .models import User
+
+    return User.objects.filter(
+        username__lower__startswith=base, username__lower__regex=rf'^{re.escape(base)}[0-9]*$'
+    ).values_list('username', flat=True)
+
+
+def highest_taken_suffix(base):
+    """
+    -1 if no username of the form <base><digits> exists. One indexed prefix query.
+    """
+    return max((int(name[len(base):] or 0) for name in suffixed_usernames(base)), default=-1)
+
+
+class UsernameAllocator:
+    def __init__(self, redis=None):
+        self.redis = redis or get_redis()
+        self._next = self.redis.register_script(NEXT_SCRIPT)
+        self._seed = self.redis.register_script(SEED_SCRIPT)
+
+    @staticmethod
+    def key(base):
+        return f"username:seq:{base}"
+
+    def next_suffix(self, base):
+        ttl = settings.USERNAME_COUNTER_TTL
+        suffix = self._next(keys=[self.key(base)], args=[ttl])
+        if suffix is None:
+            suffix = self._seed(keys=[self.key(base)], args=[ttl, highest_taken_suffix(base)])
+        return int(suffix)
+
+    def allocate(self, base):
+        try:
+            return with_suffix(base, self.next_suffix(base))
+        except RedisError as e:
+            logger.warning("username counter unavailable, allocating from the database: %s", e)
+            return with_suffix(base, highest_taken_suffix(base) + 1)
+
+
+_allocator = None
+
+
+def get_username_allocator():
+    global _allocator
+    if _allocator is None:
+        _allocator = UsernameAllocator()
+    return _allocator
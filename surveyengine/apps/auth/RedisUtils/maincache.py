@@ -1,4 +1,13 @@
 # // setup of redis 
 from django.conf import settings
 from django.core.cache import caches
+from django_redis import get_redis_connection
 
+
+def get_redis(alias="default"):
+    """
+    Raw redis-py client sharing the connection pool of the django cache.
+    Use it for commands the cache API does not expose (lists, zsets, scripts).
+    Keys written through it are NOT prefixed/pickled like cache.set() values.
+    """
+    return get_redis_connection(alias)
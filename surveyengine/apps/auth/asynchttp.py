@@ -0,0 +1,49 @@
+"""
+Shared httpx.AsyncClient for the async views' upstream calls (Gemini, Chatify, Cloudinary).
+
+An AsyncClient belongs to the event loop it was first used on, so there is one per
+loop: under uvicorn that is one per worker process, holding up to
+ASYNC_HTTP_MAX_CONNECTIONS requests in flight over keep-alive connections, where a
+sync worker holds exactly one. (Async views served by WSGI get a throwaway loop per
+request and with it a throwaway client; set API_ASYNC_VIEWS only for ASGI deployments.)
+
+httpx is imported with the first client, so sync-only workers never load it.
+"""
+import asyncio
+import weakref
+
+from django.conf import settings
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def build_async_client():
+    import httpx
+
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.ASYNC_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.ASYNC_HTTP_MAX_KEEPALIVE,
+        ),
+        timeout=httpx.Timeout(settings.ASYNC_HTTP_TIMEOUT, connect=settings.ASYNC_HTTP_CONNECT_TIMEOUT),
+    )
+
+
+def get_async_client():
+    """
+    The client for the running event loop; call from async code only.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = _clients[loop] = build_async_client()
+    return client
+
+
+async def close_async_client():
+    """
+    Closes the running loop's client, e.g. at the end of a benchmark or test.
+    """
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
@@ -1,18 +1,16 @@
-import random
-import sib_api_v3_sdk
-from sib_api_v3_sdk.rest import ApiException
 from django.conf import settings
-from django.core.cache import cache  
+from .otpstore import get_otp_store
+from .emailqueue import enqueue_otp_email
+from .emailproviders import OutboundEmail, get_email_dispatcher
+from .otptemplates import get_otp_template
 
 
-# KEY: otp:register:kishan@gmail.com
-# VALUE: 841392
+# All active OTPs of a user live in one hash (see otpstore.py):
+# KEY: otp:kishan@gmail.com
+# FIELDS: register -> hmac digest, register:t -> issued at, register:n -> failed attempts
 # TTL: 300 seconds
 
 
-
-
-
 class BaseOtpEmailSender:
     def __init__(self, email, purpose):
         """
@@ -20,59 +18,93 @@ class BaseOtpEmailSender:
         """
         self.email = email
         self.purpose = purpose
-        self.key = f"otp:{purpose}:{email}"
-        self.api_client = self._setup_brevo_client()
-        self.api_instance = sib_api_v3_sdk.TransactionalEmailsApi(self.api_client)
-
-    def _setup_brevo_client(self):
-        configuration = sib_api_v3_sdk.Configuration()
-        configuration.api_key['api-key'] = settings.BREVO_API_KEY_EMAIL
-        return sib_api_v3_sdk.ApiClient(configuration)
+        self.store = get_otp_store()
 
     def generate_otp(self):
         """
-        Generates and stores a 6-digit OTP in Redis with 5-minute TTL.
+        Generates a 6-digit OTP and stores its HMAC digest in Redis with 5-minute TTL.
         """
-        otp = str(random.randint(100000, 999999))
-        cache.set(self.key, otp, timeout=300)  # 🧠5 min TTL
+        return self.store.issue(self.email, self.purpose)
 
-        print("the otp genrated is ",cache.get(self.key)) 
-        print('se',self.key) # Debugging line to check OTP storage
-        return otp
+    def verify_and_consume(self, input_otp, consume=True):
+        """
+        Atomically compares and (optionally) deletes the OTP with a single Lua call,
+        so the same code can never be accepted twice.
+        Returns (ok, failed_attempts).
+        """
+        return self.store.verify(self.email, self.purpose, input_otp, consume=consume)
 
     def validate_otp(self, input_otp):
         """
         Validates and clears OTP if matched.
         """
-        stored_otp = cache.get(self.key)
-        if stored_otp == input_otp:
-            cache.delete(self.key)
-            return True
-        return False
+        ok, _ = self.verify_and_consume(input_otp)
+        return ok
+
+    def check_otp(self, input_otp):
+        """
+        Validates without clearing (failures are still counted).
+        """
+        ok, _ = self.verify_and_consume(input_otp, consume=False)
+        return ok
 
     def invalidate_otp(self):
         """
         Manually clears OTP (e.g., after multiple failures).
         """
-        cache.delete(self.key)
+        self.store.invalidate(self.email, self.purpose)
+
+    subject = None
+
+    def render(self, otp):
+        """
+        Returns (subject, text_content, html_content) from the precompiled template of this purpose.
+        """
+        text_content, html_content = get_otp_template(self.purpose).render(otp)
+        return self.subject, text_content, html_content
+
+    def send(self):
+        """
+        Stores a new OTP and queues the email, the request thread does not wait for Brevo.
+        """
+        otp = self.generate_otp()
+        enqueue_otp_email(self.purpose, self.email, otp)
+        return otp
+
+    def deliver(self, otp):
+        """
+        Builds and sends the email synchronously (called by the email worker).
+        With a Brevo template id configured for this purpose only the OTP goes over the wire
+        to Brevo; the rendered content is still attached for providers without templates.
+        """
+        subject, text_content, html_content = self.render(otp)
+        template_id = settings.BREVO_OTP_TEMPLATE_IDS.get(self.purpose)
+        if template_id:
+            self.send_template_email(template_id, {"otp": otp}, subject, text_content, html_content)
+            return
+        self.send_email(subject, text_content, html_content=html_content)
 
     def send_email(self, subject, text_content, html_content=None):
         """
-        Sends the email using Brevo (SMTP).
+        Sends through the fastest healthy provider (Brevo, SMTP, see emailproviders.py).
         """
-        send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
-            sender={"name": "Government Of India ", "email": settings.FORWARDING_EMAIL},
-            to=[{"email": self.email}],
+        get_email_dispatcher().send(OutboundEmail(
+            to_email=self.email,
             subject=subject,
             text_content=text_content,
-            html_content=html_content
-        )
+            html_content=html_content,
+        ))
 
-        try:
-            self.api_instance.send_transac_email(send_smtp_email)
-        except ApiException as e:
-            print(f"[Brevo] Failed to send email: {e}")
-            raise e
-
-
-print(cache.keys('*'))
\ No newline at end of file
+    def send_template_email(self, template_id, params, subject=None, text_content=None, html_content=None):
+        """
+        Sends using a template stored in Brevo, only `params` are transmitted.
+        Providers without hosted templates fall back to the rendered content, if given.
+        """
+        get_email_dispatcher().send(OutboundEmail(
+            to_email=self.email,
+            subject=subject,
+            text_content=text_content,
+            html_content=html_content,
+            template_id=template_id,
+            params=params,
+        ))
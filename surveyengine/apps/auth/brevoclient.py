@@ -0,0 +1,136 @@
+"""
+Process-wide Brevo (sendinblue) client shared by all OTP senders.
+
+Building sib_api_v3_sdk.ApiClient creates a fresh urllib3 PoolManager, so doing it
+per email meant a new TCP + TLS handshake to Brevo on every send. The registry keeps
+one client per api key and reuses its keep-alive connections across requests.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+
+class SendMetrics:
+    """
+    Per-send latency counters, read with BrevoClientRegistry.stats().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+
+    def record(self, elapsed_ms, ok):
+        with self._lock:
+            if ok:
+                self.sent += 1
+            else:
+                self.errors += 1
+            self.total_ms += elapsed_ms
+            self.last_ms = elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def snapshot(self):
+        with self._lock:
+            calls = self.sent + self.errors
+            return {
+                "sent": self.sent,
+                "errors": self.errors,
+                "avg_ms": round(self.total_ms / calls, 2) if calls else 0.0,
+                "max_ms": round(self.max_ms, 2),
+                "last_ms": round(self.last_ms, 2),
+            }
+
+
+class _PooledClient:
+    def __init__(self, api_key, pool_size):
+        import sib_api_v3_sdk  # imported on first send, keeps it out of worker boot
+
+        configuration = sib_api_v3_sdk.Configuration()
+        configuration.api_key['api-key'] = api_key
+        configuration.connection_pool_maxsize = pool_size
+        if settings.BREVO_API_HOST:
+            configuration.host = settings.BREVO_API_HOST
+        self.api_client = sib_api_v3_sdk.ApiClient(configuration)
+        self.api = sib_api_v3_sdk.TransactionalEmailsApi(self.api_client)
+        self.last_used = time.monotonic()
+
+    def close(self):
+        self.api_client.rest_client.pool_manager.clear()
+
+
+class BrevoClientRegistry:
+    """
+    Thread-safe registry of pooled Brevo clients keyed by api key.
+
+    pool_size:     max keep-alive connections to Brevo per process (urllib3 maxsize)
+    idle_timeout:  seconds a client may sit unused before it is rebuilt; Brevo drops
+                   idle connections server side, rebuilding avoids sending on a dead socket
+    """
+
+    def __init__(self, pool_size=None, idle_timeout=None, request_timeout=None):
+        self.pool_size = pool_size or settings.BREVO_POOL_SIZE
+        self.idle_timeout = idle_timeout if idle_timeout is not None else settings.BREVO_POOL_IDLE_TIMEOUT
+        self.request_timeout = request_timeout or settings.BREVO_REQUEST_TIMEOUT
+        self._clients = {}
+        self._lock = threading.Lock()
+        self.metrics = SendMetrics()
+
+    def get(self, api_key=None):
+        """
+        Returns a TransactionalEmailsApi backed by a warm, shared connection pool.
+        """
+        api_key = api_key or settings.BREVO_API_KEY_EMAIL
+        now = time.monotonic()
+        with self._lock:
+            client = self._clients.get(api_key)
+            if client is not None and self.idle_timeout and now - client.last_used > self.idle_timeout:
+                # another thread may still be sending on the old client, so it is only
+                # dropped from the registry; its pool is closed when it is garbage collected
+                client = None
+            if client is None:
+                client = self._clients[api_key] = _PooledClient(api_key, self.pool_size)
+            client.last_used = now
+            return client.api
+
+    def send_transac_email(self, send_smtp_email, api_key=None):
+        api = self.get(api_key)
+        start = time.perf_counter()
+        ok = False
+        try:
+            result = api.send_transac_email(send_smtp_email, _request_timeout=self.request_timeout)
+            ok = True
+            return result
+        finally:
+            self.metrics.record((time.perf_counter() - start) * 1000, ok)
+
+    def stats(self):
+        with self._lock:
+            clients = len(self._clients)
+        return {"clients": clients, "pool_size": self.pool_size, **self.metrics.snapshot()}
+
+    def close(self):
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_brevo_registry():
+    """
+    The process-wide registry (created on first use, after settings are loaded).
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = BrevoClientRegistry()
+    return _registry
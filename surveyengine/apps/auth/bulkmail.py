@@ -0,0 +1,115 @@
+"""
+Bulk transactional email through Brevo message versions.
+
+One Brevo call carries up to BULK_EMAIL_BATCH_SIZE recipients, each as its own
+message version (own `to` and `params`), so a 10k invite list is ~20 API calls
+instead of 10k. Chunks run on a bounded thread pool and retry with backoff when
+Brevo rate limits (429) or fails (5xx).
+
+This module knows nothing about campaigns or models; the caller gets the outcome
+of every chunk through `on_result` and records it (see apps/accounts/invitations.py).
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from django.conf import settings
+
+from .brevoclient import get_brevo_registry
+
+logger = logging.getLogger(__name__)
+
+BREVO_MAX_VERSIONS = 1000  # message versions accepted per send_transac_email call
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class BulkRecipient:
+    email: str
+    name: str = ""
+    params: dict = field(default_factory=dict)
+    ref: object = None  # caller's id (e.g. InvitationRecipient pk), handed back in results
+
+
+@dataclass
+class ChunkResult:
+    recipients: list
+    ok: bool
+    message_ids: list = field(default_factory=list)
+    error: str = ""
+
+
+def chunked(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class BulkEmailDispatcher:
+    def __init__(self, subject, html_content, text_content=None, batch_size=None, concurrency=None, max_retries=None):
+        """
+        subject / html_content may use Brevo placeholders such as {{ params.name }};
+        every recipient's `params` (plus `name`) fill them in.
+        """
+        self.subject = subject
+        self.html_content = html_content
+        self.text_content = text_content
+        self.batch_size = min(batch_size or settings.BULK_EMAIL_BATCH_SIZE, BREVO_MAX_VERSIONS)
+        self.concurrency = concurrency or settings.BULK_EMAIL_CONCURRENCY
+        self.max_retries = settings.BULK_EMAIL_MAX_RETRIES if max_retries is None else max_retries
+
+    def _build(self, chunk):
+        import sib_api_v3_sdk
+
+        versions = []
+        for recipient in chunk:
+            to = {"email": recipient.email}
+            if recipient.name:
+                to["name"] = recipient.name
+            versions.append({"to": [to], "params": {"name": recipient.name, **recipient.params}})
+
+        return sib_api_v3_sdk.SendSmtpEmail(
+            sender={"name": "Government Of India ", "email": settings.FORWARDING_EMAIL},
+            subject=self.subject,
+            html_content=self.html_content,
+            text_content=self.text_content,
+            message_versions=versions,
+        )
+
+    def _send_chunk(self, chunk):
+        from sib_api_v3_sdk.rest import ApiException
+
+        email = self._build(chunk)
+        attempt = 0
+        while True:
+            try:
+                response = get_brevo_registry().send_transac_email(email)
+                message_ids = list(getattr(response, "message_ids", None) or [])
+                return ChunkResult(chunk, True, message_ids)
+            except ApiException as e:
+                retryable = e.status in RETRY_STATUSES
+                error = f"{e.status} {e.reason}"
+            except Exception as e:  # network errors, timeouts
+                retryable = True
+                error = str(e)
+
+            attempt += 1
+            if not retryable or attempt > self.max_retries:
+                logger.error("bulk email chunk of %s failed: %s", len(chunk), error)
+                return ChunkResult(chunk, False, error=error[:1000])
+            time.sleep(min(2 ** attempt, 30))
+
+    def dispatch(self, recipients, on_result=None):
+        """
+        Sends to every recipient. `on_result(ChunkResult)` is called from the calling
+        thread as chunks finish. Returns {"sent": n, "failed": n}.
+        """
+        totals = {"sent": 0, "failed": 0}
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="bulk-email") as pool:
+            futures = [pool.submit(self._send_chunk, chunk) for chunk in chunked(list(recipients), self.batch_size)]
+            for future in as_completed(futures):
+                result = future.result()
+                totals["sent" if result.ok else "failed"] += len(result.recipients)
+                if on_result:
+                    on_result(result)
+        return totals
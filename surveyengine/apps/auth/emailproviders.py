@@ -0,0 +1,258 @@
+"""
+Outbound email providers with latency-aware failover.
+
+Every send goes to the fastest healthy provider first (EWMA of recent send latency),
+then to the providers not tried yet in EMAIL_PROVIDERS order, and falls through to the
+next one on error. A provider that fails EMAIL_CIRCUIT_FAILURE_THRESHOLD times in
+a row is skipped (circuit open) for EMAIL_CIRCUIT_RESET_TIMEOUT seconds, after which
+one trial send is let through (half-open) to decide whether it is back.
+
+Only the provider's own faults count as failures: 5xx, 429 and transport errors. A
+message it rejects (any other 4xx) is tried on the next provider, but the answer shows
+the provider is up.
+
+Health is tracked per process; each worker learns it from its own traffic.
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+
+from django.conf import settings
+
+from .brevoclient import get_brevo_registry
+
+logger = logging.getLogger(__name__)
+
+SENDER_NAME = "Government Of India "
+
+
+@dataclass
+class OutboundEmail:
+    to_email: str
+    subject: str
+    text_content: str = None
+    html_content: str = None
+    template_id: int = None  # brevo hosted template, other providers use the rendered content
+    params: dict = field(default_factory=dict)
+
+
+class EmailProviderError(Exception):
+    def __init__(self, message, provider_fault=True):
+        super().__init__(message)
+        self.provider_fault = provider_fault
+
+
+class BrevoProvider:
+    name = "brevo"
+
+    def send(self, message):
+        import sib_api_v3_sdk
+        from sib_api_v3_sdk.rest import ApiException
+
+        if message.template_id:
+            email = sib_api_v3_sdk.SendSmtpEmail(
+                to=[{"email": message.to_email}],
+                template_id=message.template_id,
+                params=message.params,
+            )
+        else:
+            email = sib_api_v3_sdk.SendSmtpEmail(
+                sender={"name": SENDER_NAME, "email": settings.FORWARDING_EMAIL},
+                to=[{"email": message.to_email}],
+                subject=message.subject,
+                text_content=message.text_content,
+                html_content=message.html_content,
+            )
+        try:
+            get_brevo_registry().send_transac_email(email)
+        except ApiException as e:
+            provider_fault = not e.status or e.status >= 500 or e.status == 429
+            raise EmailProviderError(f"brevo: {e.status} {e.reason}", provider_fault=provider_fault) from e
+
+
+class SmtpProvider:
+    """
+    Plain SMTP through django's backend, configured with the standard EMAIL_HOST /
+    EMAIL_PORT / EMAIL_HOST_USER / EMAIL_HOST_PASSWORD / EMAIL_USE_TLS settings.
+    """
+    name = "smtp"
+
+    def send(self, message):
+        from django.core.mail import EmailMultiAlternatives, get_connection
+
+        connection = get_connection(
+            backend="django.core.mail.backends.smtp.EmailBackend",
+            fail_silently=False,
+            timeout=settings.EMAIL_TIMEOUT,
+        )
+        email = EmailMultiAlternatives(
+            subject=message.subject,
+            body=message.text_content or "",
+            from_email=f"{SENDER_NAME.strip()} <{settings.FORWARDING_EMAIL}>",
+            to=[message.to_email],
+            connection=connection,
+        )
+        if message.html_content:
+            email.attach_alternative(message.html_content, "text/html")
+        try:
+            email.send()
+        except Exception as e:
+            raise EmailProviderError(f"smtp: {e}") from e
+
+
+PROVIDERS = {
+    "brevo": BrevoProvider,
+    "smtp": SmtpProvider,
+}
+
+
+class ProviderHealth:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, name, failure_threshold, reset_timeout, alpha):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.alpha = alpha
+        self.latency_ms = None  # ewma of successful sends, None until the first one
+        self.sent = 0
+        self.errors = 0
+        self.rejected = 0
+        self.consecutive_failures = 0
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.probing = False
+        self._lock = threading.Lock()
+
+    def available(self, now):
+        """
+        True if a send may be attempted; moves open -> half-open once the reset timeout
+        passed and admits a single probe while half-open.
+        """
+        with self._lock:
+            if self.state == self.OPEN and now - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self.probing = False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def record_success(self, elapsed_ms, rejected=False):
+        """
+        rejected: the provider answered but refused the message (a 4xx), which still
+        shows it is up.
+        """
+        with self._lock:
+            if rejected:
+                self.rejected += 1
+            else:
+                self.sent += 1
+            self.consecutive_failures = 0
+            self.state = self.CLOSED
+            self.probing = False
+            if self.latency_ms is None:
+                self.latency_ms = elapsed_ms
+            else:
+                self.latency_ms = self.alpha * elapsed_ms + (1 - self.alpha) * self.latency_ms
+
+    def record_failure(self, elapsed_ms, now):
+        with self._lock:
+            self.errors += 1
+            self.consecutive_failures += 1
+            # a failure also counts as a slow sample, so a flaky provider drifts down the order
+            if self.latency_ms is not None:
+                self.latency_ms = self.alpha * elapsed_ms + (1 - self.alpha) * self.latency_ms
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning("email provider %s circuit opened after %s failures",
+                                   self.name, self.consecutive_failures)
+                self.state = self.OPEN
+                self.opened_at = now
+                self.probing = False
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "latency_ms": round(self.latency_ms, 2) if self.latency_ms is not None else None,
+                "sent": self.sent,
+                "errors": self.errors,
+                "rejected": self.rejected,
+                "consecutive_failures": self.consecutive_failures,
+            }
+
+
+class EmailDispatcher:
+    def __init__(self, provider_names=None):
+        names = provider_names or settings.EMAIL_PROVIDERS
+        self.providers = [PROVIDERS[name]() for name in names]
+        self.health = {
+            provider.name: ProviderHealth(
+                provider.name,
+                settings.EMAIL_CIRCUIT_FAILURE_THRESHOLD,
+                settings.EMAIL_CIRCUIT_RESET_TIMEOUT,
+                settings.EMAIL_LATENCY_EWMA_ALPHA,
+            )
+            for provider in self.providers
+        }
+
+    def ordered(self):
+        """
+        Providers by observed latency (open circuits are skipped in send()), then the
+        untried ones in their configured order, as fallbacks.
+        """
+        position = {provider.name: i for i, provider in enumerate(self.providers)}
+
+        def key(provider):
+            latency = self.health[provider.name].latency_ms
+            return (latency is None, latency or 0, position[provider.name])
+
+        return sorted(self.providers, key=key)
+
+    def send(self, message):
+        """
+        Sends through the first provider that succeeds and returns its name.
+        Raises EmailProviderError when every provider failed or is circuit-open.
+        """
+        errors = []
+        for provider in self.ordered():
+            health = self.health[provider.name]
+            now = time.monotonic()
+            if not health.available(now):
+                errors.append(f"{provider.name}: circuit open")
+                continue
+            start = time.perf_counter()
+            try:
+                provider.send(message)
+            except Exception as e:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                if getattr(e, "provider_fault", True):
+                    health.record_failure(elapsed_ms, time.monotonic())
+                else:
+                    health.record_success(elapsed_ms, rejected=True)
+                logger.warning("email provider %s failed, trying next: %s", provider.name, e)
+                errors.append(str(e))
+                continue
+            health.record_success((time.perf_counter() - start) * 1000)
+            return provider.name
+        raise EmailProviderError("; ".join(errors) or "no email providers configured")
+
+    def stats(self):
+        return {name: health.snapshot() for name, health in self.health.items()}
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_email_dispatcher():
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = EmailDispatcher()
+    return _dispatcher
@@ -0,0 +1,298 @@
+"""
+Durable outbound email queue backed by Redis.
+
+Request threads only push a small JSON job (purpose, email) and return;
+the `run_email_worker` management command drains the queue with a pool of
+threads that do the slow Brevo call.
+
+KEYS (all raw redis keys, not django cache keys):
+    emailq:pending                 list, new jobs are LPUSHed here
+    emailq:processing:<worker>     list, jobs a worker thread is currently sending
+    emailq:retry                   zset, failed jobs scored by the time they are due again
+    emailq:dead                    list, jobs that used up all attempts (EMAIL_QUEUE_DEAD_TTL)
+    emailq:otp:<job id>            string, the code an OTP job mails (OTP_TTL)
+
+The lists have no TTL, so OTP jobs never hold the plaintext code: it sits in its own
+key that expires with the code and is deleted once mailed. An OTP job older than
+OTP_TTL is dropped instead of being sent, retried or dead-lettered, and OTP jobs are
+never requeued from the dead list.
+"""
+import json
+import logging
+import signal
+import socket
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+from .RedisUtils.maincache import get_redis
+from .otpstore import OTP_TTL
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = "emailq:pending"
+PROCESSING_KEY = "emailq:processing:{worker}"
+RETRY_KEY = "emailq:retry"
+DEAD_KEY = "emailq:dead"
+OTP_CODE_KEY = "emailq:otp:{id}"
+
+# moves every due job from the retry zset back to the pending list atomically,
+# so two workers promoting at the same time can not duplicate a job
+PROMOTE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+for _, job in ipairs(due) do
+    redis.call('ZREM', KEYS[1], job)
+    redis.call('LPUSH', KEYS[2], job)
+end
+return #due
+"""
+
+
+def _send_otp(purpose, email, otp):
+    from .otpsender import OTP_SENDERS
+
+    OTP_SENDERS[purpose](email).deliver(otp)
+
+
+def _deliver_otp(job):
+    redis = get_redis()
+    key = OTP_CODE_KEY.format(id=job["id"])
+    otp = redis.get(key)
+    if otp is None:
+        logger.warning("email job %s dropped, its OTP expired before it was sent", job["id"])
+        return
+    _send_otp(job["purpose"], job["email"], otp.decode())
+    redis.delete(key)
+
+
+def _deliver_invitation_campaign(job):
+    from apps.accounts.invitations import dispatch_campaign
+
+    dispatch_campaign(job["campaign_id"], retry_failed=job["attempts"] > 0)
+
+
+# job kind -> callable(job) that performs the actual send
+HANDLERS = {
+    "otp": _deliver_otp,
+    "invitation_campaign": _deliver_invitation_campaign,
+}
+
+
+def _stale(job):
+    """
+    True for an OTP job whose code has expired; mailing it would only confuse the user.
+    """
+    return job["kind"] == "otp" and time.time() - job["enqueued_at"] >= OTP_TTL
+
+
+class EmailQueue:
+    def __init__(self, redis=None):
+        self.redis = redis or get_redis()
+        self.max_attempts = settings.EMAIL_QUEUE_MAX_ATTEMPTS
+        self.backoff = settings.EMAIL_QUEUE_RETRY_BACKOFF
+        self._promote = self.redis.register_script(PROMOTE_SCRIPT)
+
+    def enqueue(self, kind, **payload):
+        """
+        Pushes a job and returns its id. One LPUSH, so the caller never waits on the provider.
+        """
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "attempts": 0,
+            "enqueued_at": time.time(),
+            **payload,
+        }
+        self.redis.lpush(PENDING_KEY, json.dumps(job))
+        return job["id"]
+
+    def enqueue_otp(self, purpose, email, otp):
+        """
+        Pushes an OTP job; the code goes to its own expiring key, not into the job.
+        One MULTI/EXEC, so the worker never sees a job without its code.
+        """
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": "otp",
+            "attempts": 0,
+            "enqueued_at": time.time(),
+            "purpose": purpose,
+            "email": email,
+        }
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.set(OTP_CODE_KEY.format(id=job["id"]), otp, ex=OTP_TTL)
+        pipe.lpush(PENDING_KEY, json.dumps(job))
+        pipe.execute()
+        return job["id"]
+
+    def reserve(self, worker, timeout=5):
+        """
+        Blocks until a job is available and moves it to the worker's processing list.
+        Returns the raw job (needed to ack it) or None on timeout.
+        """
+        return self.redis.blmove(PENDING_KEY, PROCESSING_KEY.format(worker=worker), timeout, "RIGHT", "LEFT")
+
+    def ack(self, worker, raw):
+        self.redis.lrem(PROCESSING_KEY.format(worker=worker), 1, raw)
+
+    def fail(self, worker, raw, error):
+        """
+        Schedules the job again with exponential backoff, or moves it to the dead list.
+        """
+        job = json.loads(raw)
+        job["attempts"] += 1
+        job["last_error"] = str(error)[:500]
+
+        pipe = self.redis.pipeline()
+        pipe.lrem(PROCESSING_KEY.format(worker=worker), 1, raw)
+        if _stale(job):
+            pipe.delete(OTP_CODE_KEY.format(id=job["id"]))
+            logger.warning("email job %s dropped, its OTP expired (attempt %s): %s", job["id"], job["attempts"], error)
+        elif job["attempts"] >= self.max_attempts:
+            job["failed_at"] = time.time()
+            if job["kind"] == "otp":
+                pipe.delete(OTP_CODE_KEY.format(id=job["id"]))
+            pipe.lpush(DEAD_KEY, json.dumps(job))
+            pipe.expire(DEAD_KEY, settings.EMAIL_QUEUE_DEAD_TTL)
+            logger.error("email job %s dead after %s attempts: %s", job["id"], job["attempts"], error)
+        else:
+            due = time.time() + self.backoff * (2 ** (job["attempts"] - 1))
+            pipe.zadd(RETRY_KEY, {json.dumps(job): due})
+            logger.warning("email job %s failed (attempt %s), retrying: %s", job["id"], job["attempts"], error)
+        pipe.execute()
+
+    def promote_due(self, limit=100):
+        return self._promote(keys=[RETRY_KEY, PENDING_KEY], args=[time.time(), limit])
+
+    def recover(self, worker):
+        """
+        Puts back jobs a crashed worker with the same name left in its processing list.
+        """
+        key = PROCESSING_KEY.format(worker=worker)
+        moved = 0
+        while self.redis.lmove(key, PENDING_KEY, "RIGHT", "RIGHT"):
+            moved += 1
+        return moved
+
+    def requeue_dead(self, limit=None):
+        """
+        Moves dead jobs back to pending with a fresh attempt counter. OTP jobs are
+        discarded: their code was deleted and has expired by now anyway.
+        """
+        moved = 0
+        while limit is None or moved < limit:
+            raw = self.redis.rpop(DEAD_KEY)
+            if raw is None:
+                break
+            job = json.loads(raw)
+            if job["kind"] == "otp":
+                continue
+            job["attempts"] = 0
+            self.redis.lpush(PENDING_KEY, json.dumps(job))
+            moved += 1
+        return moved
+
+    def stats(self):
+        pipe = self.redis.pipeline()
+        pipe.llen(PENDING_KEY)
+        pipe.zcard(RETRY_KEY)
+        pipe.llen(DEAD_KEY)
+        pending, retry, dead = pipe.execute()
+        return {"pending": pending, "retry": retry, "dead": dead}
+
+    def process(self, worker, raw):
+        job = json.loads(raw)
+        if _stale(job):
+            logger.warning("email job %s dropped, its OTP expired before it was sent", job["id"])
+            self.redis.delete(OTP_CODE_KEY.format(id=job["id"]))
+            self.ack(worker, raw)
+            return False
+        try:
+            HANDLERS[job["kind"]](job)
+        except Exception as e:
+            self.fail(worker, raw, e)
+            return False
+        self.ack(worker, raw)
+        return True
+
+
+def enqueue_otp_email(purpose, email, otp):
+    """
+    Sends the OTP mail in the background, or inline when EMAIL_QUEUE_EAGER is on (local dev).
+    """
+    if settings.EMAIL_QUEUE_EAGER:
+        _send_otp(purpose, email, otp)
+        return None
+    return EmailQueue().enqueue_otp(purpose, email, otp)
+
+
+def enqueue_invitation_campaign(campaign_id):
+    """
+    Hands a whole invitation campaign to the email worker (or sends it inline when eager).
+    """
+    job = {"kind": "invitation_campaign", "campaign_id": campaign_id, "attempts": 0}
+    if settings.EMAIL_QUEUE_EAGER:
+        HANDLERS["invitation_campaign"](job)
+        return None
+    return EmailQueue().enqueue(kind="invitation_campaign", campaign_id=campaign_id)
+
+
+class EmailWorkerPool:
+    """
+    N threads draining the queue. Each thread has its own processing list named
+    <name>:<index>, so restarting a worker with the same name recovers its in-flight jobs.
+    """
+
+    def __init__(self, concurrency=None, name=None, burst=False, poll_timeout=5):
+        self.concurrency = concurrency or settings.EMAIL_WORKER_CONCURRENCY
+        self.name = name or socket.gethostname()
+        self.burst = burst
+        self.poll_timeout = poll_timeout
+        self.queue = EmailQueue()
+        self.stop_event = threading.Event()
+        self.sent = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def _run_thread(self, index):
+        worker = f"{self.name}:{index}"
+        recovered = self.queue.recover(worker)
+        if recovered:
+            logger.info("worker %s recovered %s in-flight jobs", worker, recovered)
+
+        while not self.stop_event.is_set():
+            # every thread promotes due retries; the lua script keeps it safe
+            self.queue.promote_due()
+            raw = self.queue.reserve(worker, timeout=1 if self.burst else self.poll_timeout)
+            if raw is None:
+                if self.burst and not self.queue.redis.zcount(RETRY_KEY, "-inf", time.time()):
+                    break
+                continue
+            ok = self.queue.process(worker, raw)
+            with self._lock:
+                if ok:
+                    self.sent += 1
+                else:
+                    self.failed += 1
+
+    def stop(self, *args):
+        self.stop_event.set()
+
+    def run(self):
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGINT, self.stop)
+            signal.signal(signal.SIGTERM, self.stop)
+
+        threads = [
+            threading.Thread(target=self._run_thread, args=(i,), name=f"email-worker-{i}", daemon=True)
+            for i in range(self.concurrency)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            # join with a timeout so the main thread still receives signals
+            while t.is_alive():
+                t.join(timeout=0.5)
+        return {"sent": self.sent, "failed": self.failed}
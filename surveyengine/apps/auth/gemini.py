@@ -0,0 +1,232 @@
+"""
+Gemini generateContent calls, blocking and async, through one process-wide GeminiClient.
+
+A bare requests.post() opened a new TCP + TLS connection to generativelanguage.googleapis.com
+for every survey. The client keeps a pooled requests.Session (HTTP/1.1 keep-alive, up to
+GEMINI_POOL_SIZE connections shared by the worker's threads) for the sync views, sends the
+async views' calls over the shared httpx client (asynchttp.py), and records per-request
+metrics for both.
+
+Both paths return the text of the first candidate and raise GeminiError on anything else,
+so the sync and async survey views handle failures the same way. stream() / astream()
+use streamGenerateContent and yield the text as Gemini produces it. httpx is only
+imported by the async paths, so sync workers never load it.
+"""
+import json
+import logging
+import threading
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from .asynchttp import get_async_client
+from .brevoclient import SendMetrics
+
+logger = logging.getLogger(__name__)
+
+
+class GeminiError(Exception):
+    pass
+
+
+def gemini_url(method="generateContent"):
+    return f"{settings.GEMINI_API_URL.rstrip('/')}/models/{settings.GEMINI_MODEL}:{method}"
+
+
+def gemini_payload(query, system_message=None):
+    full_prompt = f"{system_message}\n\n{query}" if system_message else query
+    return {
+        "contents": [{"parts": [{"text": full_prompt}]}],
+        "generationConfig": {
+            "temperature": 0.7,
+            "topK": 40,
+            "topP": 0.95,
+            "maxOutputTokens": 2048,
+        },
+    }
+
+
+def candidate_text(data):
+    candidates = data.get("candidates") or []
+    if candidates and "parts" in candidates[0].get("content", {}):
+        return candidates[0]["content"]["parts"][0]["text"]
+    raise GeminiError("no candidate in the Gemini response")
+
+
+def sse_chunk_text(line):
+    """
+    The text in one line of a streamGenerateContent?alt=sse reply; "" for anything else
+    (blank separators, the closing chunk that only carries finishReason / usage).
+    """
+    if not line.startswith("data:"):
+        return ""
+    try:
+        return candidate_text(json.loads(line[5:]))
+    except GeminiError:
+        return ""
+
+
+def _request_args(query, system_message, stream=False):
+    if not settings.GOOGLE_API_KEY:
+        raise GeminiError("GOOGLE_API_KEY is not configured")
+    params = {"key": settings.GOOGLE_API_KEY}
+    if stream:
+        params["alt"] = "sse"
+    return {
+        "url": gemini_url("streamGenerateContent" if stream else "generateContent"),
+        "params": params,
+        "json": gemini_payload(query, system_message),
+        "headers": {"Content-Type": "application/json"},
+    }
+
+
+class GeminiClient:
+    """
+    Thread-safe: the session only holds the connection pool (urllib3 pools are shared
+    between threads) and no per-request state; Gemini sets no cookies.
+
+    pool_size:  max keep-alive connections per process, the most blocking calls in flight
+                that do not wait for a connection
+    timeout:    (connect, read) seconds
+    """
+
+    def __init__(self, pool_size=None, timeout=None):
+        self.pool_size = pool_size or settings.GEMINI_POOL_SIZE
+        self.timeout = timeout or settings.GEMINI_REQUEST_TIMEOUT
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, pool_block=False)
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        self.metrics = SendMetrics()
+
+    def generate(self, query, system_message=None):
+        start = time.perf_counter()
+        ok = False
+        try:
+            response = self.session.post(timeout=self.timeout, **_request_args(query, system_message))
+            response.raise_for_status()
+            text = candidate_text(response.json())
+            ok = True
+            return text
+        except (requests.RequestException, ValueError) as e:
+            logger.error("Gemini API request failed: %s", e)
+            raise GeminiError(str(e)) from e
+        finally:
+            self.metrics.record((time.perf_counter() - start) * 1000, ok)
+
+    async def agenerate(self, query, system_message=None):
+        import httpx
+
+        connect, read = self.timeout
+        start = time.perf_counter()
+        ok = False
+        try:
+            response = await get_async_client().post(
+                timeout=httpx.Timeout(read, connect=connect), **_request_args(query, system_message)
+            )
+            response.raise_for_status()
+            text = candidate_text(response.json())
+            ok = True
+            return text
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error("Gemini API request failed: %s", e)
+            raise GeminiError(str(e)) from e
+        finally:
+            self.metrics.record((time.perf_counter() - start) * 1000, ok)
+
+    def stream(self, query, system_message=None):
+        """
+        Yields the reply text piece by piece. Closing the generator early drops the
+        connection instead of reading the rest of the reply.
+        """
+        start = time.perf_counter()
+        ok = False
+        try:
+            with self.session.post(stream=True, timeout=self.timeout,
+                                   **_request_args(query, system_message, stream=True)) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    text = sse_chunk_text(line.decode())
+                    if text:
+                        yield text
+            ok = True
+        except GeneratorExit:
+            ok = True  # closed by the caller, who has all it wanted
+            raise
+        except (requests.RequestException, ValueError) as e:
+            logger.error("Gemini API stream failed: %s", e)
+            raise GeminiError(str(e)) from e
+        finally:
+            self.metrics.record((time.perf_counter() - start) * 1000, ok)
+
+    async def astream(self, query, system_message=None):
+        import httpx
+
+        connect, read = self.timeout
+        start = time.perf_counter()
+        ok = False
+        try:
+            async with get_async_client().stream(
+                "POST", timeout=httpx.Timeout(read, connect=connect), **_request_args(query, system_message, stream=True)
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    text = sse_chunk_text(line)
+                    if text:
+                        yield text
+            ok = True
+        except GeneratorExit:
+            ok = True  # closed by the caller, who has all it wanted
+            raise
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error("Gemini API stream failed: %s", e)
+            raise GeminiError(str(e)) from e
+        finally:
+            self.metrics.record((time.perf_counter() - start) * 1000, ok)
+
+    def connections(self):
+        """
+        Connections the session has opened so far; stays flat while keep-alive works.
+        """
+        pools = self.adapter.poolmanager.pools
+        return sum(pools[key].num_connections for key in pools.keys())
+
+    def stats(self):
+        return {"pool_size": self.pool_size, "connections": self.connections(), **self.metrics.snapshot()}
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_gemini_client():
+    """
+    The process-wide client (created on first use, after settings are loaded).
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GeminiClient()
+    return _client
+
+
+def ask_gemini(query, system_message=None):
+    return get_gemini_client().generate(query, system_message)
+
+
+async def ask_gemini_async(query, system_message=None):
+    return await get_gemini_client().agenerate(query, system_message)
+
+
+def stream_gemini(query, system_message=None):
+    return get_gemini_client().stream(query, system_message)
+
+
+def astream_gemini(query, system_message=None):
+    return get_gemini_client().astream(query, system_message)
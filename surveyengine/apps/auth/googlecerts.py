@@ -0,0 +1,177 @@
+"""
+Google sign-in without a network call per login.
+
+verify_oauth2_token() downloads Google's signing certificates on every call. Here the
+certificates are cached for as long as Google's Cache-Control max-age allows:
+
+    process memory  ->  redis (shared by every worker)  ->  GOOGLE_CERTS_URL
+
+and refreshed in a background thread GOOGLE_CERTS_REFRESH_AHEAD seconds before they
+expire, so the request thread only ever waits on the first fetch of a cold cluster.
+A token signed with an unknown key id (Google rotated keys) forces one refresh, at most
+once per GOOGLE_CERTS_MIN_REFRESH_INTERVAL. ID tokens are then verified locally.
+
+KEY: google:certs  ->  {"certs": {kid: pem}, "expires_at": unix time}   TTL: max-age
+"""
+import base64
+import json
+import logging
+import re
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from .RedisUtils.maincache import get_redis
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+CERTS_KEY = "google:certs"
+LOCK_KEY = "google:certs:lock"
+MAX_AGE_PATTERN = re.compile(r"max-age=(\d+)")
+
+CertSet = namedtuple("CertSet", ["certs", "expires_at"])
+
+
+def parse_max_age(headers, default):
+    """
+    Seconds the response may be cached: Cache-Control max-age minus Age.
+    """
+    match = MAX_AGE_PATTERN.search(headers.get("Cache-Control", ""))
+    if not match:
+        return default
+    age = headers.get("Age", "0")
+    return max(int(match.group(1)) - (int(age) if age.isdigit() else 0), 0)
+
+
+def token_key_id(token):
+    """
+    The `kid` from the (unverified) JOSE header, None if absent or malformed.
+    """
+    try:
+        header = token.split(".", 1)[0]
+        header += "=" * (-len(header) % 4)
+        return json.loads(base64.urlsafe_b64decode(header)).get("kid")
+    except (ValueError, AttributeError):
+        return None
+
+
+class GoogleCertCache:
+    def __init__(self, url=None, redis=None):
+        self.url = url or settings.GOOGLE_CERTS_URL
+        self._redis = redis
+        self._entry = None
+        self._last_fetch = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self.fetches = 0  # outbound https calls made by this process
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis()
+        return self._redis
+
+    def certs(self, kid=None):
+        """
+        {kid: pem} currently valid. Only blocks when nothing usable is cached.
+        """
+        now = time.time()
+        entry = self._entry
+        if entry is None or entry.expires_at <= now or (kid and kid not in entry.certs):
+            entry = self._load_shared()
+            if entry is None or entry.expires_at <= now:
+                entry = self.refresh()
+            elif kid and kid not in entry.certs and now - self._last_fetch >= settings.GOOGLE_CERTS_MIN_REFRESH_INTERVAL:
+                entry = self.refresh()
+        elif entry.expires_at - now < settings.GOOGLE_CERTS_REFRESH_AHEAD:
+            self._schedule_refresh()
+        return entry.certs
+
+    def refresh(self):
+        """
+        Fetches the certificates from Google and publishes them to redis.
+        """
+        import requests
+
+        self._last_fetch = time.time()
+        self.fetches += 1
+        response = requests.get(self.url, timeout=settings.GOOGLE_CERTS_TIMEOUT)
+        response.raise_for_status()
+        max_age = parse_max_age(response.headers, settings.GOOGLE_CERTS_DEFAULT_MAX_AGE)
+        entry = CertSet(response.json(), time.time() + max_age)
+        self._entry = entry
+        if max_age:
+            try:
+                self.redis.set(
+                    CERTS_KEY, json.dumps({"certs": entry.certs, "expires_at": entry.expires_at}), ex=max_age
+                )
+            except RedisError as e:
+                logger.warning("could not share google certs through redis: %s", e)
+        return entry
+
+    def _load_shared(self):
+        try:
+            raw = self.redis.get(CERTS_KEY)
+        except RedisError as e:
+            logger.warning("google certs cache unavailable, fetching directly: %s", e)
+            return None
+        if not raw:
+            return None
+        data = json.loads(raw)
+        self._entry = CertSet(data["certs"], data["expires_at"])
+        return self._entry
+
+    def _schedule_refresh(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._background_refresh, daemon=True).start()
+
+    def _background_refresh(self):
+        try:
+            # another worker may already have refreshed; otherwise one worker fetches
+            shared = self._load_shared()
+            if shared and shared.expires_at - time.time() >= settings.GOOGLE_CERTS_REFRESH_AHEAD:
+                return
+            if self.redis.set(LOCK_KEY, "1", nx=True, ex=settings.GOOGLE_CERTS_TIMEOUT * 2):
+                self.refresh()
+        except Exception as e:
+            # the current certs stay in use until they expire, the next request retries
+            logger.warning("background refresh of google certs failed: %s", e)
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+
+_cache = None
+
+
+def get_google_cert_cache():
+    global _cache
+    if _cache is None:
+        _cache = GoogleCertCache()
+    return _cache
+
+
+def verify_google_id_token(token, audience=None):
+    """
+    Drop-in for google.oauth2.id_token.verify_oauth2_token() against the cached certs.
+    Raises ValueError for invalid, expired or foreign tokens.
+    """
+    from google.auth import jwt
+
+    certs = get_google_cert_cache().certs(token_key_id(token))
+    id_info = jwt.decode(
+        token,
+        certs=certs,
+        audience=audience or settings.GOOGLE_CLIENT_ID,
+        clock_skew_in_seconds=settings.GOOGLE_TOKEN_CLOCK_SKEW,
+    )
+    if id_info.get("iss") not in GOOGLE_ISSUERS:
+        raise ValueError(f"Wrong issuer. 'iss' should be one of {GOOGLE_ISSUERS} but got {id_info.get('iss')}")
+    return id_info
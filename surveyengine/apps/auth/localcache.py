@@ -0,0 +1,53 @@
+"""
+Small in-process caches in front of the shared django cache (redis).
+
+LocalCache is a thread-safe LRU whose entries also expire after `ttl` seconds; the
+per-process tier of the user cache and the survey generation cache. CACHE_ERRORS are
+the exceptions a django-redis call raises when redis is down, which those callers
+treat as a miss instead of failing the request.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django_redis.exceptions import ConnectionInterrupted
+from redis.exceptions import RedisError
+
+CACHE_ERRORS = (ConnectionInterrupted, RedisError)
+
+
+class LocalCache:
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
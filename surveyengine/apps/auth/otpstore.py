@@ -0,0 +1,150 @@
+"""
+Compact OTP storage: one redis hash per user instead of a string key per purpose.
+
+KEY: otp:kishan@gmail.com    (the email lowercased, so Kishan@Gmail.com shares it)
+FIELDS:
+    register      HMAC digest of the code (never the plaintext)
+    register:t    unix time the code was issued
+    register:n    failed verifications of the current code
+    login ...     same three fields for every other active purpose
+TTL: OTP_TTL on the key itself, and on each field with OTP_FIELD_EXPIRY (HEXPIRE).
+
+Expiry is checked against the issue timestamp inside the verify script, so
+correctness does not depend on field-level expiry. It is off by default because
+HEXPIRE only exists from redis 7.4 on, and it would fail every issue() on older
+servers; without it stale fields are reclaimed with the key.
+"""
+import hashlib
+import hmac
+import secrets
+import time
+
+from django.conf import settings
+
+from .RedisUtils.maincache import get_redis
+from .ratelimit import failures_key, normalize_email
+
+OTP_TTL = 300
+
+# verify-and-consume in one round trip. Returns 1 on match (and deletes the purpose's
+# fields when consuming), otherwise counts the failure and returns the count negated.
+# After max_attempts failures the code is burned. Failures also go to the per-email
+# lockout window read by the rate limiter (KEYS[2], see ratelimit.py).
+VERIFY_SCRIPT = """
+local f = ARGV[1]
+local ttl = tonumber(ARGV[4])
+local now = tonumber(ARGV[6])
+local stored = redis.call('HGET', KEYS[1], f)
+if stored then
+    local issued = tonumber(redis.call('HGET', KEYS[1], f .. ':t') or '0')
+    if issued + ttl < now then
+        redis.call('HDEL', KEYS[1], f, f .. ':t', f .. ':n')
+        stored = false
+    end
+end
+if stored and stored == ARGV[2] then
+    if ARGV[3] == '1' then
+        redis.call('HDEL', KEYS[1], f, f .. ':t', f .. ':n')
+        redis.call('DEL', KEYS[2])
+    end
+    return 1
+end
+local attempts = redis.call('HINCRBY', KEYS[1], f .. ':n', 1)
+if ARGV[9] == '1' then
+    redis.call('HEXPIRE', KEYS[1], ttl, 'FIELDS', 1, f .. ':n')
+end
+if redis.call('TTL', KEYS[1]) < 0 then
+    redis.call('EXPIRE', KEYS[1], ttl)
+end
+if attempts >= tonumber(ARGV[5]) then
+    redis.call('HDEL', KEYS[1], f, f .. ':t')
+end
+local window = tonumber(ARGV[7])
+redis.call('ZADD', KEYS[2], now, ARGV[8])
+redis.call('ZREMRANGEBYSCORE', KEYS[2], 0, now - window)
+redis.call('EXPIRE', KEYS[2], window)
+return -attempts
+"""
+
+
+class HashOtpStore:
+    def __init__(self, redis=None, ttl=OTP_TTL):
+        self.redis = redis or get_redis()
+        self.ttl = ttl
+        self.field_expiry = settings.OTP_FIELD_EXPIRY
+        self.secret = (settings.OTP_HMAC_KEY or settings.SECRET_KEY or "").encode()
+        self._verify = self.redis.register_script(VERIFY_SCRIPT)
+
+    @staticmethod
+    def key(email):
+        return f"otp:{normalize_email(email)}"
+
+    def digest(self, email, purpose, otp):
+        """
+        HMAC bound to email and purpose, so a digest is useless outside its own field.
+        Truncated to 128 bits; plenty for a 6-digit code and half the memory of full hex.
+        """
+        message = f"{purpose}:{normalize_email(email)}:{otp}".encode()
+        return hmac.new(self.secret, message, hashlib.sha256).hexdigest()[:32]
+
+    def issue(self, email, purpose):
+        """
+        Generates a 6-digit code, stores its digest and resets the failure count. One MULTI/EXEC.
+        """
+        otp = f"{secrets.randbelow(900000) + 100000}"
+        key = self.key(email)
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hset(key, mapping={purpose: self.digest(email, purpose, otp), f"{purpose}:t": int(time.time())})
+        pipe.hdel(key, f"{purpose}:n")
+        pipe.expire(key, self.ttl)
+        if self.field_expiry:
+            pipe.hexpire(key, self.ttl, purpose, f"{purpose}:t")
+        pipe.execute()
+        return otp
+
+    def verify(self, email, purpose, otp, consume=True):
+        """
+        Returns (ok, failed_attempts).
+        """
+        now = time.time()
+        result = self._verify(
+            keys=[self.key(email), failures_key(email)],
+            args=[
+                purpose, self.digest(email, purpose, otp or ""), "1" if consume else "0",
+                self.ttl, settings.OTP_MAX_FAILED_ATTEMPTS, now, settings.OTP_LOCKOUT_WINDOW,
+                f"{now}:{purpose}", "1" if self.field_expiry else "0",
+            ],
+        )
+        if result == 1:
+            return True, 0
+        return False, -result
+
+    def invalidate(self, email, purpose):
+        self.redis.hdel(self.key(email), purpose, f"{purpose}:t", f"{purpose}:n")
+
+    def active(self, email):
+        """
+        {purpose: {"issued_at": ts, "attempts": n}} for codes that are still valid.
+        """
+        fields = self.redis.hgetall(self.key(email))
+        now = time.time()
+        active = {}
+        for name, value in fields.items():
+            name = name.decode() if isinstance(name, bytes) else name
+            if ":" in name:
+                continue
+            issued = int(fields.get(f"{name}:t".encode(), fields.get(f"{name}:t", 0)))
+            if issued + self.ttl >= now:
+                attempts = int(fields.get(f"{name}:n".encode(), fields.get(f"{name}:n", 0)))
+                active[name] = {"issued_at": issued, "attempts": attempts}
+        return active
+
+
+_store = None
+
+
+def get_otp_store():
+    global _store
+    if _store is None:
+        _store = HashOtpStore()
+    return _store
@@ -0,0 +1,133 @@
+"""
+Password hashing off the request thread.
+
+With PASSWORD_HASH_WORKERS > 0 every hash and check runs in a bounded process pool, so
+a burst of logins queues for the pool instead of stalling the other requests handled
+by the same worker. 0 keeps hashing inline. Workers are spawned with a minimal settings
+copy (just the hasher configuration), not a full django setup.
+
+verify_password() also upgrades hashes on a successful check: legacy PBKDF2 after
+switching PASSWORD_HASHER to argon2, or any hash made with older cost parameters.
+"""
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, make_password
+from django.contrib.auth.hashers import verify_password as django_verify_password
+from django.utils.module_loading import import_string
+
+HASHER_SETTINGS = (
+    "PASSWORD_HASHERS",
+    "PASSWORD_ARGON2_TIME_COST",
+    "PASSWORD_ARGON2_MEMORY_COST",
+    "PASSWORD_ARGON2_PARALLELISM",
+)
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    argon2id with costs from settings. Same algorithm name as django's hasher, so stored
+    hashes stay standard; changing a cost makes must_update() rehash on next login.
+    """
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
+
+
+def _init_worker(hasher_settings):
+    if not settings.configured:
+        settings.configure(**hasher_settings)
+
+
+def _check_and_upgrade(raw_password, encoded):
+    """
+    (ok, new_encoded); new_encoded is set when the stored hash should be replaced.
+    """
+    ok, must_update = django_verify_password(raw_password, encoded)
+    return ok, make_password(raw_password) if ok and must_update else None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if settings.PASSWORD_HASH_WORKERS <= 0:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=settings.PASSWORD_HASH_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=({name: getattr(settings, name) for name in HASHER_SETTINGS},),
+                )
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def _run(fn, *args):
+    pool = get_pool()
+    if pool is None:
+        return fn(*args)
+    return pool.submit(fn, *args).result(timeout=settings.PASSWORD_HASH_TIMEOUT)
+
+
+def hash_password(raw_password):
+    return _run(make_password, raw_password)
+
+
+def set_password(user, raw_password):
+    """
+    user.set_password() through the pool; the caller saves the user.
+    """
+    user.password = hash_password(raw_password)
+    user._password = raw_password
+
+
+def verify_password(user, raw_password):
+    """
+    user.check_password() through the pool. Saves an upgraded hash when needed.
+    """
+    ok, new_encoded = _run(_check_and_upgrade, raw_password, user.password)
+    if new_encoded:
+        user.password = new_encoded
+        user.save(update_fields=["password"])
+    return ok
+
+
+def hash_rate(hasher_path, params, seconds):
+    """
+    Hashes made by one hasher configuration in `seconds` on this core (benchmark_hashers).
+    """
+    hasher = import_string(hasher_path)()
+    for name, value in params.items():
+        setattr(hasher, name, value)
+    salt = hasher.salt()
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        hasher.encode("benchmark-password", salt)
+        count += 1
+    return count
@@ -0,0 +1,138 @@
+"""
+Sliding-window rate limiting for OTP issuance / verification.
+
+Each limit is a redis sorted set of hit timestamps:
+    KEY:   ratelimit:<scope>:<kind>:<identifier>     e.g. ratelimit:issue:email:kishan@gmail.com
+    SCORE: unix time of the hit
+
+Failed OTP verifications are recorded (by the verify Lua script in baseotp.py) in
+    KEY:   ratelimit:otp-fail:<email>
+and an email with OTP_LOCKOUT_THRESHOLD failures inside OTP_LOCKOUT_WINDOW is locked out.
+A successful verification clears them.
+
+One request is checked and recorded by one script call (HIT_SCRIPT). It is only added
+to its windows when every window and the lockout allow it, so a client retrying while
+it is blocked does not push its own retry_after further out.
+"""
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from .RedisUtils.maincache import get_redis
+
+logger = logging.getLogger(__name__)
+
+# KEYS: one window per rule, then the failures key when ARGV[3] == '1'
+# ARGV: now, member, lockout flag, lockout threshold, lockout window, then limit, window per rule
+# returns {0} allowed, {1, rule, oldest score} over a rule's limit, {2, 0, score} locked out
+HIT_SCRIPT = """
+local now = tonumber(ARGV[1])
+local rules = #KEYS
+if ARGV[3] == '1' then
+    rules = rules - 1
+end
+for i = 1, rules do
+    local window = tonumber(ARGV[5 + i * 2])
+    redis.call('ZREMRANGEBYSCORE', KEYS[i], 0, now - window)
+    if redis.call('ZCARD', KEYS[i]) >= tonumber(ARGV[4 + i * 2]) then
+        local oldest = redis.call('ZRANGE', KEYS[i], 0, 0, 'WITHSCORES')
+        return {1, i, oldest[2]}
+    end
+end
+if ARGV[3] == '1' then
+    local threshold = tonumber(ARGV[4])
+    if redis.call('ZCOUNT', KEYS[#KEYS], now - tonumber(ARGV[5]), '+inf') >= threshold then
+        local nth_last = redis.call('ZRANGE', KEYS[#KEYS], -threshold, -threshold, 'WITHSCORES')
+        return {2, 0, nth_last[2]}
+    end
+end
+for i = 1, rules do
+    redis.call('ZADD', KEYS[i], ARGV[1], ARGV[2])
+    redis.call('EXPIRE', KEYS[i], ARGV[5 + i * 2])
+end
+return {0}
+"""
+
+
+def normalize_email(email):
+    """
+    The form every redis key and digest for an email uses; accounts match emails case-insensitively.
+    """
+    return email.strip().lower()
+
+
+def failures_key(email):
+    return f"ratelimit:otp-fail:{normalize_email(email)}"
+
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    retry_after: float = 0
+    reason: str = ""
+
+
+class SlidingWindowLimiter:
+    def __init__(self, scope, redis=None):
+        """
+        scope: key of settings.OTP_RATE_LIMITS ('issue' or 'verify')
+        """
+        self.scope = scope
+        self.redis = redis or get_redis()
+        self.rules = settings.OTP_RATE_LIMITS[scope]
+        self.lockout_threshold = settings.OTP_LOCKOUT_THRESHOLD
+        self.lockout_window = settings.OTP_LOCKOUT_WINDOW
+        self._hit = self.redis.register_script(HIT_SCRIPT)
+
+    def _key(self, kind, identifier):
+        return f"ratelimit:{self.scope}:{kind}:{identifier}"
+
+    def hit(self, email=None, ip=None, now=None):
+        """
+        Checks the email and ip windows and the lockout, and records the request if it is allowed.
+        """
+        now = now or time.time()
+        identifiers = {"email": normalize_email(email) if email else None, "ip": ip}
+
+        keys = []
+        member = f"{now}:{uuid.uuid4().hex[:8]}"
+        args = [now, member, "1" if email else "0", self.lockout_threshold, self.lockout_window]
+        checks = []
+        for kind, (limit, window) in self.rules.items():
+            identifier = identifiers.get(kind)
+            if not identifier:
+                continue
+            keys.append(self._key(kind, identifier))
+            args += [limit, window]
+            checks.append((kind, window))
+        if email:
+            keys.append(failures_key(email))
+        if not keys:
+            return RateLimitResult(True)
+
+        reply = self._hit(keys=keys, args=args)
+
+        if reply[0] == 1:
+            kind, window = checks[reply[1] - 1]
+            retry_after = (float(reply[2]) + window - now) if len(reply) > 2 else window
+            return RateLimitResult(False, max(retry_after, 1), f"too many requests for this {kind}")
+        if reply[0] == 2:
+            # locked until the failure that tripped the threshold leaves the window
+            retry_after = (float(reply[2]) + self.lockout_window - now) if len(reply) > 2 else self.lockout_window
+            return RateLimitResult(False, max(retry_after, 1), "too many failed OTP attempts")
+        return RateLimitResult(True)
+
+    def safe_hit(self, email=None, ip=None):
+        """
+        Like hit() but fails open when redis is unreachable, so a cache outage
+        does not take the auth endpoints down with it.
+        """
+        try:
+            return self.hit(email=email, ip=ip)
+        except RedisError as e:
+            logger.error("rate limiter unavailable, allowing request: %s", e)
+            return RateLimitResult(True)
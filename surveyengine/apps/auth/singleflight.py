@@ -0,0 +1,181 @@
+"""
+Request coalescing across workers: while one caller runs fn for a key, callers with the
+same key in any process wait for its result instead of running fn themselves.
+
+    KEY: flight:<key>                    VALUE: token of the leader's flight   TTL: lock_ttl
+    KEY: flight:<key>:<token>:result     VALUE: the leader's result as JSON     TTL: result_ttl
+    CHANNEL: flight:<key>:<token>        published once the result is stored
+
+The first caller takes the lock (SET NX) and becomes the leader. A follower subscribes
+to the flight's channel and then reads the result key, so a result published before it
+subscribed is not missed. Results are per flight (per token), so a later flight for the
+same key never sees an old result.
+
+Followers wait at most wait_timeout. If the wait times out, the leader fails or redis is
+unavailable, the caller runs fn itself: coalescing saves calls but never fails one. Results
+must be JSON serializable.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+
+from asgiref.sync import sync_to_async
+from redis.exceptions import RedisError
+
+from .RedisUtils.maincache import get_redis
+
+logger = logging.getLogger(__name__)
+
+# deletes the lock only if this flight still holds it
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+FAILED = {"__flight_failed__": True}
+
+
+class Singleflight:
+    def __init__(self, prefix, lock_ttl, wait_timeout, result_ttl=10, poll_interval=0.05, redis=None):
+        self.prefix = prefix
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.redis = redis or get_redis()
+        self._release = self.redis.register_script(RELEASE_SCRIPT)
+
+    def lock_key(self, key):
+        return f"{self.prefix}:{key}"
+
+    def channel(self, key, token):
+        return f"{self.prefix}:{key}:{token}"
+
+    def result_key(self, key, token):
+        return f"{self.prefix}:{key}:{token}:result"
+
+    def _join(self, key):
+        """
+        (token, True) if this caller leads the flight, (leader's token, False) if one is
+        running, (None, False) if redis is unavailable.
+        """
+        token = uuid.uuid4().hex
+        try:
+            for _ in range(3):
+                if self.redis.set(self.lock_key(key), token, nx=True, px=int(self.lock_ttl * 1000)):
+                    return token, True
+                leader = self.redis.get(self.lock_key(key))
+                if leader is not None:
+                    return leader.decode(), False
+                # the leader finished between SET NX and GET, try to lead the next flight
+        except RedisError as e:
+            logger.warning("singleflight unavailable, not coalescing: %s", e)
+        return None, False
+
+    def _finish(self, key, token, value):
+        payload = json.dumps(value)
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.set(self.result_key(key, token), payload, px=int(self.result_ttl * 1000))
+            pipe.publish(self.channel(key, token), payload)
+            self._release(keys=[self.lock_key(key)], args=[token], client=pipe)
+            pipe.execute()
+        except RedisError as e:
+            logger.warning("could not publish the result of flight %s: %s", key, e)
+
+    @staticmethod
+    def _decode(payload):
+        value = json.loads(payload)
+        return None if value == FAILED else value
+
+    def _wait(self, key, token):
+        """
+        The leader's result, or None if it failed or did not answer within wait_timeout.
+        """
+        deadline = time.monotonic() + self.wait_timeout
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.subscribe(self.channel(key, token))
+            while True:
+                payload, running = self._read(key, token)
+                if payload is not None:
+                    return self._decode(payload)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not running:
+                    # timed out, or the leader's lock expired without a result
+                    return None
+                message = pubsub.get_message(timeout=min(remaining, 1.0))
+                if message is not None:
+                    return self._decode(message["data"])
+        except RedisError as e:
+            logger.warning("lost the flight %s while waiting: %s", key, e)
+            return None
+        finally:
+            pubsub.close()
+
+    def do(self, key, fn):
+        token, leader = self._join(key)
+        if token is None:
+            return fn()
+        if not leader:
+            value = self._wait(key, token)
+            return fn() if value is None else value
+
+        try:
+            value = fn()
+        except Exception:
+            self._finish(key, token, FAILED)
+            raise
+        self._finish(key, token, value)
+        return value
+
+    async def ado(self, key, fn):
+        """
+        do() for a coroutine function. Followers poll the result key every
+        poll_interval instead of holding a thread on a subscription.
+        """
+        token, leader = await sync_to_async(self._join, thread_sensitive=False)(key)
+        if token is None:
+            return await fn()
+        if not leader:
+            value = await self._apoll(key, token)
+            return await fn() if value is None else value
+
+        try:
+            value = await fn()
+        except BaseException:  # cancelled too (a timeout around the call), followers must not wait it out
+            await sync_to_async(self._finish, thread_sensitive=False)(key, token, FAILED)
+            raise
+        await sync_to_async(self._finish, thread_sensitive=False)(key, token, value)
+        return value
+
+    async def _apoll(self, key, token):
+        deadline = time.monotonic() + self.wait_timeout
+        read = sync_to_async(self._read, thread_sensitive=False)
+        try:
+            while time.monotonic() < deadline:
+                await asyncio.sleep(self.poll_interval)
+                payload, running = await read(key, token)
+                if payload is not None:
+                    return self._decode(payload)
+                if not running:
+                    return None
+        except RedisError as e:
+            logger.warning("lost the flight %s while waiting: %s", key, e)
+        return None
+
+    def _read(self, key, token):
+        """
+        (result or None, the flight's leader still holds the lock) in one round trip. The
+        lock is read first: the leader stores the result before releasing it, so a released
+        lock and a missing result mean the leader is gone.
+        """
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.get(self.lock_key(key))
+        pipe.get(self.result_key(key, token))
+        holder, payload = pipe.execute()
+        return payload, holder is not None and holder.decode() == token
@@ -0,0 +1,62 @@
+"""
+Refresh token blacklist in redis instead of the OutstandingToken / BlacklistedToken tables.
+
+    KEY: jwt:blacklist:<jti>    VALUE: 1    TTL: seconds until the token's own exp
+
+A blacklisted token only needs to be remembered until it would have expired anyway,
+so entries clean themselves up and nothing grows without bound. Outstanding tokens are
+not tracked at all: only the blacklist is ever consulted.
+
+Adding uses SET NX, so when two refreshes race on the same token exactly one of them
+rotates it (see RedisTokenRefreshSerializer).
+"""
+import time
+
+from .RedisUtils.maincache import get_redis
+
+
+def blacklist_key(jti):
+    return f"jwt:blacklist:{jti}"
+
+
+class RedisTokenBlacklist:
+    def __init__(self, redis=None):
+        self.redis = redis or get_redis()
+
+    def contains(self, jti):
+        return bool(self.redis.exists(blacklist_key(jti)))
+
+    def add(self, jti, exp):
+        """
+        True if the token was newly blacklisted, False if it already was.
+        """
+        ttl = int(exp - time.time())
+        if ttl <= 0:
+            return True  # expired, verification rejects it on its own
+        return bool(self.redis.set(blacklist_key(jti), 1, ex=ttl, nx=True))
+
+    def add_many(self, entries):
+        """
+        Bulk add of (jti, exp) pairs in one pipeline; returns how many were stored.
+        """
+        now = time.time()
+        pipe = self.redis.pipeline(transaction=False)
+        stored = 0
+        for jti, exp in entries:
+            ttl = int(exp - now)
+            if ttl > 0:
+                pipe.set(blacklist_key(jti), 1, ex=ttl, nx=True)
+                stored += 1
+        if stored:
+            pipe.execute()
+        return stored
+
+
+_blacklist = None
+
+
+def get_token_blacklist():
+    global _blacklist
+    if _blacklist is None:
+        _blacklist = RedisTokenBlacklist()
+    return _blacklist
@@ -148,9 +148,27 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# //  password hashing (apps/auth/passwords.py). PASSWORD_HASHER=argon2 hashes new passwords with
+# //  argon2id; existing pbkdf2 hashes keep working and are upgraded on the next successful login
+PASSWORD_HASHER = config('PASSWORD_HASHER', default='pbkdf2')
+PASSWORD_ARGON2_TIME_COST = config('PASSWORD_ARGON2_TIME_COST', default=2, cast=int)
+PASSWORD_ARGON2_MEMORY_COST = config('PASSWORD_ARGON2_MEMORY_COST', default=102400, cast=int)  # KiB
+PASSWORD_ARGON2_PARALLELISM = config('PASSWORD_ARGON2_PARALLELISM', default=8, cast=int)
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'apps.auth.passwords.TunedArgon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+if PASSWORD_HASHER == 'argon2':
+    PASSWORD_HASHERS.insert(0, PASSWORD_HASHERS.pop(2))
+PASSWORD_HASH_WORKERS = config('PASSWORD_HASH_WORKERS', default=0, cast=int)  # hashing processes, 0 = inline
+PASSWORD_HASH_TIMEOUT = config('PASSWORD_HASH_TIMEOUT', default=10, cast=int)  # seconds waiting for the pool
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.accounts.authentication.CachedJWTAuthentication',
     ),
 }
 
@@ -183,12 +201,12 @@ AUTH_USER_MODEL='accounts.User'
 
 # /// //////  all the environment variables are stored in .env file
 # /// cloudniary 
-import cloudinary
-cloudinary.config(
-    cloud_name=os.getenv('CLOUD_NAME'),
-    api_key=os.getenv('API_KEY'),
-    api_secret=os.getenv('API_SECRET')
-)   
+# cloudinary is imported and configured on first upload (apps.accounts.serializers), not at boot
+CLOUDINARY = {
+    'cloud_name': os.getenv('CLOUD_NAME'),
+    'api_key': os.getenv('API_KEY'),
+    'api_secret': os.getenv('API_SECRET'),
+}
 DEFAULt_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
 
 
@@ -196,6 +214,7 @@ DEFAULt_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
 
 SIMPLE_JWT = {
     'TOKEN_OBTAIN_SERIALIZER': 'apps.accounts.serializers.CustomTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'apps.accounts.serializers.RedisTokenRefreshSerializer',  # redis blacklist
    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=int(config('ACCESS_TOKEN_LIFETIME', default=5))),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=int(config('REFRESH_TOKEN_LIFETIME', default=1))),
     'ROTATE_REFRESH_TOKENS': True,
@@ -204,6 +223,23 @@ SIMPLE_JWT = {
 }
 
 
+# //  authenticated user cache (apps/accounts/usercache.py): process memory, then redis
+USER_CACHE_TTL = config('USER_CACHE_TTL', default=300, cast=int)  # seconds in redis
+USER_CACHE_LOCAL_TTL = config('USER_CACHE_LOCAL_TTL', default=5, cast=int)  # seconds in process, 0 = off
+USER_CACHE_LOCAL_MAXSIZE = config('USER_CACHE_LOCAL_MAXSIZE', default=2048, cast=int)
+
+
+# //  next-suffix counters for generated usernames (apps/accounts/usernames.py)
+USERNAME_COUNTER_TTL = config('USERNAME_COUNTER_TTL', default=86400, cast=int)  # reseeded from the db after this
+
+
+# //  bloom filters for username / email checks (apps/accounts/existence.py); changing the
+# //  size needs `python manage.py rebuild_existence_index`
+EXISTENCE_BLOOM_CAPACITY = config('EXISTENCE_BLOOM_CAPACITY', default=1000000, cast=int)  # values per filter
+EXISTENCE_BLOOM_ERROR_RATE = config('EXISTENCE_BLOOM_ERROR_RATE', default=0.01, cast=float)  # ~1.2 MB per filter
+EXISTENCE_NEGATIVE_TTL = config('EXISTENCE_NEGATIVE_TTL', default=30, cast=int)  # seconds a db "not taken" is cached
+
+
 # ///  ths oen for the razorpay 
 RAZORPAY_API_KEY = os.getenv('RAZORPAY_API_ID')
 RAZORPAY_API_SECRET = os.getenv('RAZORPAY_API_SECRET')  
@@ -230,6 +266,66 @@ SWAGGER_SETTINGS = {
 # /// otps system 
 BREVO_API_KEY_EMAIL = os.getenv('BREVO_API_KEY_EMAIL')
 FORWARDING_EMAIL = os.getenv('FORWARDING_EMAIL')
+OTP_MAX_FAILED_ATTEMPTS = config('OTP_MAX_FAILED_ATTEMPTS', default=5, cast=int)  # wrong codes before the otp is burned
+OTP_HMAC_KEY = os.getenv('OTP_HMAC_KEY')  # otps are stored as hmac digests; defaults to SECRET_KEY
+OTP_FIELD_EXPIRY = config('OTP_FIELD_EXPIRY', default=False, cast=bool)  # HEXPIRE per hash field, only on redis >= 7.4
+
+# //  otp rate limits: (max requests, window seconds) per email and per client ip
+OTP_RATE_LIMITS = {
+    'issue': {
+        'email': (config('OTP_ISSUE_LIMIT_EMAIL', default=5, cast=int), 900),
+        'ip': (config('OTP_ISSUE_LIMIT_IP', default=30, cast=int), 900),
+    },
+    'verify': {
+        'email': (config('OTP_VERIFY_LIMIT_EMAIL', default=10, cast=int), 900),
+        'ip': (config('OTP_VERIFY_LIMIT_IP', default=60, cast=int), 900),
+    },
+}
+OTP_LOCKOUT_THRESHOLD = config('OTP_LOCKOUT_THRESHOLD', default=10, cast=int)  # failed otp checks per email ...
+OTP_LOCKOUT_WINDOW = config('OTP_LOCKOUT_WINDOW', default=1800, cast=int)  # ... within this many seconds
+
+# //  outbound email queue (worker: python manage.py run_email_worker)
+EMAIL_QUEUE_EAGER = config('EMAIL_QUEUE_EAGER', default=False, cast=bool)  # True = send inline, no worker needed
+EMAIL_QUEUE_MAX_ATTEMPTS = config('EMAIL_QUEUE_MAX_ATTEMPTS', default=5, cast=int)
+EMAIL_QUEUE_RETRY_BACKOFF = config('EMAIL_QUEUE_RETRY_BACKOFF', default=10, cast=int)  # seconds, doubled per attempt
+EMAIL_QUEUE_DEAD_TTL = config('EMAIL_QUEUE_DEAD_TTL', default=7 * 24 * 3600, cast=int)  # seconds the dead list is kept after its last entry
+EMAIL_WORKER_CONCURRENCY = config('EMAIL_WORKER_CONCURRENCY', default=4, cast=int)
+
+# //  bulk survey invitations (brevo message versions)
+BULK_EMAIL_BATCH_SIZE = config('BULK_EMAIL_BATCH_SIZE', default=500, cast=int)  # recipients per brevo call, max 1000
+BULK_EMAIL_CONCURRENCY = config('BULK_EMAIL_CONCURRENCY', default=4, cast=int)  # brevo calls in flight per campaign
+BULK_EMAIL_MAX_RETRIES = config('BULK_EMAIL_MAX_RETRIES', default=3, cast=int)  # per chunk, on 429 / 5xx
+BULK_EMAIL_MAX_RECIPIENTS = config('BULK_EMAIL_MAX_RECIPIENTS', default=50000, cast=int)  # per api request
+
+# //  shared brevo client (one keep-alive pool per process)
+BREVO_API_HOST = os.getenv('BREVO_API_HOST')  # override for local stand-ins, sdk default otherwise
+BREVO_POOL_SIZE = config('BREVO_POOL_SIZE', default=8, cast=int)
+BREVO_POOL_IDLE_TIMEOUT = config('BREVO_POOL_IDLE_TIMEOUT', default=60, cast=int)  # seconds, 0 = never recycle
+BREVO_REQUEST_TIMEOUT = (
+    config('BREVO_CONNECT_TIMEOUT', default=3.05, cast=float),
+    config('BREVO_READ_TIMEOUT', default=10, cast=float),
+)
+
+# //  otp email providers, tried fastest-healthy-first, e.g. EMAIL_PROVIDERS=brevo,smtp
+EMAIL_PROVIDERS = [name.strip() for name in config('EMAIL_PROVIDERS', default='brevo').split(',') if name.strip()]
+EMAIL_CIRCUIT_FAILURE_THRESHOLD = config('EMAIL_CIRCUIT_FAILURE_THRESHOLD', default=3, cast=int)  # failures in a row
+EMAIL_CIRCUIT_RESET_TIMEOUT = config('EMAIL_CIRCUIT_RESET_TIMEOUT', default=30, cast=int)  # seconds before a retry probe
+EMAIL_LATENCY_EWMA_ALPHA = config('EMAIL_LATENCY_EWMA_ALPHA', default=0.3, cast=float)  # weight of the newest sample
+EMAIL_HOST = os.getenv('EMAIL_HOST', 'localhost')  # smtp provider, django's standard email settings
+EMAIL_PORT = config('EMAIL_PORT', default=587, cast=int)
+EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
+EMAIL_TIMEOUT = config('EMAIL_TIMEOUT', default=10, cast=int)
+
+# //  optional brevo-hosted otp templates, e.g. BREVO_OTP_TEMPLATE_IDS=login:12,forget:13,register:14,update:15
+# //  the template receives {{ params.otp }}; purposes without an id use the local html templates
+BREVO_OTP_TEMPLATE_IDS = {
+    purpose.strip(): int(template_id)
+    for purpose, template_id in (
+        item.split(':') for item in config('BREVO_OTP_TEMPLATE_IDS', default='').split(',') if item.strip()
+    )
+}
 
 # //  redis settings
 CACHES = {
@@ -244,4 +340,45 @@ CACHES = {
 }
 REDIS_URL= os.getenv("REDIS_URL")  # stored in .env
 
-GOOGLE_CLIENT_ID = os.getenv('GOOGLE_CLIENT_ID')
\ No newline at end of file
+GOOGLE_CLIENT_ID = os.getenv('GOOGLE_CLIENT_ID')
+# //  google sign-in: signing certs cached per Cache-Control max-age, shared through redis
+GOOGLE_CERTS_URL = os.getenv('GOOGLE_CERTS_URL', 'https://www.googleapis.com/oauth2/v1/certs')
+GOOGLE_CERTS_DEFAULT_MAX_AGE = config('GOOGLE_CERTS_DEFAULT_MAX_AGE', default=3600, cast=int)  # no max-age header
+GOOGLE_CERTS_REFRESH_AHEAD = config('GOOGLE_CERTS_REFRESH_AHEAD', default=300, cast=int)  # seconds before expiry
+GOOGLE_CERTS_MIN_REFRESH_INTERVAL = config('GOOGLE_CERTS_MIN_REFRESH_INTERVAL', default=60, cast=int)  # unknown kid
+GOOGLE_CERTS_TIMEOUT = config('GOOGLE_CERTS_TIMEOUT', default=5, cast=int)
+GOOGLE_TOKEN_CLOCK_SKEW = config('GOOGLE_TOKEN_CLOCK_SKEW', default=10, cast=int)
+
+# //  upstream services behind the survey / chat endpoints
+GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')  # gemini
+GEMINI_API_URL = os.getenv('GEMINI_API_URL', 'https://generativelanguage.googleapis.com/v1beta')
+GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-1.5-flash')
+GEMINI_POOL_SIZE = config('GEMINI_POOL_SIZE', default=16, cast=int)  # keep-alive connections per process
+GEMINI_REQUEST_TIMEOUT = (
+    config('GEMINI_CONNECT_TIMEOUT', default=3.05, cast=float),
+    config('GEMINI_READ_TIMEOUT', default=30, cast=float),
+)
+CHATIFY_FEED_URL = os.getenv('CHATIFY_FEED_URL', 'http://localhost:8005/chat/feed/')
+CHATIFY_TIMEOUT = config('CHATIFY_TIMEOUT', default=30, cast=int)
+
+# //  async views for the i/o bound endpoints (apps/accounts/api/asyncviews.py); only for
+# //  ASGI deployments: API_ASYNC_VIEWS=True uvicorn config.asgi:application
+API_ASYNC_VIEWS = config('API_ASYNC_VIEWS', default=False, cast=bool)
+ASYNC_HTTP_MAX_CONNECTIONS = config('ASYNC_HTTP_MAX_CONNECTIONS', default=500, cast=int)  # in flight per worker
+ASYNC_HTTP_MAX_KEEPALIVE = config('ASYNC_HTTP_MAX_KEEPALIVE', default=100, cast=int)
+ASYNC_HTTP_TIMEOUT = config('ASYNC_HTTP_TIMEOUT', default=30, cast=float)
+ASYNC_HTTP_CONNECT_TIMEOUT = config('ASYNC_HTTP_CONNECT_TIMEOUT', default=5, cast=float)
+
+# //  generate-survey answers cache (apps/accounts/surveycache.py)
+SURVEY_CACHE_TTL = config('SURVEY_CACHE_TTL', default=86400, cast=int)  # seconds in redis, 0 = off
+SURVEY_CACHE_LOCAL_TTL = config('SURVEY_CACHE_LOCAL_TTL', default=300, cast=int)  # seconds in process, 0 = off
+SURVEY_CACHE_LOCAL_MAXSIZE = config('SURVEY_CACHE_LOCAL_MAXSIZE', default=256, cast=int)
+
+# //  identical generate-survey calls in flight at once share one Gemini call (apps/auth/singleflight.py)
+SURVEY_SINGLEFLIGHT_WAIT = config('SURVEY_SINGLEFLIGHT_WAIT', default=35, cast=float)  # seconds, then run alone
+SURVEY_SINGLEFLIGHT_LOCK_TTL = config('SURVEY_SINGLEFLIGHT_LOCK_TTL', default=40, cast=float)  # > Gemini read timeout
+
+# //  generate-survey/batch/
+SURVEY_BATCH_MAX_ITEMS = config('SURVEY_BATCH_MAX_ITEMS', default=20, cast=int)
+SURVEY_BATCH_CONCURRENCY = config('SURVEY_BATCH_CONCURRENCY', default=4, cast=int)  # Gemini calls in flight per batch
+SURVEY_BATCH_ITEM_TIMEOUT = config('SURVEY_BATCH_ITEM_TIMEOUT', default=45, cast=float)  # seconds per survey
\ No newline at end of file
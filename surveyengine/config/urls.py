@@ -14,27 +14,47 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from functools import lru_cache
+
 from django.contrib import admin
 from django.urls import path, include, re_path
 from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
 
-schema_view = get_schema_view(
-   openapi.Info(
-      title="My API",
-      default_version='v1',
-      description="Test description of your API",
-   ),
-   public=True,
-   permission_classes=[permissions.AllowAny],
-)
+
+# drf_yasg is only needed when someone opens the docs, so the schema view (and the
+# views' swagger_auto_schema overrides, see apps/accounts/apidoc.py) is built on the
+# first docs request instead of at worker boot
+@lru_cache(maxsize=None)
+def schema_view():
+   from drf_yasg.views import get_schema_view
+   from drf_yasg import openapi
+
+   from apps.accounts.apidoc import apply_schemas
+
+   apply_schemas()
+   return get_schema_view(
+      openapi.Info(
+         title="My API",
+         default_version='v1',
+         description="Test description of your API",
+      ),
+      public=True,
+      permission_classes=[permissions.AllowAny],
+   )
+
+
+def swagger_ui(request, *args, **kwargs):
+   return schema_view().with_ui('swagger', cache_timeout=0)(request, *args, **kwargs)
+
+
+def redoc_ui(request, *args, **kwargs):
+   return schema_view().with_ui('redoc', cache_timeout=0)(request, *args, **kwargs)
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/users/',include('apps.accounts.api.urls')),
     # path('api/central/', include('apps.central.urls')),  # LangChain Central Services
-    re_path(r'^docs/$', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    re_path(r'^redoc/$', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    re_path(r'^docs/$', swagger_ui, name='schema-swagger-ui'),
+    re_path(r'^redoc/$', redoc_ui, name='schema-redoc'),
 ]